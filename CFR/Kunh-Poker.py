@@ -1,123 +1,82 @@
 # Counterfactual Regret Minimization, using of regret matching
-import numpy as np
-from random import shuffle
+import os
+import sys
+import argparse
+from itertools import permutations
 from tqdm import tqdm
 import joblib
 
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'app', 'train'))
+from regret_table import ALGORITHMS, RegretTable
+from traversers import TRAVERSERS, Game
+from best_response import BestResponse, Convergence
+
 # Kuhn poker definitions
 PASS, BET = 0, 1
 NUM_ACTIONS = 2
-TreeMap = {}
-
-class Node:
-    def __init__(self):
-        self.infoSet = ''
-        self.regretSum = np.zeros(NUM_ACTIONS)
-        self.strategy = np.zeros(NUM_ACTIONS)
-        self.strategySum = np.zeros(NUM_ACTIONS)
-
-    def getStrategy(self, realizationWeight):
-        # Get current information set mixed strategy through regret-matching
-        self.strategy = np.maximum(0, self.regretSum)
-        normalizingSum = np.sum(self.strategy)
-
-        if normalizingSum > 0:
-            self.strategy /= normalizingSum
-        else:
-            self.strategy = np.ones_like(self.strategy) / NUM_ACTIONS
-
-        self.strategySum += realizationWeight * self.strategy
-
-        return self.strategy
-
-    def getAverageStrategy(self):
-        normalizingSum = np.sum(self.strategySum)
-        avgStrategy = np.zeros(NUM_ACTIONS)
-
-        if normalizingSum > 0:
-            avgStrategy = self.strategySum / normalizingSum
-        else:
-            avgStrategy = np.ones_like(self.strategySum) / NUM_ACTIONS
-
-        return avgStrategy
-
-    def display(self):
-        average_strategy = np.around(self.getAverageStrategy(), 2)
-        print(f"{self.infoSet} -> {average_strategy}")
+TreeMap = RegretTable(NUM_ACTIONS)
 
 
-# p0, p1 - reach probabilities
-def cfr(cards, history, p0, p1):
-    player = len(history) % 2
-    opponent = 1 - player
+class KuhnPoker(Game):
+    actions = 'pb'
+    cards = (1, 2, 3)
 
-    # The function is done recursively, so at first we define base cases
-    # <=> return payoff for terminal states
-    if len(history) > 1:
-        isPlayersCardHigher = (cards[player] > cards[opponent])
+    def deal(self, dealer):
+        return [self.cards[index] for index in dealer.indices(2, len(self.cards))]
 
-        if history[-1] == 'p':
-            if history == 'pp':
-                return 1 if isPlayersCardHigher else -1
-            else:
-                if history == 'bp':
-                    return 1
-                elif history == 'pbp':
-                    return 1
+    def chance_outcomes(self):
+        deals = list(permutations(self.cards, 2))
+        return [(cards, 1 / len(deals)) for cards in deals]
 
-        elif history[-2:] == 'bb':
-            return 2 if isPlayersCardHigher else -2
+    def is_terminal(self, cards, history):
+        return history in ('pp', 'bp', 'bb', 'pbp', 'pbb')
 
-
-    # Get information set node or create it
-    infoSet = str(cards[player]) + history
-    if infoSet not in TreeMap:
-        node = Node()
-        node.infoSet = infoSet
-        TreeMap[infoSet] = node
-    else:
-        node = TreeMap[infoSet]
-
-    # For each action, recursively call cfr with additional history and probability
-    strategy = node.getStrategy(p0 if player == 0 else p1)
-    util = np.zeros(NUM_ACTIONS)
-    nodeUtil = 0
-
-    for a in range(NUM_ACTIONS):
-        nextHistory = history + ("p" if a == 0 else "b")
-        if player == 0:
-            util[a] = - cfr(cards, nextHistory, p0 * strategy[a], p1)
+    def utility(self, cards, history, player):
+        # Payoffs are computed for the player to act and flipped for the other one
+        acting = len(history) % 2
+        isPlayersCardHigher = (cards[acting] > cards[1 - acting])
+        if history == 'pp':
+            payoff = 1 if isPlayersCardHigher else -1
+        elif history[-1] == 'p':
+            payoff = 1
         else:
-            util[a] = - cfr(cards, nextHistory, p0, p1 * strategy[a])
-        nodeUtil += strategy[a] * util[a]
+            payoff = 2 if isPlayersCardHigher else -2
+        return payoff if player == acting else -payoff
 
-    # For each action, compute and accumulate counterfactual regret
-    for a in range(NUM_ACTIONS):
-        regret = util[a] - nodeUtil
-        node.regretSum[a] += (p1 if player == 0 else p0) * regret
+    def hand(self, cards, player):
+        return str(cards[player])
 
-    return nodeUtil
 
-
-def train(iterations):
-    cards = [1, 2, 3]
+def train(iterations, traverser='chance', convergence=None):
+    solver = TRAVERSERS[traverser](KuhnPoker(), TreeMap)
     util = 0
     for i in tqdm(range(iterations), desc="Training Loop"):
-        shuffle(cards)
-        util += cfr(cards, "", 1, 1)
+        util += solver.iteration()
+        TreeMap.end_iteration()
+        if convergence and convergence(i + 1):
+            break
         if i and (i % 100_000 == 0):
             print(" Average game value: ", util / (i+1))
     print("Training complete.")
 
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--traverser', choices=TRAVERSERS, default='chance', help='CFR variant')
+    parser.add_argument('--algorithm', choices=ALGORITHMS, default='cfr', help='regret and averaging update rule')
+    parser.add_argument('--eval-every', type=int, default=0, help='iterations between exploitability evaluations')
+    parser.add_argument('--target', type=float, help='exploitability (mbb/g) that stops the training')
+    parser.add_argument('--curve', help='csv file of the exploitability curve')
+    args = parser.parse_args()
+    TreeMap.set_algorithm(args.algorithm)
+
     train_from_scratch = True
     if train_from_scratch:
-        train(100_000)
+        convergence = Convergence(BestResponse(KuhnPoker()), TreeMap, args.eval_every, args.target, args.curve)
+        train(100_000, args.traverser, convergence)
         joblib.dump(TreeMap, "KuhnTreeMap.joblib")
     else:
         TreeMap = joblib.load("KuhnTreeMap.joblib")
 
     print("Total Number of Infosets:", len(TreeMap))
-    for infoSet in TreeMap:
-        TreeMap[infoSet].display()
+    TreeMap.display()
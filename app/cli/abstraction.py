@@ -0,0 +1,230 @@
+# Card abstraction for postflop streets
+#
+# Deals of a street are grouped into buckets of similar strength, and the bucket replaces
+# the cards in the info set key, so postflop strategies are learned per bucket.
+#
+# The offline pipeline (build_buckets) takes one deal of every suit isomorphic class on the
+# flop (1,286,792 classes) and samples deals on the turn and the river, where the classes are
+# too many, then describes each deal by its equity histogram: the distribution of the hand strength
+# (equity against a random hand on the river) over random runouts of the remaining board.
+# Deals are clustered with k-means on the cumulative histograms (L2 on cumulative
+# histograms behaves like the earth mover's distance), and buckets are numbered from the
+# weakest to the strongest. On the river the histogram is the hand strength itself. Deals are
+# processed CHUNK at a time, so the memory does not grow with the number of deals.
+#
+# A lookup file keeps the sorted canonical keys with their buckets and the centroids, on the
+# flop the position of a key is the index of its class in a dense bucket array. A deal of a
+# class that was not sampled gets its histogram computed on the fly and the bucket of the
+# nearest centroid, the latest CACHE_SIZE of these are kept.
+import os
+from functools import lru_cache
+import numpy as np
+from cards import CARDS
+from dealer import deal_cards
+from isomorphism import canonical_cards, canonical_deals, canonical_key, info_set
+from showdown import evaluate_batch
+
+STREETS = {3: 'flop', 4: 'turn', 5: 'river'}
+BUCKETS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'train', 'buckets-{}.npz')
+
+NUM_BUCKETS = 50
+# Streets whose every class is bucketed offline, the others sample SAMPLES deals
+ENUMERATED = (3,)
+SAMPLES = 20_000
+RUNOUTS = 30
+OPPONENTS = 30
+HISTOGRAM_BINS = 10
+# Deals of a batch, 1024 flop deals with 30 runouts and 30 opponents evaluate 921,600 hands
+CHUNK = 1024
+CACHE_SIZE = 65_536
+
+
+def hand_strength(hole, board, opponents, rng):
+    """
+    :param hole: array [N, 2] of card indices
+    :param board: array [N, 5] of card indices
+    :param opponents: number of random opponent hands
+    :return: array [N] of equities against a random hand
+    """
+    hole, board = np.repeat(hole, opponents, axis=0), np.repeat(board, opponents, axis=0)
+    villain = deal_cards(np.concatenate([hole, board], axis=1), 2, rng)
+    hero_strength, villain_strength = evaluate_batch(hole, board), evaluate_batch(villain, board)
+    result = (hero_strength > villain_strength) + (hero_strength == villain_strength) / 2
+    return result.reshape(-1, opponents).mean(axis=1)
+
+
+def features(hole, board, runouts=RUNOUTS, opponents=OPPONENTS, bins=HISTOGRAM_BINS, rng=None, chunk=CHUNK):
+    """
+    :param hole: array [N, 2] of card indices
+    :param board: array [N, 3..5] of card indices
+    :param chunk: deals evaluated at once
+    :return: (array [N, bins] of cumulative equity histograms, array [N] of mean equities)
+    """
+    rng = rng if rng is not None else np.random.default_rng()
+    if len(hole) > chunk:
+        parts = [features(hole[start:start + chunk], board[start:start + chunk], runouts, opponents, bins, rng, chunk)
+                 for start in range(0, len(hole), chunk)]
+        return np.concatenate([points for points, _ in parts]), np.concatenate([strength for _, strength in parts])
+
+    if board.shape[1] == 5:
+        strength = hand_strength(hole, board, opponents, rng)
+        return strength[:, None], strength
+
+    hole, board = np.repeat(hole, runouts, axis=0), np.repeat(board, runouts, axis=0)
+    rest = deal_cards(np.concatenate([hole, board], axis=1), 5 - board.shape[1], rng)
+    strength = hand_strength(hole, np.concatenate([board, rest], axis=1), opponents, rng).reshape(-1, runouts)
+
+    bin_of = np.minimum((strength * bins).astype(np.int64), bins - 1)
+    histograms = np.zeros((len(strength), bins))
+    np.add.at(histograms, (np.repeat(np.arange(len(strength)), runouts), bin_of.ravel()), 1 / runouts)
+    return np.cumsum(histograms, axis=1), strength.mean(axis=1)
+
+
+def kmeans(points, k, iterations=25, rng=None):
+    """
+    :param points: array [N, D]
+    :param k: number of clusters
+    :return: (array [k, D] of centroids, array [N] of cluster labels)
+    """
+    rng = rng if rng is not None else np.random.default_rng()
+    k = min(k, len(points))
+
+    # k-means++ initialization: next centroids are drawn proportionally to the squared distance
+    centroids = [points[rng.integers(len(points))]]
+    distances = ((points - centroids[0]) ** 2).sum(axis=1)
+    for _ in range(1, k):
+        total = distances.sum()
+        choice = rng.choice(len(points), p=distances / total) if total > 0 else rng.integers(len(points))
+        centroids.append(points[choice])
+        distances = np.minimum(distances, ((points - points[choice]) ** 2).sum(axis=1))
+    centroids = np.array(centroids)
+
+    for _ in range(iterations):
+        labels = nearest(points, centroids)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, labels, points)
+        counts = np.bincount(labels, minlength=k)
+        # Empty clusters keep their centroid
+        filled = counts > 0
+        new_centroids = centroids.copy()
+        new_centroids[filled] = sums[filled] / counts[filled, None]
+        if np.allclose(new_centroids, centroids):
+            break
+        centroids = new_centroids
+
+    return centroids, nearest(points, centroids)
+
+
+def nearest(points, centroids, chunk=65_536):
+    # Index of the nearest centroid of every point, the [chunk, k] distances are computed at once
+    labels = np.empty(len(points), dtype=np.int64)
+    squares = (centroids ** 2).sum(axis=1)[None, :]
+    for start in range(0, len(points), chunk):
+        part = points[start:start + chunk]
+        distances = (part ** 2).sum(axis=1)[:, None] - 2 * part @ centroids.T + squares
+        labels[start:start + chunk] = np.argmin(distances, axis=1)
+    return labels
+
+
+def _key_bytes(key, num_board):
+    # Canonical keys do not fit into 64 bits, they are stored as big endian bytes of a fixed width
+    width = (4 * 13 * (num_board - 1) + 3 + 7) // 8
+    return key.to_bytes(width, 'big')
+
+
+def build_buckets(num_board, num_buckets=NUM_BUCKETS, samples=SAMPLES, runouts=RUNOUTS, opponents=OPPONENTS,
+                  bins=HISTOGRAM_BINS, path=None, rng=None):
+    """
+    :param num_board: number of community cards, 3 - flop, 4 - turn, 5 - river
+    :param num_buckets: number of buckets of the street
+    :param samples: number of random deals, suit isomorphic deals are merged, None - one deal of every class
+    :param runouts: number of random runouts of the board for each histogram
+    :param opponents: number of random opponent hands for each hand strength
+    :param bins: number of histogram bins
+    :param path: output .npz file
+    :return: BucketLookup of the street
+    """
+    rng = rng if rng is not None else np.random.default_rng()
+    path = path if path is not None else BUCKETS_PATH.format(STREETS[num_board])
+
+    if samples is None:
+        keys, cards = [], []
+        for key, hole, board in canonical_deals(num_board):
+            keys.append(_key_bytes(key, num_board))
+            cards.append([card.index for card in hole + board])
+        cards = np.array(cards, dtype=np.int8).reshape(len(keys), 2 + num_board)
+    else:
+        cards = deal_cards(np.zeros((samples, 0), dtype=np.int8), 2 + num_board, rng)
+        keys = [_key_bytes(canonical_key([CARDS[i] for i in row[:2]], [CARDS[i] for i in row[2:]]), num_board)
+                for row in cards]
+    keys, first = np.unique(np.array(keys), return_index=True)
+    cards = cards[first]
+
+    points, strength = features(cards[:, :2], cards[:, 2:], runouts, opponents, bins, rng)
+    centroids, labels = kmeans(points, num_buckets, rng=rng)
+
+    # Buckets are numbered by the mean equity of their deals, 0 - the weakest
+    counts = np.maximum(np.bincount(labels, minlength=len(centroids)), 1)
+    mean_strength = np.bincount(labels, weights=strength, minlength=len(centroids)) / counts
+    order = np.argsort(mean_strength)
+    rank = np.empty_like(order)
+    rank[order] = np.arange(len(order))
+
+    np.savez(path, keys=keys, buckets=rank[labels].astype(np.uint16), centroids=centroids[order].astype(np.float32),
+             params=np.array([num_board, runouts, opponents, bins]))
+    return BucketLookup(path)
+
+
+class BucketLookup:
+    def __init__(self, path, maxsize=CACHE_SIZE):
+        data = np.load(path)
+        self.keys = data['keys']
+        self.buckets = data['buckets']
+        self.centroids = data['centroids'].astype(np.float64)
+        self.num_board, self.runouts, self.opponents, self.bins = (int(value) for value in data['params'])
+        self._computed = lru_cache(maxsize=maxsize)(self._compute)
+
+    def __len__(self):
+        return len(self.centroids)
+
+    def bucket(self, hole, board):
+        key = _key_bytes(canonical_key(hole, board), self.num_board)
+        position = np.searchsorted(self.keys, key)
+        if position < len(self.keys) and self.keys[position] == key:
+            return int(self.buckets[position])
+
+        # A class that was not sampled offline, computed from the canonical deal so isomorphic deals share it
+        hole, board = canonical_cards(hole, board)
+        return self._computed(tuple(hole), tuple(board))
+
+    def _compute(self, hole, board):
+        # The histogram is seeded by the key, so the bucket of a class is stable
+        rng = np.random.default_rng(canonical_key(hole, board))
+        point, _ = features(np.array([[card.index for card in hole]], dtype=np.int8),
+                            np.array([[card.index for card in board]], dtype=np.int8),
+                            self.runouts, self.opponents, self.bins, rng)
+        return int(nearest(point, self.centroids)[0])
+
+
+_lookups = {}
+
+
+def load_buckets(num_board):
+    # Lookup of a street, None when its file was not built
+    if num_board not in _lookups:
+        path = BUCKETS_PATH.format(STREETS[num_board])
+        _lookups[num_board] = BucketLookup(path) if os.path.exists(path) else None
+    return _lookups[num_board]
+
+
+def bucket_info_set(hole, board=()):
+    # Cards part of an info set: canonical cards preflop or without a lookup file, e.g. 'F12' - flop bucket 12
+    lookup = load_buckets(len(board)) if board else None
+    if lookup is None:
+        return info_set(hole, board)
+    return f'{STREETS[len(board)][0].upper()}{lookup.bucket(hole, board)}'
+
+
+if __name__ == '__main__':
+    for street in STREETS:
+        build_buckets(street, samples=None if street in ENUMERATED else SAMPLES)
@@ -0,0 +1,102 @@
+import os
+import random
+import tempfile
+import tracemalloc
+import unittest
+from functools import partial
+from unittest.mock import patch
+import numpy as np
+import abstraction
+from abstraction import BucketLookup, build_buckets, features
+from cards import CARDS, CARDS_BY_NAME, Card
+from dealer import deal_cards
+
+NUM_BUCKETS = 5
+
+
+def cards(*names):
+    return [CARDS_BY_NAME[name] for name in names]
+
+
+class TestAbstraction(unittest.TestCase):
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = directory.name
+
+    def build(self, num_board, seed=0, name='buckets', samples=500):
+        path = os.path.join(self.directory, f'{name}-{num_board}.npz')
+        return build_buckets(num_board, NUM_BUCKETS, samples=samples, runouts=8, opponents=8, path=path,
+                             rng=np.random.default_rng(seed))
+
+    def test_deterministic(self):
+        first, second = self.build(3), self.build(3, name='again')
+        self.assertEqual(len(first), NUM_BUCKETS)
+        np.testing.assert_array_equal(first.keys, second.keys)
+        np.testing.assert_array_equal(first.buckets, second.buckets)
+        np.testing.assert_array_equal(first.centroids, second.centroids)
+        self.assertFalse(np.array_equal(first.keys, self.build(3, seed=1, name='other').keys))
+
+    def test_buckets(self):
+        rng = random.Random(0)
+        for num_board in (3, 5):
+            lookup = self.build(num_board)
+            reloaded = BucketLookup(os.path.join(self.directory, f'buckets-{num_board}.npz'))
+            self.assertTrue((lookup.buckets < NUM_BUCKETS).all())
+            for _ in range(20):
+                deal = rng.sample(CARDS, 2 + num_board)
+                bucket = lookup.bucket(deal[:2], deal[2:])
+                self.assertIn(bucket, range(NUM_BUCKETS))
+                # Suit isomorphic deals share the bucket, a deal that was not sampled gets the same bucket again
+                suits = rng.sample(range(4), 4)
+                renamed = [Card(card.rank, suits[card.suit]) for card in deal]
+                self.assertEqual(lookup.bucket(renamed[:2], renamed[2:]), bucket)
+                self.assertEqual(reloaded.bucket(deal[:2], deal[2:]), bucket)
+
+    def test_river_order(self):
+        # Buckets are numbered from the weakest to the strongest
+        lookup = self.build(5)
+        board = cards('10♠', 'J♠', 'Q♠', '4♦', '2♣')
+        self.assertEqual(lookup.bucket(cards('A♠', 'K♠'), board), NUM_BUCKETS - 1)
+        self.assertEqual(lookup.bucket(cards('3♥', '5♣'), board), 0)
+
+    def test_every_class(self):
+        # The flop classes of two preflop hands are all bucketed offline, no lookup is computed on the fly
+        holes = [cards('A♠', 'K♠'), cards('7♥', '2♣')]
+        with patch.object(abstraction, 'canonical_deals', partial(abstraction.canonical_deals, holes=holes)):
+            lookup = self.build(3, samples=None)
+        self.assertEqual(len(lookup.keys), 4494 + 10_968)
+        rng = random.Random(0)
+        for _ in range(200):
+            suits = rng.sample(range(4), 4)
+            hole = [Card(card.rank, suits[card.suit]) for card in rng.choice(holes)]
+            lookup.bucket(hole, rng.sample([card for card in CARDS if card not in hole], 3))
+        self.assertEqual(lookup._computed.cache_info().currsize, 0)
+
+    def test_cache_is_bounded(self):
+        self.build(4)
+        lookup = BucketLookup(os.path.join(self.directory, 'buckets-4.npz'), maxsize=8)
+        rng = random.Random(0)
+        for _ in range(50):
+            deal = rng.sample(CARDS, 6)
+            lookup.bucket(deal[:2], deal[2:])
+        self.assertEqual(lookup._computed.cache_info().currsize, 8)
+
+    def test_memory(self):
+        # Flop features at the default runouts and opponents, the peak memory does not grow with the deals
+        rng = np.random.default_rng(0)
+        deals = deal_cards(np.zeros((256, 0), dtype=np.int8), 5, rng)
+        peaks = []
+        for num in (64, 256):
+            tracemalloc.start()
+            points, strength = features(deals[:num, :2], deals[:num, 2:], rng=rng, chunk=64)
+            peaks.append(tracemalloc.get_traced_memory()[1])
+            tracemalloc.stop()
+            self.assertEqual(points.shape, (num, abstraction.HISTOGRAM_BINS))
+            self.assertEqual(strength.shape, (num,))
+        self.assertLess(peaks[1], 1.25 * peaks[0])
+
+
+if __name__ == '__main__':
+    unittest.main()
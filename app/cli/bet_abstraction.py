@@ -0,0 +1,82 @@
+# Bet sizes of the abstract game and translation of real bets
+#
+# A menu is a tuple of raise sizes in fractions of the pot after the call: a raise of size f by a player
+# who has to_call chips to call puts in to_call + f * (pot + to_call). Every street (number of board cards)
+# has its own menu, the raise i of a menu is written raise_key(i) in the histories: 'b', 'b1', 'b2'...
+#
+# A real raise of fraction x between two sizes A < x < B of a menu is translated to A with the
+# pseudo-harmonic probability
+#
+#   f(x) = (B - x) * (1 + A) / ((B - A) * (1 + x))
+#
+# and to B otherwise, a raise below the smallest size is the smallest size and above the largest the largest.
+# The bracket and the probability are tabulated over a grid of resolution steps per pot, so a translation
+# is a list lookup whatever the number of sizes.
+import random
+import numpy as np
+from game_state import STREETS
+
+# Half pot, pot and two pots: a raise of 1, 2 and 4 big blinds when the small blind opens
+DEFAULT_MENU = (0.5, 1, 2)
+RESOLUTION = 100
+
+
+def raise_key(size_index):
+    return 'b' if size_index == 0 else f'b{size_index}'
+
+
+class BetAbstraction:
+    def __init__(self, menus=None, resolution=RESOLUTION):
+        """
+        :param menus: {street: raise sizes in pot fractions}, DEFAULT_MENU on the streets that are not given
+        :param resolution: steps of the translation tables per pot
+        """
+        menus = menus or {}
+        self.menus = {street: tuple(sorted(menus.get(street, DEFAULT_MENU))) for street in STREETS}
+        for street, menu in self.menus.items():
+            if not menu or menu[0] <= 0 or len(set(menu)) != len(menu):
+                raise ValueError(f'Invalid bet menu of street {street}: {menu}')
+        self.max_sizes = max(len(menu) for menu in self.menus.values())
+        self.resolution = resolution
+        self.tables = {street: self._table(menu) for street, menu in self.menus.items()}
+
+    def _table(self, menu):
+        # (lower size, probability of the lower size) at every step of the grid up to the largest size
+        fractions = np.arange(int(menu[-1] * self.resolution) + 1) / self.resolution
+        if len(menu) == 1:
+            return [0] * len(fractions), [1.0] * len(fractions)
+        sizes = np.array(menu)
+        upper = np.searchsorted(sizes, fractions).clip(1, len(sizes) - 1)
+        low, high = sizes[upper - 1], sizes[upper]
+        probability = ((high - fractions) * (1 + low) / ((high - low) * (1 + fractions))).clip(0, 1)
+        return (upper - 1).tolist(), probability.tolist()
+
+    def raises(self, street, pot, to_call):
+        # Chips of the raises of the menu, they may be out of the valid range of the bet
+        after_call = pot + to_call
+        return [to_call + int(size * after_call) for size in self.menus[street]]
+
+    def translate(self, street, pot, to_call, bet, rng=random):
+        """
+        :param street: number of board cards
+        :param pot: chips in the pot before the raise
+        :param to_call: chips the raising player has to call
+        :param bet: chips put in by the raise
+        :param rng: random.Random of the randomized translation
+        :return: index of the menu size of the raise
+        """
+        fraction = (bet - to_call) / (pot + to_call)
+        lower, probability = self.tables[street]
+        step = min(max(int(fraction * self.resolution + 0.5), 0), len(lower) - 1)
+        if probability[step] >= 1 or rng.random() < probability[step]:
+            return lower[step]
+        return lower[step] + 1
+
+    def key(self, street, pot, to_call, bet, rng=random):
+        # Character of a real raise in the histories of the abstract game
+        return raise_key(self.translate(street, pot, to_call, bet, rng))
+
+
+DEFAULT_ABSTRACTION = BetAbstraction()
+# The trained strategies have a single raise size, every raise is a 'b' in their keys
+STRATEGY_ABSTRACTION = BetAbstraction({street: (0.5,) for street in STREETS})
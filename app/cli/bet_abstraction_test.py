@@ -0,0 +1,39 @@
+import random
+import unittest
+from bet_abstraction import BetAbstraction
+from betting_tree import BettingTree
+from players import expand_strategy, style_strategy
+
+
+class TestBetAbstraction(unittest.TestCase):
+
+    def test_translation(self):
+        abstraction = BetAbstraction({3: (0.25, 0.5, 1, 2, 4)})
+        rng = random.Random(0)
+        # The sizes of the menu and the raises out of its range translate to one size
+        for bet, size_index in ((50, 0), (250, 0), (500, 1), (1000, 2), (4000, 4), (20000, 4)):
+            self.assertEqual({abstraction.translate(3, 1000, 0, bet, rng) for _ in range(100)}, {size_index})
+        # Pseudo-harmonic probability of the smaller size between a half pot and a pot
+        share = sum(abstraction.translate(3, 800, 200, 900, rng) == 1 for _ in range(20000)) / 20000
+        self.assertAlmostEqual(share, 0.3 * 1.5 / (0.5 * 1.7), delta=0.015)
+        self.assertEqual(abstraction.key(3, 1000, 0, 2000, rng), 'b3')
+        with self.assertRaises(ValueError):
+            BetAbstraction({0: ()})
+
+    def test_tree_and_bot_menus(self):
+        abstraction = BetAbstraction({0: (0.5, 1)})
+        tree = BettingTree(abstraction=abstraction)
+        self.assertEqual(tree.num_actions, 2 + 3)
+        # The small blind opens: half a pot and a pot after the call are 1 and 2 big blinds
+        self.assertEqual([tuple(tree.bets[child]) for child in tree.children[0, 2:4]], [(1000, 500), (1500, 500)])
+        self.assertEqual(tree.histories[tree.child(0, 'raise', 760)], 'b')
+        self.assertEqual(tree.child(0, 'check'), tree.node([0]))
+        # The default menu keeps the seven bot actions
+        expanded = [round(weight, 9) for weight in expand_strategy([0.5, 0.3, 0.2])]
+        self.assertEqual(expanded, [0.35, 0.15, 0.3, 0.1, 0.06, 0.03, 0.01])
+        self.assertEqual(len(style_strategy('TAG', 5)), 3 + 5 + 1)
+        self.assertAlmostEqual(sum(style_strategy('TAG', 5)), 1.0)
+
+
+if __name__ == '__main__':
+    unittest.main()
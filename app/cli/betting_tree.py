@@ -0,0 +1,174 @@
+# Abstract betting tree with integer node ids
+#
+# The tree of a bet menu is built once by walking GameState, and every node gets an integer id
+# (0 - the root). The nodes are stored in flat arrays indexed by id, so a traversal follows
+# children[node, action] instead of concatenating and hashing history strings:
+#
+#   children - int32 [nodes, actions] child of every action, -1 if the action is not legal
+#   player   - int8 [nodes] position to act (0 - small blind, 1 - big blind), at a fold the position
+#              that folded, -1 at a showdown
+#   street   - int8 [nodes] number of board cards
+#   bets     - int32 [nodes, 2] chips put in by both positions, the pot is their sum
+#   kind     - int8 [nodes] DECISION, FOLD or SHOWDOWN
+#
+# Action 0 is a fold or a check, 1 a call and the next ones the raises of the menu: a raise is the
+# call plus bet_size big blinds, or the pot fractions of a bet_abstraction.BetAbstraction, clamped to
+# the valid bets (all the chips left when the stack is shorter), and sizes that make the same bet are
+# merged. A street allows max_raises raises. A tree may cover only some of the streets, the end of its
+# last street is then a showdown. histories[node] is the history of the street in the info set keys:
+# 'p', 'c' and 'b' for the first raise size, 'b1', 'b2'... for the next ones. child maps a real action,
+# e.g. a raise of any size by a human player, to a child node.
+import random
+import numpy as np
+import game_state
+from bet_abstraction import raise_key
+from game_state import BIG_BLIND, SMALL_BLIND, STARTING_CHIPS, STREETS, GameState
+
+DECISION = 0
+FOLD = 1
+SHOWDOWN = 2
+
+
+class BettingTree:
+    def __init__(self, bet_sizes=(1,), max_raises=2, starting_chips=STARTING_CHIPS, small_blind=SMALL_BLIND,
+                 streets=STREETS, bets=None, abstraction=None, root=None):
+        """
+        :param bet_sizes: raise sizes above the call, in big blinds
+        :param max_raises: raises allowed on a street
+        :param starting_chips: stack of both players
+        :param small_blind: small blind, the big blind is twice as much
+        :param streets: streets of the tree, e.g. (3,) for the flop alone
+        :param bets: chips put in by both players before the first street when it is not preflop
+        :param abstraction: BetAbstraction of pot fraction sizes, replaces bet_sizes
+        :param root: GameState at the start of the first street, replaces starting_chips and bets
+        """
+        self.bet_sizes = tuple(bet_sizes)
+        self.max_raises = max_raises
+        self.streets = tuple(streets)
+        self.abstraction = abstraction
+        self.num_actions = 2 + (abstraction.max_sizes if abstraction is not None else len(self.bet_sizes))
+        self.big_blind = 2 * small_blind
+
+        if root is not None:
+            self.big_blind = root.min_bet
+        elif self.streets[0] == 0:
+            root = GameState.start(starting_chips, small_blind)
+        else:
+            bets = bets if bets is not None else (BIG_BLIND, BIG_BLIND)
+            root = GameState((self.streets[0], 1, 0, tuple(bets), (starting_chips - bets[0], starting_chips - bets[1]),
+                              '', self.big_blind, None))
+
+        children, players, streets, node_bets, kinds, histories = [], [], [], [], [], []
+
+        def add(state, kind, history):
+            node = len(kinds)
+            children.append([-1] * self.num_actions)
+            players.append(state.player if kind != SHOWDOWN else -1)
+            streets.append(min(state.street, self.streets[-1]))
+            node_bets.append(state.bets)
+            kinds.append(kind)
+            histories.append(history)
+            return node
+
+        # Depth first, the children of a node get consecutive ids
+        stack = [(root, add(root, DECISION, ''), '', 0)]
+        while stack:
+            state, node, history, raises = stack.pop()
+            for action, (child, key) in self._actions(state, raises).items():
+                if child.outcome == game_state.FOLD:
+                    kind = FOLD
+                elif child.outcome == game_state.SHOWDOWN or child.street not in self.streets:
+                    kind = SHOWDOWN
+                else:
+                    kind = DECISION
+                new_street = child.street != state.street or kind != DECISION
+                child_history = '' if new_street and kind == DECISION else history + key
+                child_node = add(child, kind, child_history)
+                children[node][action] = child_node
+                if kind == DECISION:
+                    stack.append((child, child_node, child_history, 0 if new_street else raises + (key[0] == 'b')))
+
+        self.children = np.array(children, dtype=np.int32)
+        self.player = np.array(players, dtype=np.int8)
+        self.street = np.array(streets, dtype=np.int8)
+        self.bets = np.array(node_bets, dtype=np.int32)
+        self.kind = np.array(kinds, dtype=np.int8)
+        self.histories = histories
+        self.legal = self.children >= 0
+        self.decisions = np.flatnonzero(self.kind == DECISION)
+        # Dense index of every decision node, -1 for the terminals
+        self.decision_index = np.full(len(kinds), -1, dtype=np.int32)
+        self.decision_index[self.decisions] = np.arange(len(self.decisions))
+
+    def _actions(self, state, raises):
+        # {action: (child state, key)} of the legal actions of a decision state
+        actions = {}
+        if state.to_call > 0:
+            actions[0] = (state.apply('fold'), 'p')
+            actions[1] = (state.apply('call'), 'c')
+        else:
+            actions[0] = (state.apply('check'), 'p')
+        bounds = state.raise_range()
+        if bounds is not None and raises < self.max_raises:
+            if self.abstraction is not None:
+                bets = self.abstraction.raises(state.street, state.pot, state.to_call)
+            else:
+                bets = [state.to_call + int(size * self.big_blind) for size in self.bet_sizes]
+            seen = set()
+            for size_index, bet in enumerate(bets):
+                bet = min(max(bet, bounds[0]), bounds[1])
+                if bet not in seen:
+                    seen.add(bet)
+                    actions[2 + size_index] = (state.apply('raise', bet), raise_key(size_index))
+        return actions
+
+    def __len__(self):
+        return len(self.kind)
+
+    @property
+    def pot(self):
+        return self.bets.sum(axis=1)
+
+    def payoffs(self):
+        # Chips won by the small blind at every terminal: fold results, and the stake of a showdown won
+        # by the small blind (negate it when the big blind wins, 0 for a split pot); 0 at the decisions
+        result = np.zeros(len(self), dtype=np.int64)
+        folds = self.kind == FOLD
+        folded = self.player[folds]
+        result[folds] = np.where(folded == 0, -self.bets[folds, 0], self.bets[folds, 1])
+        showdowns = self.kind == SHOWDOWN
+        result[showdowns] = self.bets[showdowns].min(axis=1)
+        return result
+
+    def node(self, history):
+        # Node of a history of action numbers from the root, e.g. [1, 0] - limp, check
+        node = 0
+        for action in history:
+            node = int(self.children[node, action])
+            if node < 0:
+                raise ValueError(f'Action {action} is not legal')
+        return node
+
+    def child(self, node, act, bet=0, rng=random):
+        """
+        :param node: decision node
+        :param act: real action, 'fold', 'check', 'call' or 'raise'
+        :param bet: chips put in by a raise
+        :param rng: random.Random of the translation of the raise
+        :return: child node of the nearest abstract action
+        """
+        children = self.children[node]
+        if act != 'raise':
+            return int(children[0] if act in ('fold', 'check') else children[1])
+        raises = children[2:]
+        player, bets = self.player[node], self.bets[node]
+        to_call = int(bets[1 - player] - bets[player])
+        if self.abstraction is not None:
+            size_index = self.abstraction.translate(int(self.street[node]), int(bets.sum()), to_call, bet, rng)
+        else:
+            size_index = int(np.abs(np.array(self.bet_sizes) * self.big_blind - (bet - to_call)).argmin())
+        # A size merged with another one or out of the raises of the street goes to the nearest legal raise
+        legal = np.flatnonzero(raises >= 0)
+        if not len(legal):
+            raise ValueError('No raise is legal at this node')
+        return int(raises[legal[np.abs(legal - size_index).argmin()]])
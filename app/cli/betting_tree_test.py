@@ -0,0 +1,41 @@
+import unittest
+import numpy as np
+from betting_tree import DECISION, FOLD, SHOWDOWN, BettingTree
+
+
+class TestBettingTree(unittest.TestCase):
+
+    def test_single_street(self):
+        tree = BettingTree(streets=(3,), bets=(500, 500))
+        self.assertEqual(len(tree), 15)
+        self.assertEqual(sorted(tree.histories[node] for node in np.flatnonzero(tree.kind != DECISION)),
+                         ['bbc', 'bbp', 'bc', 'bp', 'pbbc', 'pbbp', 'pbc', 'pbp', 'pp'])
+        # Check, raise, re-raise, fold: the big blind wins the bet of the small blind
+        node = tree.node([0, 2, 2, 0])
+        self.assertEqual((tree.histories[node], tree.kind[node], tree.player[node]), ('pbbp', FOLD, 0))
+        self.assertEqual(tuple(tree.bets[node]), (1000, 1500))
+        self.assertEqual(tree.payoffs()[node], -1000)
+        # The re-raise ends the raises of the street
+        self.assertFalse(tree.legal[tree.node([2, 2])][2])
+        node = tree.node([2, 1])
+        self.assertEqual((tree.kind[node], tree.payoffs()[node]), (SHOWDOWN, 1000))
+        with self.assertRaises(ValueError):
+            tree.node([0, 1])
+
+    def test_full_tree(self):
+        tree = BettingTree(bet_sizes=(1, 4, 100))
+        self.assertEqual(tree.children.shape, (len(tree), 5))
+        self.assertEqual(tuple(tree.bets[0]), (250, 500))
+        # Limp, check: the flop is a decision of the big blind with a new street history
+        flop = tree.node([1, 0])
+        self.assertEqual((tree.street[flop], tree.player[flop], tree.histories[flop]), (3, 1, ''))
+        # The biggest size is all-in, nothing can be raised after it
+        all_in = tree.node([4])
+        self.assertEqual(tuple(tree.bets[all_in]), (5000, 500))
+        self.assertEqual(tree.children[all_in, 2:].tolist(), [-1, -1, -1])
+        self.assertEqual(tree.kind[tree.node([4, 1])], SHOWDOWN)
+        self.assertTrue((tree.decision_index[tree.decisions] == np.arange(len(tree.decisions))).all())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,36 +1,97 @@
+import random
+
+
 class Card:
+    # Cards are interned: there are only 52 instances, one per index (suit * 13 + rank - 2),
+    # so Card(rank, suit) returns the shared object and cards can be compared by identity.
+    # The instances are shared by every deck and hand, never modify them.
+    __slots__ = ('rank', 'suit', 'index', 'mask', 'name')
+
     suits_symbols = ['♣', '♦', '♥', '♠']
     ranks_symbols = {11: 'J', 12: 'Q', 13: 'K', 14: 'A'}
-    def __init__(self, rank, suit):
-        self.rank = rank
+
+    def __new__(cls, rank, suit):
+        return CARDS[suit * 13 + rank - 2]
+
+    @classmethod
+    def _create(cls, rank, suit):
+        card = object.__new__(cls)
+        card.rank = rank
         # 0 - clubs (♣), 1 - diamonds (♦), 2 - hearts (♥), 3 - spades (♠)
-        self.suit = suit
-        # self.front_face = f'images/cards/{self.rank}_of_{["clubs", "diamonds", "hearts", "spades"][self.suit]}.png'
-        # self.back_face = f'images/cards/red_back'
+        card.suit = suit
+        card.index = suit * 13 + rank - 2
+        card.mask = 1 << card.index
+        card.name = f"{cls.ranks_symbols.get(rank, str(rank))}{cls.suits_symbols[suit]}"
+        return card
+
+    def __reduce__(self):
+        # Unpickled and copied cards resolve to the interned instance
+        return Card, (self.rank, self.suit)
 
     def __str__(self):
-        rank_str = self.ranks_symbols.get(self.rank, str(self.rank))
-        suit_str = self.suits_symbols[self.suit]
-        return f"{rank_str}{suit_str}"
+        return self.name
+
+    def __repr__(self):
+        return f'Card({self.name})'
+
+
+CARDS = tuple(Card._create(rank, suit) for suit in range(4) for rank in range(2, 15))
+CARDS_BY_NAME = {card.name: card for card in CARDS}
+
+# Sets of cards as 52-bit masks, bit i is the card with index i. Each suit takes 13 bits,
+# so (mask >> 13 * suit) & RANKS_MASK is the rank mask of a suit (bit 0 - deuce, bit 12 - ace).
+# Union is |, removal is & ~ and the size is mask.bit_count().
+FULL_DECK_MASK = (1 << 52) - 1
+RANKS_MASK = (1 << 13) - 1
+
+
+def mask_of(cards) -> int:
+    mask = 0
+    for card in cards:
+        mask |= card.mask
+    return mask
+
+
+def cards_of(mask: int) -> list[Card]:
+    cards = []
+    while mask:
+        low_bit = mask & -mask
+        cards.append(CARDS[low_bit.bit_length() - 1])
+        mask ^= low_bit
+    return cards
+
+
+def remaining_cards(dead_mask: int) -> list[Card]:
+    # The deck without the dead cards
+    return cards_of(FULL_DECK_MASK & ~dead_mask)
 
 
 class Deck(list):
     def __init__(self):
-        super().__init__()
-        for suit in range(4):
-            for rank in range(2, 15):
-                self.append(Card(rank, suit))
+        # The deck holds references to the shared cards, nothing is allocated per card
+        super().__init__(CARDS)
+        self.order = list(range(52))
+        self.position = 0
 
     def __str__(self):
         return '[' + ', '.join(str(card) for card in self) + ']'
-    
+
+    def shuffle(self):
+        # Only the index array is shuffled, dealing starts again from the top
+        random.shuffle(self.order)
+        self.position = 0
+
+    def deal(self, num):
+        indices = self.order[self.position:self.position + num]
+        if len(indices) < num:
+            raise ValueError('Not enough cards left in the deck')
+        self.position += num
+        return [CARDS[i] for i in indices]
+
+    def sample(self, num):
+        # Random cards without changing the deck order
+        return [CARDS[i] for i in random.sample(self.order, num)]
+
 
 def create_hand(cards: list[str]) -> list[Card]:
-    res = []
-    for card in cards:
-        suit = ['♣', '♦', '♥', '♠'].index(card[-1])
-        rank_str = card[:-1]
-        rank = int(rank_str) if rank_str.isdigit() else {'J': 11, 'Q': 12, 'K': 13, 'A': 14}[rank_str]
-        res.append(Card(rank=rank, suit=suit))
-    return sorted(res, key=lambda x: x.rank)
-    
\ No newline at end of file
+    return sorted((CARDS_BY_NAME[card] for card in cards), key=lambda x: x.rank)
@@ -75,7 +75,7 @@ class TestPokerGame(unittest.TestCase):
         self.game.user.hole_cards = create_hand(["8♣", "2♦"])  # High card
         self.game.bot.hole_cards = create_hand(["8♣", "5♦"])  # High card
         self.game.winner = self.game.determine_winner()
-        self.assertEqual(self.game.winner, self.game.bot)
+        self.assertIsNone(self.game.winner)  # Split, both play A Q 10 9 8
 
     def test_equal_combinations_pair(self):
         self.game.community_cards = create_hand(["10♠", "2♥", "4♥", "9♠", "5♦"])
@@ -110,7 +110,7 @@ class TestPokerGame(unittest.TestCase):
         self.game.user.hole_cards = create_hand(["4♦", "5♠"])
         self.game.bot.hole_cards = create_hand(["2♠", "5♥"])
         self.game.winner = self.game.determine_winner()
-        self.assertEqual(self.game.winner, self.game.user)
+        self.assertIsNone(self.game.winner)  # Split, both play K K 5 5 4
 
     def test_equal_combinations_full_house(self):
         self.game.community_cards = create_hand(["2♥", "K♥", "4♥", "5♦", "5♦"])
@@ -131,14 +131,14 @@ class TestPokerGame(unittest.TestCase):
         self.game.user.hole_cards = create_hand(["8♣", "7♦"])  # straight
         self.game.bot.hole_cards = create_hand(["7♠", "6♠"])  # straight
         self.game.winner = self.game.determine_winner()
-        self.assertEqual(self.game.winner, self.game.user)
+        self.assertIsNone(self.game.winner)  # Split, both play the straight of the board
 
     def test_equal_combinations_straight_flush(self):
         self.game.community_cards = create_hand(["9♠", "10♠", "J♠", "Q♠", "K♠"])
         self.game.user.hole_cards = create_hand(["8♠", "7♠"])  # straight flush
         self.game.bot.hole_cards = create_hand(["7♠", "6♠"])  # straight flush
         self.game.winner = self.game.determine_winner()
-        self.assertEqual(self.game.winner, self.game.user)
+        self.assertIsNone(self.game.winner)  # Split, both play the straight flush of the board
 
     def test_equal_combinations_royal_flush(self):
         self.game.community_cards = create_hand(["10♠", "Q♠", "K♠", "A♠", "J♠"])
@@ -0,0 +1,101 @@
+# Seeded dealing of card indices
+#
+# A Dealer draws the cards of whole batches of hands from a numpy Generator. deal returns an int8
+# array [hands, cards] of distinct card indices (CARDS[i] is the card) picked by a partial
+# Fisher-Yates shuffle of all the rows at once, decks returns whole shuffled decks. Dealers built
+# from the same seed deal the same cards, and spawn gives independent streams, e.g. one per worker
+# process, so parallel runs neither share nor repeat their deals. cards serves single hands (Game,
+# the trainers) from a batch dealt BATCH hands at a time, indices does the same for the smaller
+# decks of toy games (Kuhn poker).
+import numpy as np
+from cards import CARDS
+
+BATCH = 4096
+
+
+def deal_cards(dead, num, rng):
+    """
+    :param dead: array [N, k] of card indices that cannot be dealt
+    :param num: number of cards to deal to every row
+    :param rng: numpy Generator
+    :return: array [N, num] of distinct cards that are not in the row of dead
+    """
+    rows = np.arange(len(dead))
+    live = np.ones((len(dead), 52), dtype=bool)
+    for column in range(dead.shape[1]):
+        live[rows, dead[:, column]] = False
+    # Boolean indexing keeps the int8 cards, np.nonzero would build two int64 index arrays
+    deck = np.broadcast_to(np.arange(52, dtype=np.int8), live.shape)[live].reshape(len(dead), 52 - dead.shape[1])
+    return shuffle_rows(deck, num, rng)
+
+
+def shuffle_rows(deck, num, rng):
+    """
+    :param deck: array [N, cards] of the cards of every row, shuffled in place
+    :param num: number of cards to deal to every row
+    :param rng: numpy Generator
+    :return: array [N, num] of the first num cards of every row after a partial Fisher-Yates shuffle
+    """
+    rows = np.arange(len(deck))
+    for position in range(num):
+        swap = rng.integers(position, deck.shape[1], len(deck))
+        picked = deck[rows, swap]
+        deck[rows, swap] = deck[:, position]
+        deck[:, position] = picked
+    return deck[:, :num]
+
+
+class Dealer:
+    def __init__(self, seed=None, batch=BATCH):
+        """
+        :param seed: int, sequence of ints or numpy SeedSequence, fresh entropy by default
+        :param batch: hands dealt at once for cards
+        """
+        self.seed = seed if isinstance(seed, np.random.SeedSequence) else np.random.SeedSequence(seed)
+        self.generator = np.random.default_rng(self.seed)
+        self.batch = batch
+        # [rows, next row] of the hands dealt for indices, by (number of cards, deck size)
+        self.buffers = {}
+
+    def getstate(self):
+        # State of the generator and the buffered hands, restored by setstate like random.getstate
+        buffers = {key: (rows, position) for key, (rows, position) in self.buffers.items()}
+        return self.generator.bit_generator.state, buffers
+
+    def setstate(self, state):
+        generator, buffers = state
+        self.generator.bit_generator.state = generator
+        self.buffers = {key: [rows, position] for key, (rows, position) in buffers.items()}
+
+    def spawn(self, count):
+        # Dealers of independent streams
+        return [Dealer(seed, self.batch) for seed in self.seed.spawn(count)]
+
+    def deal(self, hands, num_cards=9, dead=None):
+        """
+        :param hands: number of hands
+        :param num_cards: cards of every hand
+        :param dead: array [hands, k] of card indices that cannot be dealt, none by default
+        :return: int8 array [hands, num_cards] of card indices
+        """
+        if dead is None:
+            dead = np.zeros((hands, 0), dtype=np.int8)
+        return deal_cards(dead, num_cards, self.generator)
+
+    def decks(self, count):
+        # Shuffled decks, int8 array [count, 52]
+        return np.argsort(self.generator.random((count, 52)), axis=1).astype(np.int8)
+
+    def indices(self, num, deck=52):
+        # Distinct indices in range(deck) of a single hand
+        buffer = self.buffers.get((num, deck))
+        if buffer is None or buffer[1] == len(buffer[0]):
+            rows = np.tile(np.arange(deck, dtype=np.int8), (self.batch, 1))
+            buffer = self.buffers[num, deck] = [shuffle_rows(rows, num, self.generator).tolist(), 0]
+        row = buffer[0][buffer[1]]
+        buffer[1] += 1
+        return row
+
+    def cards(self, num):
+        # Cards of a single hand
+        return [CARDS[index] for index in self.indices(num)]
@@ -0,0 +1,51 @@
+import unittest
+import numpy as np
+from cards import CARDS
+from dealer import Dealer
+from game import Game
+
+
+class TestDealer(unittest.TestCase):
+
+    def test_deal(self):
+        hands = Dealer(5).deal(2000, 9)
+        self.assertEqual((hands.shape, hands.dtype), ((2000, 9), np.int8))
+        self.assertTrue(all(len(set(hand)) == 9 for hand in hands.tolist()))
+        self.assertTrue((hands == Dealer(5).deal(2000, 9)).all())
+        # Dead cards are never dealt
+        dead = np.tile(np.arange(40, dtype=np.int8), (500, 1))
+        self.assertTrue((Dealer(6).deal(500, 12, dead) >= 40).all())
+        # Every card is dealt about as often
+        counts = np.bincount(hands.ravel(), minlength=52)
+        self.assertLess(abs(counts - 2000 * 9 / 52).max(), 80)
+
+    def test_streams(self):
+        first, second = Dealer(7).spawn(2)
+        again = Dealer(7).spawn(2)[0]
+        self.assertTrue((first.decks(100) == again.decks(100)).all())
+        self.assertFalse((first.deal(100) == second.deal(100)).all())
+        # Single hands are served in order from the dealt batches
+        dealer, batch = Dealer(8, batch=3), Dealer(8).deal(3, 4)
+        expected = [[CARDS[index] for index in row] for row in batch.tolist()]
+        self.assertEqual([dealer.cards(4) for _ in range(3)], expected)
+
+    def test_state(self):
+        # A dealer restored from a state deals what the saved one deals next, buffered hands included
+        dealer = Dealer(9, batch=5)
+        dealer.cards(7)
+        state = dealer.getstate()
+        expected = [dealer.cards(7) for _ in range(8)], dealer.deal(10).tolist()
+        restored = Dealer(10, batch=5)
+        restored.setstate(state)
+        self.assertEqual(([restored.cards(7) for _ in range(8)], restored.deal(10).tolist()), expected)
+
+    def test_game(self):
+        first, second = Game(seed=3), Game(seed=3)
+        self.assertEqual(first.cards_for_current_hand, second.cards_for_current_hand)
+        self.assertEqual([player.name for player in first.players], [player.name for player in second.players])
+        first.clear()
+        self.assertNotEqual(first.cards_for_current_hand, second.cards_for_current_hand)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,116 @@
+# Hand vs hand equity calculator
+#
+# The unknown cards (the rest of the board and, if it is not given, the villain hand) are
+# enumerated exactly when the number of outcomes is small (turn, river, flop against known
+# cards) and sampled otherwise. All the outcomes are settled at once with showdown.compare_batch.
+from itertools import combinations
+from math import comb, sqrt
+from statistics import NormalDist
+import numpy as np
+from cards import mask_of, remaining_cards
+from dealer import shuffle_rows
+from showdown import compare_batch
+
+MAX_ENUMERATION = 100_000
+SAMPLES = 10_000
+
+
+class Equity:
+    def __init__(self, win, tie, lose, samples, exact, confidence=0.95):
+        # Shares of the outcomes won, split and lost by the hero
+        self.win = win
+        self.tie = tie
+        self.lose = lose
+        self.samples = samples
+        self.exact = exact
+        self.confidence = confidence
+
+    @property
+    def equity(self):
+        # Expected share of the pot
+        return self.win + self.tie / 2
+
+    @property
+    def margin(self):
+        # Half width of the confidence interval of equity, 0 for an exact result
+        if self.exact:
+            return 0.0
+        z = NormalDist().inv_cdf(0.5 + self.confidence / 2)
+        variance = self.win + self.tie / 4 - self.equity ** 2
+        return z * sqrt(max(variance, 0.0) / self.samples)
+
+    @property
+    def confidence_interval(self):
+        return max(self.equity - self.margin, 0.0), min(self.equity + self.margin, 1.0)
+
+    def __str__(self):
+        return f'win: {self.win:.3f} | tie: {self.tie:.3f} | lose: {self.lose:.3f} | equity: {self.equity:.3f} ± {self.margin:.3f}'
+
+
+def _live_cards(dead):
+    return np.array([card.index for card in remaining_cards(mask_of(dead))], dtype=np.int8)
+
+
+def _enumerate(live, num_board, villain_known):
+    # Every board completion, combined with every villain hand made of the remaining cards
+    if num_board == 0:
+        boards = np.zeros((1, 0), dtype=np.int8)
+    else:
+        boards = np.array(list(combinations(live, num_board)), dtype=np.int8)
+    if villain_known:
+        return boards, None
+
+    hands = np.array(list(combinations(live, 2)), dtype=np.int8)
+    board_rows = np.repeat(np.arange(len(boards)), len(hands))
+    hand_rows = np.tile(np.arange(len(hands)), len(boards))
+    boards, hands = boards[board_rows], hands[hand_rows]
+    overlap = (boards[:, :, None] == hands[:, None, :]).any(axis=(1, 2))
+    return boards[~overlap], hands[~overlap]
+
+
+def _sample(live, num_board, villain_known, samples, rng):
+    # Partial Fisher-Yates shuffle of the live cards, done for all the samples at once. The live cards are the same
+    # for every sample, a single array tiled beats the per-row dead cards of dealer.deal_cards
+    num_cards = num_board + (0 if villain_known else 2)
+    picks = shuffle_rows(np.tile(live, (samples, 1)), num_cards, rng)
+    if villain_known:
+        return picks[:, :num_board], None
+    return picks[:, 2:num_cards], picks[:, :2]
+
+
+def equity(hero, villain=None, board=(), samples=SAMPLES, confidence=0.95, max_enumeration=MAX_ENUMERATION, rng=None):
+    """
+    :param hero: hero hole cards
+    :param villain: villain hole cards, None for a random hand
+    :param board: 0, 3, 4 or 5 community cards
+    :param samples: number of Monte Carlo samples when the exact enumeration is too large
+    :param confidence: confidence level of Equity.confidence_interval
+    :param max_enumeration: the largest number of outcomes enumerated exactly
+    :param rng: numpy Generator used for sampling, e.g. the generator of a dealer.Dealer
+    :return: Equity of the hero
+    """
+    villain_known = villain is not None
+    dead = list(hero) + list(board) + (list(villain) if villain_known else [])
+    live = _live_cards(dead)
+    num_board = 5 - len(board)
+
+    outcomes = comb(len(live), num_board)
+    if not villain_known:
+        outcomes *= comb(len(live) - num_board, 2)
+
+    exact = outcomes <= max_enumeration
+    if exact:
+        runouts, villain_hands = _enumerate(live, num_board, villain_known)
+    else:
+        rng = rng if rng is not None else np.random.default_rng()
+        runouts, villain_hands = _sample(live, num_board, villain_known, samples, rng)
+
+    num = len(runouts)
+    known_board = np.tile(np.array([card.index for card in board], dtype=np.int8), (num, 1))
+    full_board = np.concatenate([known_board, runouts], axis=1)
+    hero_hands = np.tile(np.array([card.index for card in hero], dtype=np.int8), (num, 1))
+    if villain_known:
+        villain_hands = np.tile(np.array([card.index for card in villain], dtype=np.int8), (num, 1))
+
+    win, lose, tie = compare_batch(hero_hands, villain_hands, full_board)
+    return Equity(float(win.mean()), float(tie.mean()), float(lose.mean()), num, exact, confidence)
@@ -0,0 +1,92 @@
+import os
+import tempfile
+import time
+import unittest
+import numpy as np
+from cards import create_hand
+from equity import equity
+from ranges import (CLASS_BY_NAME, CLASS_NAMES, PAIR_COUNTS, RangeEquity, build_equity_matrix, hand_class, hand_range,
+                    load_equity_matrix)
+
+
+class TestEquity(unittest.TestCase):
+
+    def test_river_is_exact(self):
+        result = equity(create_hand(["A♠", "A♥"]), create_hand(["K♠", "K♥"]),
+                        create_hand(["2♣", "7♦", "J♥", "Q♣", "3♦"]))
+        self.assertTrue(result.exact)
+        self.assertEqual(result.samples, 1)
+        self.assertEqual(result.win, 1)
+
+    def test_flop_is_symmetric(self):
+        board = create_hand(["2♣", "7♦", "J♥"])
+        hero, villain = create_hand(["A♠", "K♠"]), create_hand(["Q♦", "Q♥"])
+        forward = equity(hero, villain, board)
+        backward = equity(villain, hero, board)
+        self.assertTrue(forward.exact)
+        self.assertEqual(forward.samples, 990)
+        self.assertAlmostEqual(forward.win, backward.lose)
+        self.assertAlmostEqual(forward.equity + backward.equity, 1)
+
+    def test_preflop_monte_carlo(self):
+        # Pocket aces win about 85.2% of the pot against a random hand
+        result = equity(create_hand(["A♠", "A♥"]), samples=50_000, rng=np.random.default_rng(0))
+        self.assertFalse(result.exact)
+        low, high = result.confidence_interval
+        self.assertLess(low, 0.852)
+        self.assertGreater(high, 0.852)
+
+    def test_flop_sampling_time(self):
+        # A flop against a random hand is sampled in less than 5 ms, the best of a few runs
+        hero, board = create_hand(["A♠", "K♠"]), create_hand(["2♣", "7♦", "J♥"])
+        rng = np.random.default_rng(0)
+        times = []
+        for _ in range(5):
+            start = time.perf_counter()
+            result = equity(hero, board=board, rng=rng)
+            times.append(time.perf_counter() - start)
+        self.assertFalse(result.exact)
+        self.assertLess(min(times), 0.005)
+
+
+class TestRanges(unittest.TestCase):
+
+    def test_hand_classes(self):
+        self.assertEqual(len(set(CLASS_NAMES)), 169)
+        self.assertEqual(CLASS_NAMES[hand_class(create_hand(["A♠", "K♠"]))], 'AKs')
+        self.assertEqual(CLASS_NAMES[hand_class(create_hand(["K♦", "A♠"]))], 'AKo')
+        self.assertEqual(CLASS_NAMES[hand_class(create_hand(["2♦", "2♠"]))], '22')
+        self.assertEqual(PAIR_COUNTS.sum(), 1326 * 1225)
+        self.assertEqual(PAIR_COUNTS[CLASS_BY_NAME['AA'], CLASS_BY_NAME['AKs']], 12)
+
+    def test_range_equity(self):
+        with tempfile.TemporaryDirectory() as directory:
+            matrix = build_equity_matrix(os.path.join(directory, 'equity.npy'), samples=20,
+                                         rng=np.random.default_rng(0))
+            np.testing.assert_allclose(matrix + matrix.T, 1, atol=1e-6)
+            ranges = RangeEquity(matrix)
+        everything = np.ones(169)
+        self.assertAlmostEqual(ranges.equity(everything, everything), 0.5)
+        premium = hand_range(['AA', 'KK', 'QQ'])
+        self.assertAlmostEqual(ranges.equity(premium, everything) + ranges.equity(everything, premium), 1)
+        self.assertGreater(ranges.equity(premium, everything), 0.7)
+
+    def test_interrupted_build(self):
+        class Interrupted(np.random.Generator):
+            def integers(self, *args, **kwargs):
+                raise KeyboardInterrupt
+
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'equity.npy')
+            with self.assertRaises(KeyboardInterrupt):
+                build_equity_matrix(path, samples=20, rng=Interrupted(np.random.PCG64(0)))
+            # Neither a partial matrix nor the temporary file is left
+            self.assertEqual(os.listdir(directory), [])
+            with self.assertRaises(FileNotFoundError):
+                load_equity_matrix(path, build=False)
+            build_equity_matrix(path, samples=20, rng=np.random.default_rng(0))
+            self.assertEqual(os.listdir(directory), ['equity.npy'])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,172 @@
+# Table-driven hand evaluator for 5 to 7 cards
+#
+# Every hand is scored by one integer, higher is better:
+#   category << 20 | r1 << 16 | r2 << 12 | r3 << 8 | r4 << 4 | r5
+# where category follows Game.determine_winner numbering (1 - high card ... 9 - straight flush)
+# and r1..r5 are the ranks (2-14) of the five best cards in comparison order.
+#
+# Non-flush hands only depend on the multiset of ranks, so each card adds 5 ** (rank - 2)
+# to a key (a rank appears at most 4 times, so the base-5 digits never overflow) and the
+# key is looked up in a precomputed table. The suit counts are accumulated in the same
+# integer above bit 31 (3 bits per suit), so a single addition per card is enough to tell
+# whether a flush is possible. Flushes are scored from a 8192-entry table indexed by the
+# 13-bit rank mask of the flush suit.
+from itertools import combinations_with_replacement
+
+HIGH_CARD = 1
+PAIR = 2
+TWO_PAIRS = 3
+THREE_OF_KIND = 4
+STRAIGHT = 5
+FLUSH = 6
+FULL_HOUSE = 7
+FOUR_OF_KIND = 8
+STRAIGHT_FLUSH = 9
+ROYAL_FLUSH = 10
+
+SUIT_SHIFT = 31
+RANK_KEY_MASK = (1 << SUIT_SHIFT) - 1
+
+# Straight masks from the highest (A-K-Q-J-10) to the lowest, the 'wheel' A-2-3-4-5
+STRAIGHTS = [(0b11111 << (top - 6), top) for top in range(14, 5, -1)] + [(0b1000000001111, 5)]
+
+
+def _strength(category, ranks):
+    ranks = (list(ranks) + [0] * 5)[:5]
+    return (category << 20 | ranks[0] << 16 | ranks[1] << 12 | ranks[2] << 8 | ranks[3] << 4 | ranks[4])
+
+
+def _straight_top(mask):
+    for straight, top in STRAIGHTS:
+        if mask & straight == straight:
+            return top
+    return 0
+
+
+def _score_counts(counts):
+    # counts[i] - number of cards of rank i + 2, suits are ignored
+    mask = 0
+    for i in range(13):
+        if counts[i]:
+            mask |= 1 << i
+
+    # Ranks grouped by multiplicity, each group is sorted by descending rank
+    groups = {1: [], 2: [], 3: [], 4: []}
+    for i in range(12, -1, -1):
+        if counts[i]:
+            groups[counts[i]].append(i + 2)
+    ranks = [i + 2 for i in range(12, -1, -1) if counts[i]]
+
+    if groups[4]:
+        quads = groups[4][0]
+        return _strength(FOUR_OF_KIND, [quads] * 4 + [r for r in ranks if r != quads][:1])
+
+    if groups[3] and len(groups[3]) + len(groups[2]) >= 2:
+        trips = groups[3][0]
+        pair = max(r for r in groups[3][1:] + groups[2])
+        return _strength(FULL_HOUSE, [trips] * 3 + [pair] * 2)
+
+    top = _straight_top(mask)
+    if top:
+        return _strength(STRAIGHT, [top])
+
+    if groups[3]:
+        trips = groups[3][0]
+        return _strength(THREE_OF_KIND, [trips] * 3 + [r for r in ranks if r != trips][:2])
+
+    if len(groups[2]) >= 2:
+        high, low = groups[2][:2]
+        return _strength(TWO_PAIRS, [high] * 2 + [low] * 2 + [r for r in ranks if r not in (high, low)][:1])
+
+    if groups[2]:
+        pair = groups[2][0]
+        return _strength(PAIR, [pair] * 2 + [r for r in ranks if r != pair][:3])
+
+    return _strength(HIGH_CARD, ranks[:5])
+
+
+def _score_flush(mask):
+    top = _straight_top(mask)
+    if top:
+        return _strength(STRAIGHT_FLUSH, [top])
+    return _strength(FLUSH, [i + 2 for i in range(12, -1, -1) if mask >> i & 1][:5])
+
+
+def _build_tables():
+    rank_table = {}
+    for num_cards in range(5, 8):
+        for hand in combinations_with_replacement(range(13), num_cards):
+            counts = [0] * 13
+            for i in hand:
+                counts[i] += 1
+            if max(counts) > 4:
+                continue
+            rank_table[sum(5 ** i for i in hand)] = _score_counts(counts)
+
+    flush_table = [0] * 8192
+    for mask in range(8192):
+        if bin(mask).count('1') >= 5:
+            flush_table[mask] = _score_flush(mask)
+
+    # Suit counts are packed as 4 fields of 3 bits, the flush suit is the one that has 5+ cards
+    flush_suit = [-1] * 4096
+    for packed in range(4096):
+        for suit in range(4):
+            if packed >> (3 * suit) & 0b111 >= 5:
+                flush_suit[packed] = suit
+
+    return rank_table, flush_table, flush_suit
+
+
+RANK_TABLE, FLUSH_TABLE, FLUSH_SUIT = _build_tables()
+
+# QUINARY[ranks] - the rank key of a 13-bit rank mask of a single suit
+QUINARY = [sum(5 ** i for i in range(13) if ranks >> i & 1) for ranks in range(8192)]
+
+# CARD_KEYS[card.index] - the amount that a card adds to the hand key
+CARD_KEYS = [5 ** (index % 13) + (1 << (SUIT_SHIFT + 3 * (index // 13))) for index in range(52)]
+
+
+def evaluate(cards):
+    """
+    :param cards: 5 to 7 Card objects in any order
+    :return: hand strength, the greater the better
+    """
+    key = 0
+    for card in cards:
+        key += CARD_KEYS[card.index]
+
+    suit = FLUSH_SUIT[key >> SUIT_SHIFT]
+    if suit < 0:
+        return RANK_TABLE[key & RANK_KEY_MASK]
+
+    mask = 0
+    for card in cards:
+        if card.suit == suit:
+            mask |= 1 << (card.rank - 2)
+    return FLUSH_TABLE[mask]
+
+
+def evaluate_mask(mask):
+    """
+    :param mask: 5 to 7 cards as a bitmask (see cards.mask_of)
+    :return: hand strength, the same as evaluate for these cards
+    """
+    clubs = mask & 0x1FFF
+    diamonds = (mask >> 13) & 0x1FFF
+    hearts = (mask >> 26) & 0x1FFF
+    spades = mask >> 39
+
+    # FLUSH_TABLE is 0 for a suit with less than 5 cards, and 7 cards make at most one flush
+    flush = FLUSH_TABLE[clubs] or FLUSH_TABLE[diamonds] or FLUSH_TABLE[hearts] or FLUSH_TABLE[spades]
+    if flush:
+        return flush
+    return RANK_TABLE[QUINARY[clubs] + QUINARY[diamonds] + QUINARY[hearts] + QUINARY[spades]]
+
+
+def hand_category(strength):
+    # Returns the combination number used by Game.determine_winner (1 - high card ... 10 - royal flush)
+    category = strength >> 20
+    if category == STRAIGHT_FLUSH and (strength >> 16) & 0xF == 14:
+        return ROYAL_FLUSH
+    return category
@@ -0,0 +1,83 @@
+import unittest
+import numpy as np
+from evaluator import evaluate, evaluate_mask, hand_category
+from showdown import evaluate_batch, compare_batch
+from cards import CARDS, FULL_DECK_MASK, create_hand, Deck, cards_of, mask_of, remaining_cards
+
+
+class TestEvaluator(unittest.TestCase):
+
+    def test_categories(self):
+        hands = {
+            1: ["2♠", "7♦", "9♠", "J♣", "K♠", "3♦", "4♣"],
+            2: ["2♠", "2♦", "9♠", "J♣", "K♠", "3♦", "4♣"],
+            3: ["2♠", "2♦", "9♠", "9♣", "K♠", "3♦", "4♣"],
+            4: ["2♠", "2♦", "2♣", "9♣", "K♠", "3♦", "4♣"],
+            5: ["A♠", "2♦", "3♣", "4♣", "5♠", "9♦", "K♣"],
+            6: ["2♠", "7♠", "9♠", "J♠", "K♠", "3♦", "4♣"],
+            7: ["2♠", "2♦", "2♣", "9♣", "9♠", "3♦", "4♣"],
+            8: ["2♠", "2♦", "2♣", "2♥", "9♠", "3♦", "4♣"],
+            9: ["A♠", "2♠", "3♠", "4♠", "5♠", "9♦", "K♣"],
+            10: ["A♠", "K♠", "Q♠", "J♠", "10♠", "9♦", "2♣"],
+        }
+        for category, hand in hands.items():
+            self.assertEqual(hand_category(evaluate(create_hand(hand))), category)
+
+    def test_wheel_is_lowest_straight(self):
+        wheel = evaluate(create_hand(["A♠", "2♦", "3♣", "4♣", "5♠"]))
+        six_high = evaluate(create_hand(["6♠", "2♦", "3♣", "4♣", "5♠"]))
+        self.assertLess(wheel, six_high)
+
+    def test_best_five_of_seven(self):
+        # The sixth and the seventh cards do not play, so the hands are equal
+        board = ["A♠", "K♦", "9♣", "7♣", "4♠"]
+        self.assertEqual(evaluate(create_hand(board + ["2♦", "3♣"])),
+                         evaluate(create_hand(board + ["3♦", "2♥"])))
+        self.assertGreater(evaluate(create_hand(board + ["5♦", "2♣"])),
+                           evaluate(create_hand(board + ["3♦", "2♥"])))
+
+    def test_order_independent(self):
+        hand = ["Q♥", "2♥", "J♥", "9♥", "5♥", "5♦", "Q♣"]
+        self.assertEqual(evaluate(create_hand(hand)), evaluate(create_hand(hand[::-1])))
+
+    def test_mask_matches_evaluate(self):
+        deck = Deck()
+        for _ in range(2000):
+            hand = deck.sample(7)
+            self.assertEqual(evaluate_mask(mask_of(hand)), evaluate(hand))
+
+    def test_masks(self):
+        hand = create_hand(["A♠", "2♦", "9♣", "9♥"])
+        mask = mask_of(hand)
+        self.assertEqual(mask.bit_count(), 4)
+        self.assertEqual(sorted(cards_of(mask), key=lambda card: card.index), sorted(hand, key=lambda card: card.index))
+        self.assertEqual(mask_of(cards_of(FULL_DECK_MASK)), FULL_DECK_MASK)
+        rest = remaining_cards(mask)
+        self.assertEqual(len(rest), 48)
+        self.assertEqual(mask_of(rest), FULL_DECK_MASK & ~mask)
+        self.assertEqual(rest, [card for card in CARDS if card not in hand])
+
+
+class TestShowdown(unittest.TestCase):
+
+    def setUp(self):
+        rng = np.random.default_rng(0)
+        self.deck = Deck()
+        self.cards = np.argsort(rng.random((2000, 52)), axis=1)[:, :9].astype(np.int8)
+
+    def test_batch_matches_evaluate(self):
+        for board_size in (3, 4, 5):
+            board = self.cards[:, 4:4 + board_size]
+            strengths = evaluate_batch(self.cards[:, :2], board)
+            for row, strength in zip(np.concatenate([self.cards[:, :2], board], axis=1), strengths):
+                self.assertEqual(evaluate([self.deck[i] for i in row]), strength)
+
+    def test_compare_batch(self):
+        win, lose, tie = compare_batch(self.cards[:, :2], self.cards[:, 2:4], self.cards[:, 4:])
+        self.assertTrue(np.all(win.astype(int) + lose + tie == 1))
+        swapped = compare_batch(self.cards[:, 2:4], self.cards[:, :2], self.cards[:, 4:])
+        self.assertTrue(np.array_equal(win, swapped[1]))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,14 +1,18 @@
-import random
-import copy
-from cards import Card, Deck
+from dealer import Dealer
+from evaluator import evaluate, hand_category
+from game_state import FOLD, SHOWDOWN, SMALL_BLIND, STARTING_CHIPS, GameState
 from players import Bot, User
+from resolver import Resolver
 
 class Game:
-    def __init__(self):
+    def __init__(self, seed=None):
+        """
+        :param seed: seed of the dealer, the same seed deals the same cards and positions
+        """
 
         # Game parameters
-        self.starting_chips = 5000
-        self.small_blind = 250
+        self.starting_chips = STARTING_CHIPS
+        self.small_blind = SMALL_BLIND
         self.playing_style = 'Optimal'
 
         # User
@@ -21,18 +25,19 @@ class Game:
         self.bot.game = self
         self.bot.chips = self.starting_chips
         self.bot.style = self.playing_style
+        # The bot re-solves the turn and the river
+        self.bot.resolver = Resolver(self.bot.abstraction)
 
         # Positions distribution
         self.players = [self.bot, self.user]
-        random.shuffle(self.players)
+        # Cards and positions come from the dealer
+        self.dealer = Dealer(seed)
+        self.players = [self.players[i] for i in self.dealer.generator.permutation(2)]
         self.sb_pos = 0
         self.bb_pos = 1
 
         # Cards
-        self.deck = Deck()
-        random.shuffle(self.deck)
-
-        self.cards_for_current_hand = random.sample(self.deck, 9)
+        self.cards_for_current_hand = self.dealer.cards(9)
         self.community_cards = []
 
         # Bets
@@ -42,6 +47,11 @@ class Game:
         self.bot.bet = 0
         self.pot = 0
         self.winner = None
+        # Betting state of the current hand, the small blind is position 0
+        self.state = None
+        # State at the start of the current street and the (action, bet) of the street
+        self.street_start = None
+        self.street_actions = []
 
     def play(self):
         # Messages about game initialization
@@ -53,6 +63,8 @@ class Game:
             print(f':::: Hand #{i}')
             print()
             # Preflop
+            self.state = GameState.start(small_blind=self.small_blind,
+                                         chips=(self.players[self.sb_pos].chips, self.players[self.bb_pos].chips))
             self.players[self.sb_pos].make_bet(self.small_blind)
             print(f':::: SB: {self.players[self.sb_pos].name}')
 
@@ -125,7 +137,7 @@ class Game:
 
     def clear(self):
         self.community_cards = []
-        self.cards_for_current_hand = random.sample(self.deck, 9)
+        self.cards_for_current_hand = self.dealer.cards(9)
         self.pot = 0
 
         self.user.bet = 0
@@ -156,103 +168,38 @@ class Game:
         :param preflop: determines game stage
         :return: False if fold, True otherwise
         """
-        if preflop:
-            i = self.sb_pos
-            player = self.players[i]  # SB at preflop
-            opponent = self.players[not i]  # BB at preflop
-
-            # Cases if a player is all-in because of blinds
-            if player.chips == 0:
-                print(f':::: {self.user.name} bet: {self.user.bet} | {self.bot.name} bet: {self.bot.bet} | total: {self.pot}')
-                print(f'{player.name} is already all-in')
-                return True
-
-            elif opponent.chips == 0:
-                print(f':::: {self.user.name} bet: {self.user.bet} | {self.bot.name} bet: {self.bot.bet} | total: {self.pot}')
-                act, bet = player.ask_action()
-                if act == 'call':
-                    # Bet the full big blind
-                    player.make_bet(self.big_blind - player.bet)
-                    print(f'{opponent.name} is already all-in')
-                    self.bot.info_set += 'c'
-                    return True
-                elif act == 'fold':
-                    player.fold = True
-                    print(f'{player.name} has folded')
-                    self.bot.info_set += 'p'
-                    return False
-                else:
-                    raise ValueError('Invalid action')
-        else:
-            i = self.bb_pos
-            player = self.players[i]
-            opponent = self.players[not i]
-
-            # Case if a player is all-in from the previous bidding
-            if player.chips == 0 or opponent.chips == 0:
-                print('There is a player already all in')
-                return True
-
-        # Usual bidding
-        asked = 0
-        while True:
+        # The rules are those of GameState, the players mirror its bets
+        state = self.state
+        if state.outcome == SHOWDOWN:
+            print(f':::: {self.user.name} bet: {self.user.bet} | {self.bot.name} bet: {self.bot.bet} | total: {self.pot}')
+            print('There is a player already all in')
+            return True
+
+        street = state.street
+        self.street_start = state
+        self.street_actions = []
+        while state.outcome is None and state.street == street:
             print(f':::: {self.user.name} bet: {self.user.bet} | {self.bot.name} bet: {self.bot.bet} | total: {self.pot}')
+            player = self.players[self.sb_pos if state.player == 0 else self.bb_pos]
 
             act, bet = player.ask_action()
-            prop_act = False
-            asked += 1
-
-            while not prop_act:
-                try:
-                    if act == 'fold':
-                        player.fold = True
-                        print(f'{player.name} has folded')
-                        self.bot.info_set += 'p'
-                        return False
-
-                    elif act == 'check':
-                        if player.bet != opponent.bet:
-                            raise ValueError('Invalid action')
-                        else:
-                            self.bot.info_set += 'p'
-                            if asked >= 2:
-                                return True
-
-                    elif act == 'call':
-                        if player.bet < opponent.bet:
-                            self.bot.info_set += 'c'
-                            player.make_bet(opponent.bet - player.bet)
-                        else:
-                            raise ValueError('Invalid action')
-                        if asked >= 2:
-                            return True
-
-                    elif act == 'raise':
-                        if opponent.chips == 0:
-                            raise ValueError('Invalid action')
-
-                        if self.min_bet <= bet < player.chips and opponent.bet - player.bet < bet:
-                            # Usual case, bet is greater than minimum bet
-                            player.make_bet(bet)
-                            self.bot.info_set += 'b'
-                        elif bet == player.chips and opponent.bet - player.bet < bet:
-                            # All in case, bet can be less than minimum bet
-                            player.make_bet(bet)
-                            self.bot.info_set += 'b'
-                        else:
-                            raise ValueError('Invalid action')
+            while not state.is_valid(act, bet):
+                print("Invalid action. Please try again.")
+                act, bet = player.ask_action()
 
-                    else:
-                        raise ValueError('Invalid action')
-                    prop_act = True
-                except:
-                    print("Invalid action. Please try again.")
-                    act, bet = player.ask_action()
+            next_state = state.apply(act, bet)
+            amount = next_state.bets[state.player] - state.bets[state.player]
+            if amount:
+                player.make_bet(amount)
+            self.bot.info_set += self.bot.action_key(state, act, bet)
+            self.street_actions.append((act, bet))
+            if act == 'fold':
+                player.fold = True
+                print(f'{player.name} has folded')
+            state = next_state
 
-            # Ask next
-            i = not i
-            player = self.players[i]
-            opponent = self.players[not i]
+        self.state = state
+        return state.outcome != FOLD
 
     def determine_winner(self):
         winner = None
@@ -270,72 +217,18 @@ class Game:
             10: "royal flush",
         }
 
-        user_hand = sorted(self.user.hole_cards + self.community_cards, key=lambda x: x.rank)
-        user_combo = self.evaluate_hand(user_hand)
-        print(f'{self.user.name} has {combinations[user_combo[0]]}')
+        user_strength = evaluate(self.user.hole_cards + self.community_cards)
+        print(f'{self.user.name} has {combinations[hand_category(user_strength)]}')
 
-        bot_hand = sorted(self.bot.hole_cards + self.community_cards, key=lambda x: x.rank)
-        bot_combo = self.evaluate_hand(bot_hand)
-        print(f'{self.bot.name} has {combinations[bot_combo[0]]}')
+        bot_strength = evaluate(self.bot.hole_cards + self.community_cards)
+        print(f'{self.bot.name} has {combinations[hand_category(bot_strength)]}')
 
-        if user_combo[0] > bot_combo[0]:
+        # Equal strengths are a split pot (no winner), the strengths already rank the kickers as in
+        # showdown.compare_batch
+        if user_strength > bot_strength:
             winner = self.user
-        elif bot_combo[0] > user_combo[0]:
+        elif bot_strength > user_strength:
             winner = self.bot
-        else:
-            # Equal combinations
-            if user_combo[0] == 1:
-                # High card
-                winner = self.compare_kicker()
-
-            elif user_combo[0] == 2 or user_combo[0] == 4 or user_combo[0] == 8:
-                # Pair or three of kind or four of kind
-                if user_combo[1] > bot_combo[1]:
-                    winner = self.user
-                elif user_combo[1] < bot_combo[1]:
-                    winner = self.bot
-                else:
-                    winner = self.compare_kicker()
-
-            elif user_combo[0] == 3 or user_combo[0] == 7:
-                # Two pairs or full house
-                if user_combo[1][0] > bot_combo[1][0]:
-                    winner = self.user
-                elif user_combo[1][0] < bot_combo[1][0]:
-                    winner = self.bot
-                else:
-                    if user_combo[1][1] > bot_combo[1][1]:
-                        winner = self.user
-                    elif user_combo[1][1] < bot_combo[1][1]:
-                        winner = self.bot
-                    else:
-                        winner = self.compare_kicker()
-
-            elif user_combo[0] == 5 or user_combo[0] == 9:
-                # Straight or straight flush
-                if user_combo[1] > bot_combo[1]:
-                    winner = self.user
-                elif user_combo[1] < bot_combo[1]:
-                    winner = self.bot
-                else:
-                    winner = self.compare_kicker()
-
-            elif user_combo[0] == 6:
-                # Flush
-                for i in range(5):
-                    if user_combo[1][i] > bot_combo[1][i]:
-                        winner = self.user
-                        break
-                    if bot_combo[1][i] > user_combo[1][i]:
-                        winner = self.bot
-                        break
-
-                if winner is None:
-                    winner = self.compare_kicker()
-
-            elif user_combo[0] == 10:
-                # Royal flush
-                winner = self.compare_kicker()
 
         return winner
 
@@ -345,162 +238,6 @@ class Game:
         else:
             return self.user
 
-    def evaluate_hand(self, sorted_cards):
-        # Cards are sorted by ascending rank
-        hand_evaluators = [
-            self.royal_flush,
-            self.straight_flush,
-            self.four_of_kind,
-            self.full_house,
-            self.flush,
-            self.straight,
-            self.three_of_kind,
-            self.pair_or_two
-        ]
-
-        for evaluator in hand_evaluators:
-            combo = evaluator(sorted_cards)
-            if combo is not None:
-                return combo
-
-        # High card
-        return (1, 0)
-
-    def royal_flush(self, cards):
-        # Cards are sorted by ascending rank
-        if self.straight_flush(cards[2:]):
-            if cards[-1].rank == 14:
-                return 10, 0
-        return None
-
-    def straight_flush(self, cards):
-        if len(cards) == 0:
-            return None
-        # Cards are sorted by ascending rank
-        # The 'wheel' case: A2345
-        cards2 = copy.deepcopy(cards)
-        if cards2[-1].rank == 14:
-            cards2.insert(0, Card(rank=1, suit=cards2[-1].suit))
-            cards2[0].rank = 1
-
-        count = 1
-        max_count = 1
-        max_card = None
-        for i in range(0, len(cards2)-1):
-            if cards2[i].rank - cards2[i + 1].rank == -1 and cards2[i].suit == cards2[i + 1].suit:
-                count += 1
-                max_count = max(max_count, count)
-                max_card = cards2[i+1]
-            else:
-                count = 1
-        if max_count >= 5:
-            return 9, max_card.rank
-        else:
-            return None
-
-    def four_of_kind(self, cards):
-        # Cards are sorted by ascending rank
-        for i in range(len(cards) - 3):
-            if cards[i].rank == cards[i + 1].rank == cards[i + 2].rank == cards[i + 3].rank:
-                return 8, cards[i].rank
-        return None
-
-    def full_house(self, cards):
-        # Cards are sorted by ascending rank
-        counts = {}
-        for card in cards:
-            rank = card.rank
-            if rank in counts:
-                counts[rank] += 1
-            else:
-                counts[rank] = 1
-
-        counts = sorted(counts.items(), key=lambda x: (x[1], x[0]), reverse=True)
-
-        if counts[0][1] >= 3 and counts[1][1] >= 2:
-            return 7, [counts[0][0], counts[1][0]]
-
-        return None
-
-    def flush(self, cards):
-        # Cards are sorted by ascending rank
-        counts = {suit: [] for suit in range(4)}
-        for card in cards:
-            counts[card.suit].append(card.rank)
-
-        max_count = max(len(suit_cards) for suit_cards in counts.values())
-        if max_count >= 5:
-            flush_suit = max(counts, key=lambda x: len(counts[x]))
-            flush_ranks = sorted(counts[flush_suit], reverse=True)
-            # Ranks are sorted by descending order
-            return 6, flush_ranks, flush_suit
-        else:
-            return None
-
-    def straight(self, cards):
-        # Cards are sorted by ascending rank
-        # The 'wheel' case: A2345
-        cards2 = copy.deepcopy(cards)
-        if cards2[-1].rank == 14:
-            cards2.insert(0, Card(rank=1, suit=cards2[-1].suit))
-            cards2[0].rank = 1
-
-        count = 1
-        max_count = 1
-        max_card = None
-        for i in range(0, len(cards2) - 1):
-            if cards2[i].rank - cards2[i + 1].rank == -1:
-                count += 1
-                max_count = max(max_count, count)
-                max_card = cards2[i + 1]
-            else:
-                count = 1
-        if max_count >= 5:
-            return 5, max_card.rank
-        else:
-            return None
-
-    def three_of_kind(self, cards):
-        # Cards are sorted by ascending rank
-        for i in range(len(cards) - 2):
-            if cards[i].rank == cards[i + 1].rank == cards[i + 2].rank:
-                return 4, cards[i].rank
-        return None
-
-    def pair_or_two(self, cards):
-        # Cards are sorted by ascending rank
-        pairs = []
-        for i in range(len(cards) - 1):
-            if cards[i].rank == cards[i + 1].rank:
-                # In the result pairs are sorted by descending rank
-                pairs.insert(0, cards[i].rank)
-        if len(pairs) >= 2:
-            return 3, pairs
-        elif len(pairs) == 1:
-            return 2, pairs[0]
-        else:
-            return None
-
-    def compare_kicker(self):
-        # Cards are sorted by descending rank
-        user_cards = sorted(self.user.hole_cards, key=lambda x: x.rank, reverse=True)
-        bot_cards = sorted(self.bot.hole_cards, key=lambda x: x.rank, reverse=True)
-        winner = None
-
-        if user_cards and bot_cards:
-            if user_cards[0].rank > bot_cards[0].rank:
-                winner = self.user
-            elif user_cards[0].rank < bot_cards[0].rank:
-                winner = self.bot
-            else:
-                if len(user_cards) > 1 and len(bot_cards) > 1:
-                    if user_cards[1].rank > bot_cards[1].rank:
-                        winner = self.user
-                    elif user_cards[1].rank < bot_cards[1].rank:
-                        winner = self.bot
-
-        return winner
-
 
 if __name__ == '__main__':
     game = Game()
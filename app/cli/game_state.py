@@ -0,0 +1,162 @@
+# Immutable state of a heads-up no-limit hand
+#
+# A GameState is a tuple: (street, player, asked, bets, chips, history, min_bet, outcome). apply returns
+# a new state and never changes the old one, so a state can be shared by the branches of a tree
+# traversal, kept as a key or sent to another process. The rules are those of Game.bidding:
+#
+#   - the blinds are posted by position 0 (small blind) and 1 (big blind), bets add up over the streets
+#   - the small blind acts first preflop and the big blind on the flop, turn and river
+#   - a check or a call ends the street once both players have acted (asked >= 2)
+#   - a raise puts in bet chips: more than the call and at least min_bet, or all the chips left
+#   - nobody can raise a player who is all-in, and the streets are skipped once a player is all-in
+#
+# A call that puts a player all-in also ends the street (Game would then ask a player who can only fold).
+# street is the number of board cards (0, 3, 4, 5), history holds the actions of the street as in the
+# info sets ('p' - check or fold, 'c' - call, 'b' - raise), outcome is None while the hand is played,
+# FOLD or SHOWDOWN at the end.
+from operator import itemgetter
+
+STARTING_CHIPS = 5000
+SMALL_BLIND = 250
+BIG_BLIND = 2 * SMALL_BLIND
+STREETS = (0, 3, 4, 5)
+NEXT_STREET = {0: 3, 3: 4, 4: 5}
+FOLD = 'fold'
+SHOWDOWN = 'showdown'
+# Character of an action in the histories
+ACTION_KEYS = {'fold': 'p', 'check': 'p', 'call': 'c', 'raise': 'b'}
+
+
+class GameState(tuple):
+    __slots__ = ()
+
+    street = property(itemgetter(0))
+    # Position to act, or the position that folded
+    player = property(itemgetter(1))
+    asked = property(itemgetter(2))
+    # (small blind, big blind) chips put in the pot and left in the stacks
+    bets = property(itemgetter(3))
+    chips = property(itemgetter(4))
+    history = property(itemgetter(5))
+    min_bet = property(itemgetter(6))
+    outcome = property(itemgetter(7))
+
+    @classmethod
+    def start(cls, starting_chips=STARTING_CHIPS, small_blind=SMALL_BLIND, chips=None):
+        """
+        :param starting_chips: stack of both players
+        :param small_blind: small blind, the big blind and the minimum bet are twice as much
+        :param chips: (small blind, big blind) stacks when they are not equal
+        :return: state after the blinds
+        """
+        stacks = chips if chips is not None else (starting_chips, starting_chips)
+        if min(stacks) <= 0:
+            raise ValueError('No chips left to post the blinds')
+        big_blind = 2 * small_blind
+        bets = (min(small_blind, stacks[0]), min(big_blind, stacks[1]))
+        state = cls((0, 0, 0, bets, (stacks[0] - bets[0], stacks[1] - bets[1]), '', big_blind, None))
+        # The small blind is all-in, or can only call the big blind that already is
+        if state.chips[0] == 0 or (state.chips[1] == 0 and bets[0] >= bets[1]):
+            return state._end_street()
+        return state
+
+    @property
+    def is_terminal(self):
+        return self[7] is not None
+
+    @property
+    def pot(self):
+        return self[3][0] + self[3][1]
+
+    @property
+    def to_call(self):
+        bets = self[3]
+        return bets[1 - self[1]] - bets[self[1]]
+
+    def raise_range(self):
+        # (smallest, largest) valid raise, every bet in between is valid, None if the player cannot raise
+        player = self[1]
+        to_call, chips = self.to_call, self[4][player]
+        if self[7] is not None or self[4][1 - player] == 0 or chips <= to_call:
+            return None
+        return min(max(self[6], to_call + 1), chips), chips
+
+    def legal_actions(self):
+        if self[7] is not None:
+            return ()
+        actions = ('fold', 'call') if self.to_call > 0 else ('fold', 'check')
+        return actions + ('raise',) if self.raise_range() is not None else actions
+
+    def is_valid(self, act, bet=0):
+        if self[7] is not None:
+            return False
+        if act == 'fold':
+            return True
+        if act == 'check':
+            return self.to_call == 0
+        if act == 'call':
+            return self.to_call > 0
+        if act == 'raise':
+            bounds = self.raise_range()
+            return bounds is not None and bounds[0] <= bet <= bounds[1]
+        return False
+
+    def apply(self, act, bet=0):
+        """
+        :param act: 'fold', 'check', 'call' or 'raise'
+        :param bet: chips put in by a raise
+        :return: the state after the action
+        """
+        # The checks of is_valid are inlined, apply is the hot path of the simulations
+        street, player, asked, bets, chips, history, min_bet, outcome = self
+        opponent = 1 - player if outcome is None else None
+        if act == 'check':
+            if outcome is not None or bets[0] != bets[1]:
+                raise ValueError('Invalid action')
+            if asked:
+                return GameState((street, opponent, 2, bets, chips, history + 'p', min_bet, None))._end_street()
+            return GameState((street, opponent, 1, bets, chips, history + 'p', min_bet, None))
+        if act == 'call':
+            if outcome is not None or bets[player] >= bets[opponent]:
+                raise ValueError('Invalid action')
+            amount = min(bets[opponent] - bets[player], chips[player])
+            history += 'c'
+        elif act == 'raise':
+            if outcome is not None or chips[opponent] == 0:
+                raise ValueError('Invalid action')
+            to_call = bets[opponent] - bets[player]
+            if not (to_call < bet and (min_bet <= bet < chips[player] or bet == chips[player])):
+                raise ValueError('Invalid action')
+            amount = bet
+            history += 'b'
+        elif act == 'fold' and outcome is None:
+            return GameState((street, player, asked + 1, bets, chips, history + 'p', min_bet, FOLD))
+        else:
+            raise ValueError('Invalid action')
+
+        if player == 0:
+            bets, chips = (bets[0] + amount, bets[1]), (chips[0] - amount, chips[1])
+        else:
+            bets, chips = (bets[0], bets[1] + amount), (chips[0], chips[1] - amount)
+        state = GameState((street, opponent, asked + 1, bets, chips, history, min_bet, None))
+        if act == 'call' and (asked or chips[0] == 0 or chips[1] == 0):
+            return state._end_street()
+        return state
+
+    def _end_street(self):
+        street, _, _, bets, chips, _, min_bet, _ = self
+        if street == 5 or chips[0] == 0 or chips[1] == 0:
+            return GameState((5, None, 0, bets, chips, '', min_bet, SHOWDOWN))
+        return GameState((NEXT_STREET[street], 1, 0, bets, chips, '', min_bet, None))
+
+    def payoff(self, winner=0):
+        """
+        :param winner: showdown result, 1 - the small blind wins, -1 - the big blind, 0 - a split pot
+        :return: chips won by the small blind, the uncalled part of a bet goes back to its player
+        """
+        bets = self[3]
+        if self[7] == FOLD:
+            return -bets[0] if self[1] == 0 else bets[1]
+        if self[7] == SHOWDOWN:
+            return winner * min(bets)
+        raise ValueError('The hand is not over')
@@ -0,0 +1,80 @@
+import tempfile
+import unittest
+import numpy as np
+from evaluator import evaluate
+from game_state import FOLD, SHOWDOWN, GameState
+from hand_history import HandHistoryWriter, history_files, read_hands
+from ranges import NUM_CLASSES
+from simulation import StyleProvider, simulate
+
+
+# Even preflop equities, the tests do not need the stored matrix
+EQUITY_MATRIX = np.full((NUM_CLASSES, NUM_CLASSES), 0.5, dtype=np.float32)
+
+
+def play(*args, **kwargs):
+    return simulate(*args, equity_matrix=EQUITY_MATRIX, **kwargs)
+
+
+class TestGameState(unittest.TestCase):
+
+    def test_blinds_and_first_actions(self):
+        state = GameState.start(5000, 250)
+        self.assertEqual((state.street, state.player, state.bets, state.chips), (0, 0, (250, 500), (4750, 4500)))
+        self.assertEqual(state.legal_actions(), ('fold', 'call', 'raise'))
+        self.assertEqual(state.raise_range(), (500, 4750))
+        self.assertFalse(state.is_valid('check'))
+        self.assertFalse(state.is_valid('raise', 250))
+        with self.assertRaises(ValueError):
+            state.apply('check')
+
+    def test_streets(self):
+        state = GameState.start(5000, 250)
+        limped = state.apply('call')
+        # The big blind has an option after a limp, the old state is unchanged
+        self.assertEqual((limped.street, limped.player, limped.history), (0, 1, 'c'))
+        self.assertEqual(state.bets, (250, 500))
+        flop = limped.apply('check')
+        self.assertEqual((flop.street, flop.player, flop.history, flop.bets), (3, 1, '', (500, 500)))
+        raised = flop.apply('check').apply('raise', 1000)
+        self.assertEqual((raised.street, raised.player, raised.history, raised.bets), (3, 1, 'pb', (1500, 500)))
+        turn = raised.apply('call')
+        self.assertEqual((turn.street, turn.bets, turn.pot), (4, (1500, 1500), 3000))
+        river = turn.apply('check').apply('check')
+        end = river.apply('check').apply('check')
+        self.assertEqual((river.street, end.outcome, end.payoff(-1)), (5, SHOWDOWN, -1500))
+
+    def test_all_in(self):
+        state = GameState.start(5000, 250).apply('raise', 4750)
+        self.assertEqual(state.raise_range(), None)
+        self.assertEqual(state.legal_actions(), ('fold', 'call'))
+        folded = state.apply('fold')
+        self.assertEqual((folded.outcome, folded.payoff()), (FOLD, 500))
+        called = state.apply('call')
+        self.assertEqual((called.outcome, called.street, called.bets), (SHOWDOWN, 5, (5000, 5000)))
+        # Unequal stacks: the uncalled part of the bet goes back
+        short = GameState.start(small_blind=250, chips=(8000, 2000)).apply('raise', 7750).apply('call')
+        self.assertEqual((short.outcome, short.bets, short.payoff(1)), (SHOWDOWN, (8000, 2000), 2000))
+
+    def test_matches_simulation(self):
+        # The headless engine has its own inlined copy of the rules
+        with tempfile.TemporaryDirectory() as directory:
+            with HandHistoryWriter(directory, 5000, 250) as writer:
+                play(StyleProvider('LAG'), StyleProvider('TAG'), 500, seed=8, hand_history=writer)
+            records = [record for path in history_files(directory) for record in read_hands(path)]
+        for record in records:
+            state = GameState.start(5000, 250)
+            raises = iter(record.raises)
+            for act in record.actions.replace('/', ''):
+                if act == 'b':
+                    state = state.apply('raise', next(raises))
+                else:
+                    state = state.apply({'p': 'check', 'c': 'call', 'f': 'fold'}[act])
+            strengths = [evaluate(record.cards[2 * position:2 * position + 2] + record.cards[4:]) for position in range(2)]
+            winner = (strengths[0] > strengths[1]) - (strengths[0] < strengths[1])
+            self.assertTrue(state.is_terminal)
+            self.assertEqual(state.payoff(winner), record.won)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,189 @@
+# Hand histories of headless simulations
+#
+# Hands are written in blocks, one per simulated batch, to append-only binary files that rotate
+# after max_bytes. A file starts with a header (magic, version, starting chips, small blind, big
+# blind) followed by blocks (little endian, columns of the hands of the block):
+#
+#   header  - magic, number of the first hand, number of hands, number of raises, length of the actions
+#   cards   - uint8 [hands, 9] card indices: small blind, big blind, board
+#   seats   - uint8 [hands] 0 if the first provider is the small blind, 1 if it is the big blind
+#   won     - int32 [hands] chips won by the small blind
+#   actions - ASCII, the actions of a hand as in the info sets ('p' - check, 'c' - call, 'b' - raise,
+#             'f' - fold), streets separated by '/', hands separated by '\n'
+#   raises  - int32 [raises] chips of every raise ('b') in order
+#
+# The bets and the pot of every action follow from the blinds, the calls and the raises (see
+# HandRecord.bets). The blocks are encoded with a few array copies per batch, so recording adds
+# little to the cost of a hand. Run the module on a directory to print the hands as JSON lines.
+import json
+import os
+import struct
+import sys
+import numpy as np
+from cards import CARDS
+
+FILE_MAGIC = b'PKHHIST\0'
+BLOCK_MAGIC = b'HAND'
+VERSION = 1
+FILE_HEADER = struct.Struct('<8sIiii')
+BLOCK_HEADER = struct.Struct('<4sQIII')
+MAX_BYTES = 64 << 20
+BUFFER_SIZE = 1 << 20
+
+
+class HandHistoryWriter:
+    def __init__(self, directory, starting_chips, small_blind, prefix='hands', max_bytes=MAX_BYTES):
+        """
+        :param directory: directory of the files, created if needed
+        :param starting_chips: stack of both players at the start of every hand
+        :param small_blind: small blind, the big blind is twice as much
+        :param prefix: files are named prefix-NNNNN.bin, numbered after the existing ones
+        :param max_bytes: size after which the next block goes to a new file
+        """
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.prefix = prefix
+        self.max_bytes = max_bytes
+        self.header = FILE_HEADER.pack(FILE_MAGIC, VERSION, starting_chips, small_blind, 2 * small_blind)
+        # One above the highest existing number, the numbering may have gaps
+        numbers = [os.path.basename(path)[len(prefix) + 1:-len('.bin')] for path in history_files(directory, prefix)]
+        self.next_file = max((int(number) for number in numbers if number.isdigit()), default=-1) + 1
+        self.file = None
+        self.paths = []
+
+    def _open(self):
+        # Existing files are never reopened, a writer only appends new ones
+        path = os.path.join(self.directory, f'{self.prefix}-{self.next_file:05d}.bin')
+        self.next_file += 1
+        self.file = open(path, 'xb', buffering=BUFFER_SIZE)
+        self.file.write(self.header)
+        self.paths.append(path)
+
+    def write_block(self, first_hand, cards, seats, won, actions, raises):
+        """
+        :param first_hand: number of the first hand of the block
+        :param cards: array [hands, 9] of card indices
+        :param seats: sequence [hands] of the seats of the first provider
+        :param won: sequence [hands] of the chips won by the small blind
+        :param actions: list [hands] of action strings
+        :param raises: sequence of the chips of the raises
+        """
+        if self.file is None:
+            self._open()
+        actions = '\n'.join(actions).encode('ascii')
+        file = self.file
+        file.write(BLOCK_HEADER.pack(BLOCK_MAGIC, first_hand, len(cards), len(raises), len(actions)))
+        file.write(np.ascontiguousarray(cards, dtype=np.uint8).tobytes())
+        file.write(np.asarray(seats, dtype=np.uint8).tobytes())
+        file.write(np.asarray(won, dtype='<i4').tobytes())
+        file.write(actions)
+        file.write(np.asarray(raises, dtype='<i4').tobytes())
+        if file.tell() >= self.max_bytes:
+            self.close()
+
+    def close(self):
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class HandRecord:
+    def __init__(self, number, cards, seat, won, actions, raises, starting_chips, small_blind):
+        self.number = number
+        # Card objects: small blind, big blind, board
+        self.cards = cards
+        self.seat = seat
+        self.won = won
+        self.actions = actions
+        self.raises = raises
+        self.starting_chips = starting_chips
+        self.small_blind = small_blind
+
+    @property
+    def streets(self):
+        return self.actions.split('/')
+
+    @property
+    def showdown(self):
+        return not self.actions.endswith('f')
+
+    def bets(self):
+        # Bets of the small and the big blind after every action: [(street, action, small blind bet, big blind bet)]
+        bets = [self.small_blind, 2 * self.small_blind]
+        raises = iter(self.raises)
+        result = []
+        for street, actions in enumerate(self.streets):
+            player = 0 if street == 0 else 1
+            for act in actions:
+                if act == 'c':
+                    bets[player] = min(bets[1 - player], self.starting_chips)
+                elif act == 'b':
+                    bets[player] += next(raises)
+                result.append((street, act, bets[0], bets[1]))
+                player = 1 - player
+        return result
+
+    def to_dict(self):
+        bets = self.bets()
+        final = bets[-1][2:] if bets else (self.small_blind, 2 * self.small_blind)
+        return {
+            'hand': self.number,
+            'small_blind': [str(card) for card in self.cards[:2]],
+            'big_blind': [str(card) for card in self.cards[2:4]],
+            'board': [str(card) for card in self.cards[4:]],
+            'first_provider': 'big blind' if self.seat else 'small blind',
+            'actions': [[street, act, small_blind_bet, big_blind_bet] for street, act, small_blind_bet, big_blind_bet in bets],
+            'pot': sum(final),
+            'won': self.won,
+            'showdown': self.showdown,
+        }
+
+
+def history_files(directory, prefix='hands'):
+    return sorted(os.path.join(directory, name) for name in os.listdir(directory)
+                  if name.startswith(prefix + '-') and name.endswith('.bin'))
+
+
+def read_hands(path):
+    # HandRecord of every hand of a file
+    with open(path, 'rb') as file:
+        data = file.read()
+    magic, version, starting_chips, small_blind, _ = FILE_HEADER.unpack_from(data)
+    if magic != FILE_MAGIC or version != VERSION:
+        raise ValueError(f'Not a hand history file: {path}')
+    offset = FILE_HEADER.size
+    while offset < len(data):
+        magic, first_hand, hands, num_raises, actions_length = BLOCK_HEADER.unpack_from(data, offset)
+        if magic != BLOCK_MAGIC:
+            raise ValueError(f'Corrupted hand history block in {path} at {offset}')
+        offset += BLOCK_HEADER.size
+        cards = np.frombuffer(data, np.uint8, hands * 9, offset).reshape(hands, 9)
+        offset += hands * 9
+        seats = np.frombuffer(data, np.uint8, hands, offset)
+        offset += hands
+        won = np.frombuffer(data, '<i4', hands, offset)
+        offset += hands * 4
+        actions = data[offset:offset + actions_length].decode('ascii').split('\n')
+        offset += actions_length
+        raises = np.frombuffer(data, '<i4', num_raises, offset).tolist()
+        offset += num_raises * 4
+
+        position = 0
+        for hand in range(hands):
+            count = actions[hand].count('b')
+            yield HandRecord(first_hand + hand, [CARDS[index] for index in cards[hand]], int(seats[hand]),
+                             int(won[hand]), actions[hand], raises[position:position + count], starting_chips,
+                             small_blind)
+            position += count
+
+
+if __name__ == '__main__':
+    for path in history_files(sys.argv[1]):
+        for record in read_hands(path):
+            print(json.dumps(record.to_dict(), ensure_ascii=False))
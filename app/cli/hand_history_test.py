@@ -0,0 +1,62 @@
+import os
+import tempfile
+import unittest
+import numpy as np
+from hand_history import HandHistoryWriter, history_files, read_hands
+from ranges import NUM_CLASSES
+from simulation import StyleProvider, simulate
+
+
+# Even preflop equities, the tests do not need the stored matrix
+EQUITY_MATRIX = np.full((NUM_CLASSES, NUM_CLASSES), 0.5, dtype=np.float32)
+
+
+def play(*args, **kwargs):
+    return simulate(*args, equity_matrix=EQUITY_MATRIX, **kwargs)
+
+
+class TestHandHistory(unittest.TestCase):
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = directory.name
+
+    def test_round_trip(self):
+        with HandHistoryWriter(self.directory, 5000, 250, max_bytes=4096) as writer:
+            result = play(StyleProvider('LAG'), StyleProvider('TP'), 600, seed=6, batch=200, hand_history=writer)
+        paths = history_files(self.directory)
+        self.assertGreater(len(paths), 1)
+        records = [record for path in paths for record in read_hands(path)]
+        self.assertEqual([record.number for record in records], list(range(600)))
+        self.assertEqual(sum(-record.won if record.seat else record.won for record in records), result.winnings)
+        self.assertEqual(sum(record.showdown for record in records), result.showdowns)
+        for record in records:
+            hand = record.to_dict()
+            # The loser pays its whole bet at a showdown, the folding player what it put in
+            if record.won and record.showdown:
+                self.assertEqual(hand['pot'], 2 * abs(record.won))
+            self.assertLessEqual(abs(record.won), 5000)
+
+    def test_append_only(self):
+        with HandHistoryWriter(self.directory, 5000, 250) as writer:
+            play(StyleProvider('TAG'), StyleProvider('LP'), 10, seed=1, hand_history=writer)
+        with HandHistoryWriter(self.directory, 5000, 250) as writer:
+            play(StyleProvider('TAG'), StyleProvider('LP'), 10, seed=2, hand_history=writer)
+        self.assertEqual([os.path.basename(path) for path in history_files(self.directory)],
+                         ['hands-00000.bin', 'hands-00001.bin'])
+
+    def test_numbering_gap(self):
+        # A removed file leaves a gap, the next file is numbered after the highest one
+        for seed in range(3):
+            with HandHistoryWriter(self.directory, 5000, 250) as writer:
+                play(StyleProvider('TAG'), StyleProvider('LP'), 10, seed=seed, hand_history=writer)
+        os.remove(os.path.join(self.directory, 'hands-00001.bin'))
+        with HandHistoryWriter(self.directory, 5000, 250) as writer:
+            play(StyleProvider('TAG'), StyleProvider('LP'), 10, seed=3, hand_history=writer)
+        self.assertEqual([os.path.basename(path) for path in history_files(self.directory)],
+                         ['hands-00000.bin', 'hands-00002.bin', 'hands-00003.bin'])
+
+
+if __name__ == '__main__':
+    unittest.main()
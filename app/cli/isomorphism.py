@@ -0,0 +1,94 @@
+# Suit isomorphism of hole and board cards
+#
+# Two deals are strategically the same when one becomes the other by renaming the suits,
+# e.g. A♠K♠ and A♥K♥ preflop. Every suit is described by the rank masks of its cards in
+# each round (hole cards, flop, turn, river), and the deal is canonical when the suits are
+# renamed in the descending order of these descriptions. Deals are isomorphic exactly when
+# their sorted descriptions are equal, so the packed descriptions make a canonical key:
+# 169 keys preflop, 1,286,792 on the flop. canonical_deals enumerates one deal of every key.
+from itertools import combinations, permutations
+from cards import CARDS, Card
+
+# Board cards dealt in each round: flop, turn, river
+ROUNDS = ((0, 3), (3, 4), (4, 5))
+
+
+def _rounds(hole, board):
+    rounds = [hole]
+    for start, end in ROUNDS:
+        if len(board) > start:
+            rounds.append(board[start:end])
+    return rounds
+
+
+def _suit_features(rounds):
+    # features[suit] - rank masks of the suit in every round, the earliest round in the highest bits
+    features = [0, 0, 0, 0]
+    for cards in rounds:
+        for suit in range(4):
+            features[suit] <<= 13
+        for card in cards:
+            features[card.suit] |= 1 << (card.rank - 2)
+    return features
+
+
+def canonical_key(hole, board=()):
+    """
+    :param hole: hole cards
+    :param board: 0, 3, 4 or 5 community cards
+    :return: integer that is equal for two deals exactly when they are suit isomorphic
+    """
+    rounds = _rounds(hole, board)
+    key = 0
+    for feature in sorted(_suit_features(rounds), reverse=True):
+        key = key << (13 * len(rounds)) | feature
+    return key << 3 | len(board)
+
+
+def canonical_cards(hole, board=()):
+    """
+    :param hole: hole cards
+    :param board: 0, 3, 4 or 5 community cards
+    :return: (hole, board) with renamed suits, the cards of every round are sorted by descending rank
+    """
+    rounds = _rounds(hole, board)
+    features = _suit_features(rounds)
+    order = sorted(range(4), key=lambda suit: features[suit], reverse=True)
+    new_suit = [0] * 4
+    for position, suit in enumerate(order):
+        new_suit[suit] = position
+
+    canonical = [sorted((Card(card.rank, new_suit[card.suit]) for card in cards), key=lambda card: (-card.rank, card.suit))
+                 for cards in rounds]
+    return canonical[0], [card for cards in canonical[1:] for card in cards]
+
+
+def info_set(hole, board=()):
+    # String key of the cards part of an info set, e.g. 'A♣K♣' preflop or 'A♣K♦|Q♣J♦2♥' on the flop
+    hole, board = canonical_cards(hole, board)
+    key = ''.join(str(card) for card in hole)
+    if board:
+        key += '|' + ''.join(str(card) for card in board)
+    return key
+
+
+def canonical_deals(num_board, holes=None):
+    """
+    :param num_board: 0, 3, 4 or 5 community cards
+    :param holes: hole cards whose boards are enumerated, one hand of every preflop class by default
+    :return: generator of (canonical key, hole, board), one deal of every key
+    """
+    if holes is None:
+        holes = {canonical_key(hole): hole for hole in combinations(CARDS, 2)}.values()
+    for hole in holes:
+        # Deals of different preflop classes never share a key, the keys are deduplicated per hand
+        rest = [card for card in CARDS if card not in hole]
+        seen = set()
+        for flop in combinations(rest, min(num_board, 3)):
+            later = [card for card in rest if card not in flop]
+            for cards in permutations(later, num_board - len(flop)):
+                board = list(flop) + list(cards)
+                key = canonical_key(hole, board)
+                if key not in seen:
+                    seen.add(key)
+                    yield key, list(hole), board
@@ -0,0 +1,66 @@
+import random
+import unittest
+from itertools import combinations, permutations
+from cards import CARDS, CARDS_BY_NAME, Card
+from isomorphism import canonical_deals, canonical_key, info_set
+
+
+def cards(*names):
+    return [CARDS_BY_NAME[name] for name in names]
+
+
+def rename_suits(cards, suits):
+    return [Card(card.rank, suits[card.suit]) for card in cards]
+
+
+class TestIsomorphism(unittest.TestCase):
+
+    def test_preflop_classes(self):
+        hands = [list(hand) for hand in combinations(CARDS, 2)]
+        self.assertEqual(len({canonical_key(hand) for hand in hands}), 169)
+        self.assertEqual(len({info_set(hand) for hand in hands}), 169)
+        self.assertEqual(info_set(cards('K♥', 'A♥')), info_set(cards('A♠', 'K♠')))
+
+    def test_suit_permutations(self):
+        rng = random.Random(0)
+        for _ in range(20):
+            deal = rng.sample(CARDS, 7)
+            for num_board in (0, 3, 4, 5):
+                hole, board = deal[:2], deal[2:2 + num_board]
+                keys = {(canonical_key(rename_suits(hole, suits), rename_suits(board, suits)),
+                         info_set(rename_suits(hole, suits), rename_suits(board, suits)))
+                        for suits in permutations(range(4))}
+                self.assertEqual(len(keys), 1)
+
+    def test_distinct_deals(self):
+        hole = cards('A♠', 'K♠')
+        # The order of the flop does not matter, the round of a card and the suits of the ranks do
+        same = [cards('Q♠', 'J♥', '2♦', '3♣'), cards('2♦', 'Q♠', 'J♥', '3♣')]
+        distinct = same[:1] + [cards('Q♥', 'J♠', '2♦', '3♣'), cards('Q♠', 'J♥', '3♣', '2♦')]
+        self.assertEqual(canonical_key(hole, same[0]), canonical_key(hole, same[1]))
+        self.assertEqual(len({canonical_key(hole, board) for board in distinct}), 3)
+        self.assertNotEqual(canonical_key(hole, distinct[0][:3]), canonical_key(hole, distinct[0]))
+
+        # The integer keys and the canonical cards group random flops the same way
+        rng = random.Random(1)
+        deals = [rng.sample(CARDS, 5) for _ in range(2000)]
+        deals += [rename_suits(deal, rng.sample(range(4), 4)) for deal in deals]
+        by_key, by_info_set = {}, {}
+        for number, deal in enumerate(deals):
+            by_key.setdefault(canonical_key(deal[:2], deal[2:]), set()).add(number)
+            by_info_set.setdefault(info_set(deal[:2], deal[2:]), set()).add(number)
+        self.assertEqual(sorted(map(sorted, by_key.values())), sorted(map(sorted, by_info_set.values())))
+
+    def test_canonical_deals(self):
+        self.assertEqual(len({key for key, _, _ in canonical_deals(0)}), 169)
+        # One deal of every flop class of a suited hand: the keys of the boards of all the 4 suited A-K
+        deals = list(canonical_deals(3, [cards('A♠', 'K♠')]))
+        for key, hole, board in deals[:50]:
+            self.assertEqual(canonical_key(hole, board), key)
+        keys = {canonical_key(hole, board) for suit in '♠♥♦♣' for hole in [cards('A' + suit, 'K' + suit)]
+                for board in combinations([card for card in CARDS if card not in hole], 3)}
+        self.assertEqual(sorted(key for key, _, _ in deals), sorted(keys))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,6 +1,52 @@
-import os
 import random
-# import joblib
+import numpy as np
+from equity import equity
+from abstraction import bucket_info_set
+from bet_abstraction import DEFAULT_ABSTRACTION, STRATEGY_ABSTRACTION
+from game_state import ACTION_KEYS
+from strategy_store import shared_store
+
+# Weights of the bot actions: fold, check, call, raises of the three sizes of the menu, all-in
+BASE_STRATEGIES = {
+    'Optimal': [0.2, 0.3, 0.2, 0.14, 0.1, 0.05, 0.01],
+    'LAG': [0.2, 0.2, 0.2, 0.15, 0.1, 0.1, 0.05],
+    'TAG': [0.05, 0.2, 0.1, 0.25, 0.2, 0.15, 0.05],
+    'TP': [0.1, 0.25, 0.4, 0.1, 0.05, 0.05, 0.05],
+    'LP': [0.1, 0.3, 0.4, 0.1, 0.05, 0.03, 0.02]
+}
+# Share of the trained bets of every raise size and of the all-in
+RAISE_SHARES = (0.5, 0.3, 0.15, 0.05)
+
+
+def fit_raises(weights, sizes):
+    # Weights of the raises of a 3 size menu and the all-in fitted to a menu of sizes raises, same total
+    *size_weights, all_in = weights
+    if len(size_weights) == sizes:
+        return list(weights)
+    fitted = np.interp(np.linspace(0, 1, sizes), np.linspace(0, 1, len(size_weights)), size_weights)
+    if fitted.sum() > 0:
+        fitted *= sum(size_weights) / fitted.sum()
+    return fitted.tolist() + [all_in]
+
+
+def style_strategy(style, sizes=3):
+    # Weights of a style for a menu of sizes raises
+    strategy = BASE_STRATEGIES[style]
+    return strategy[:3] + fit_raises(strategy[3:], sizes)
+
+
+def expand_strategy(obt_strategy, sizes=3):
+    # Trained strategy over pass, call, bet spread over the bot actions
+    bet = obt_strategy[2]
+    return [obt_strategy[0] * 0.7, obt_strategy[0] * 0.3, obt_strategy[1]] + \
+        [bet * share for share in fit_raises(RAISE_SHARES, sizes)]
+
+
+def shift_by_strength(strategy, strength):
+    # Strong hands fold less and raise more, weak hands the other way round (no change at 50%)
+    passive, aggressive = 2 * (1 - strength), 2 * strength
+    return [strategy[0] * passive, strategy[1], strategy[2]] + [weight * aggressive for weight in strategy[3:]]
+
 
 class Player:
     def __init__(self):
@@ -66,20 +112,37 @@ class Bot(Player):
         # LAG - loose aggressive (plays every hand, raises actively)
         # TAG - tight aggressive (plays only strongest hands, raises actively)
         self.style = "LAG"
+        # Raise sizes of the bot, and the sizes of the trained strategies the real raises are translated to
+        self.abstraction = DEFAULT_ABSTRACTION
+        self.strategy_abstraction = STRATEGY_ABSTRACTION
+        # resolver.Resolver of the turn and the river, the blueprint alone without it
+        self.resolver = None
 
         self.history = ''
         self.info_set = ''
-        self.tree_map = self.load_strategies()
+
+    @property
+    def tree_map(self):
+        return self.load_strategies()
 
     def load_strategies(self):
-        if os.path.exists("./app/train/HUNL-TreeMap.joblib"):
-            return joblib.load("./app/train/HUNL-TreeMap.joblib")
-        else:
-            return {}
+        # Loaded lazily and shared by all the bots, lookups go through an LRU cache
+        return shared_store()
 
     def update_info_set(self):
-        sorted_cards = sorted(self.hole_cards + self.game.community_cards, key=lambda card: (card.rank, card.suit))
-        self.info_set = ''.join(str(card) for card in sorted_cards)
+        # Suit isomorphic deals share the info set, postflop deals of a bucket too (same keys as the trainer)
+        self.info_set = bucket_info_set(self.hole_cards, self.game.community_cards)
+
+    def action_key(self, state, act, bet=0):
+        """
+        :param state: GameState before the action
+        :param act: action of either player
+        :param bet: chips put in by a raise
+        :return: key of the action in the info set, a raise of any size is one of the trained sizes
+        """
+        if act != 'raise':
+            return ACTION_KEYS[act]
+        return self.strategy_abstraction.key(state.street, state.pot, state.to_call, bet)
 
     def __str__(self):
         return super().__str__() + self.info_set + ' |'
@@ -87,37 +150,23 @@ class Bot(Player):
     def ask_action(self):
         # print(self.info_set)
 
+        to_call = self.game.user.bet - self.bet
         fold = ('fold', 0, 'p')
         check = ('check', 0, 'p')
-        call = ('call', self.game.user.bet - self.bet, 'c')
-        raise_1bb = ('raise', (self.game.user.bet - self.bet) + self.game.big_blind, 'b')
-        raise_2bb = ('raise', (self.game.user.bet - self.bet) + self.game.big_blind * 2, 'b')
-        raise_4bb = ('raise', (self.game.user.bet - self.bet) + self.game.big_blind * 4, 'b')
+        call = ('call', to_call, 'c')
+        # Raises of the pot fractions of the menu of the street
+        raises = [('raise', bet, 'b')
+                  for bet in self.abstraction.raises(len(self.game.community_cards), self.game.pot, to_call)]
         all_in = ('raise', self.chips, 'b')
 
-        actions = [fold, check, call, raise_1bb, raise_2bb, raise_4bb, all_in]
-
-        base_strategies = {
-            'Optimal': [0.2, 0.3, 0.2, 0.14, 0.1, 0.05, 0.01],
-            'LAG': [0.2, 0.2, 0.2, 0.15, 0.1, 0.1, 0.05],
-            'TAG': [0.05, 0.2, 0.1, 0.25, 0.2, 0.15, 0.05],
-            'TP': [0.1, 0.25, 0.4, 0.1, 0.05, 0.05, 0.05],
-            'LP': [0.1, 0.3, 0.4, 0.1, 0.05, 0.03, 0.02]
-        }
-
-        if self.info_set in self.tree_map:
-            obt_strategy = self.tree_map[self.info_set]
-            strategy = [
-                obt_strategy[0] * 0.7,
-                obt_strategy[0] * 0.3,
-                obt_strategy[1],
-                obt_strategy[2] * 0.5,
-                obt_strategy[2] * 0.3,
-                obt_strategy[2] * 0.15,
-                obt_strategy[2] * 0.05,
-            ]
-        else:
-            strategy = base_strategies[self.style]
+        actions = [fold, check, call] + raises + [all_in]
+
+        strategy = self.resolved_strategy(actions)
+        if strategy is None:
+            if self.info_set in self.tree_map:
+                strategy = expand_strategy(self.tree_map[self.info_set], len(raises))
+            else:
+                strategy = self.equity_strategy(style_strategy(self.style, len(raises)))
 
         while True:
             # Returns a list of 1 element, so we need an index at the end
@@ -133,6 +182,32 @@ class Bot(Player):
             except ValueError:
                 continue
 
+    def resolved_strategy(self, actions):
+        """
+        :param actions: bot actions: fold, check, call, raises of the menu, all-in
+        :return: weights of the actions solved by the resolver on the turn and the river, None to play the blueprint
+        """
+        game = self.game
+        if self.resolver is None or len(game.community_cards) < 4:
+            return None
+        solved = self.resolver.strategy(game.street_start, game.street_actions, game.community_cards, self.hole_cards)
+        if solved is None:
+            return None
+
+        to_call = game.user.bet - self.bet
+        # Tree actions: fold or check, call, raises of the menu; a raise of more chips than the bot has is the all-in
+        strategy = [solved[0], 0.0, solved[1]] if to_call else [0.0, solved[0] + solved[1], 0.0]
+        strategy += [0.0] * (len(actions) - 3)
+        if game.user.chips > 0:
+            for size_index, (_, bet, _) in enumerate(actions[3:-1]):
+                strategy[3 + size_index if bet < self.chips else -1] += solved[2 + size_index]
+        return strategy if sum(strategy) > 0 else None
+
+    def equity_strategy(self, strategy):
+        # Without a trained strategy the style weights are shifted by the equity against a random hand:
+        # strong hands fold less and raise more, weak hands the other way round (no change at 50%)
+        return shift_by_strength(strategy, equity(self.hole_cards, board=self.game.community_cards).equity)
+
     def validate_action(self, action):
         act, bet = action[0], action[1]
         opponent = self.game.user
@@ -0,0 +1,177 @@
+# Preflop hand classes and range vs range equity
+#
+# The 1326 starting hands fall into 169 classes: 13 pairs (6 combos each), 78 suited
+# hands (4 combos) and 78 offsuit hands (12 combos). Classes are numbered as the usual
+# 13x13 grid with ranks from the ace down: pairs on the diagonal, suited hands above it
+# and offsuit hands below it, e.g. 0 - AA, 1 - AKs, 13 - AKo, 168 - 22.
+#
+# The all-in equity of every class against every class is built once by Monte Carlo and
+# stored as a .npy file that is memory-mapped on load. The file is built under a temporary name
+# and renamed when it is complete, so an interrupted or concurrent build never leaves a partial
+# matrix at the path. A range is a vector of 169 weights;
+# range vs range equity weights every pair of classes by the number of their combos that
+# do not share a card.
+import os
+import tempfile
+import numpy as np
+from dealer import deal_cards
+from showdown import compare_batch
+
+NUM_CLASSES = 169
+RANK_NAMES = '23456789TJQKA'
+EQUITY_MATRIX_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'train', 'preflop-equity.npy')
+EQUITY_SAMPLES = 2000
+
+
+def class_index(rank_1, rank_2, suited):
+    # Ranks are 2-14, the order of the cards does not matter
+    high, low = max(rank_1, rank_2), min(rank_1, rank_2)
+    row, column = 14 - high, 14 - low
+    return row * 13 + column if suited or high == low else column * 13 + row
+
+
+def hand_class(cards):
+    return class_index(cards[0].rank, cards[1].rank, cards[0].suit == cards[1].suit)
+
+
+def _class_names():
+    names = [''] * NUM_CLASSES
+    for high in range(2, 15):
+        for low in range(2, high + 1):
+            pair = RANK_NAMES[high - 2] + RANK_NAMES[low - 2]
+            if high == low:
+                names[class_index(high, low, False)] = pair
+            else:
+                names[class_index(high, low, True)] = pair + 's'
+                names[class_index(high, low, False)] = pair + 'o'
+    return names
+
+
+def _class_combos():
+    # Card indices of every combo of every class, padded to 12 combos per class
+    combos = [[] for _ in range(NUM_CLASSES)]
+    for first in range(52):
+        for second in range(first + 1, 52):
+            suited = first // 13 == second // 13
+            combos[class_index(first % 13 + 2, second % 13 + 2, suited)].append((first, second))
+    counts = np.array([len(class_combos) for class_combos in combos])
+    padded = np.zeros((NUM_CLASSES, 12, 2), dtype=np.int8)
+    for i, class_combos in enumerate(combos):
+        padded[i, :len(class_combos)] = class_combos
+    return padded, counts
+
+
+CLASS_NAMES = _class_names()
+CLASS_BY_NAME = {name: i for i, name in enumerate(CLASS_NAMES)}
+CLASS_COMBOS, COMBO_COUNTS = _class_combos()
+
+
+def _pair_counts():
+    # PAIR_COUNTS[i, j] - number of (combo of i, combo of j) pairs without a shared card
+    combos = [tuple(combo) for i in range(NUM_CLASSES) for combo in CLASS_COMBOS[i, :COMBO_COUNTS[i]]]
+    classes = np.repeat(np.arange(NUM_CLASSES), COMBO_COUNTS)
+    masks = np.array([(1 << int(first)) | (1 << int(second)) for first, second in combos], dtype=np.int64)
+    compatible = (masks[:, None] & masks[None, :]) == 0
+    membership = np.zeros((len(combos), NUM_CLASSES))
+    membership[np.arange(len(combos)), classes] = 1
+    return membership.T @ compatible @ membership
+
+
+PAIR_COUNTS = _pair_counts()
+
+
+def hand_range(names, weight=1.0):
+    """
+    :param names: class names, e.g. ['AA', 'AKs', 'KQo']
+    :param weight: weight of each listed class
+    :return: vector of 169 weights
+    """
+    weights = np.zeros(NUM_CLASSES)
+    for name in names:
+        weights[CLASS_BY_NAME[name]] = weight
+    return weights
+
+
+def _sample_matchups(class_a, class_b, rng):
+    # Random combos of the given classes that do not share a card, and a board of the remaining cards
+    hands_a = CLASS_COMBOS[class_a, rng.integers(0, COMBO_COUNTS[class_a])]
+    hands_b = CLASS_COMBOS[class_b, rng.integers(0, COMBO_COUNTS[class_b])]
+    while True:
+        conflict = np.flatnonzero((hands_a[:, :, None] == hands_b[:, None, :]).any(axis=(1, 2)))
+        if not len(conflict):
+            break
+        hands_b[conflict] = CLASS_COMBOS[class_b[conflict], rng.integers(0, COMBO_COUNTS[class_b[conflict]])]
+    return hands_a, hands_b, deal_cards(np.concatenate([hands_a, hands_b], axis=1), 5, rng)
+
+
+def build_equity_matrix(path=EQUITY_MATRIX_PATH, samples=EQUITY_SAMPLES, rng=None):
+    """
+    :param path: output .npy file
+    :param samples: number of random matchups and boards for every pair of classes
+    :param rng: numpy Generator
+    :return: memory-mapped [169, 169] float32 matrix, [i, j] - all-in equity of class i against class j
+    """
+    rng = rng if rng is not None else np.random.default_rng()
+    descriptor, temporary = tempfile.mkstemp(suffix='.tmp', prefix=os.path.basename(path) + '.',
+                                             dir=os.path.dirname(os.path.abspath(path)))
+    os.close(descriptor)
+    try:
+        _fill_equity_matrix(temporary, samples, rng)
+        os.replace(temporary, path)
+    except BaseException:
+        os.remove(temporary)
+        raise
+    return np.load(path, mmap_mode='r')
+
+
+def _fill_equity_matrix(path, samples, rng):
+    matrix = np.lib.format.open_memmap(path, mode='w+', dtype=np.float32, shape=(NUM_CLASSES, NUM_CLASSES))
+    for i in range(NUM_CLASSES):
+        opponents = np.arange(i, NUM_CLASSES)
+        class_a = np.full(len(opponents) * samples, i)
+        class_b = np.repeat(opponents, samples)
+        hands_a, hands_b, board = _sample_matchups(class_a, class_b, rng)
+        win, lose, tie = compare_batch(hands_a, hands_b, board)
+        equities = (win + tie / 2).reshape(len(opponents), samples).mean(axis=1)
+        matrix[i, i:] = equities
+        matrix[i:, i] = 1 - equities
+    # A class against itself is symmetric
+    matrix[np.arange(NUM_CLASSES), np.arange(NUM_CLASSES)] = 0.5
+    matrix.flush()
+
+
+def load_equity_matrix(path=EQUITY_MATRIX_PATH, build=True):
+    # The matrix is built on the first use, without build a missing matrix raises FileNotFoundError
+    if not os.path.exists(path):
+        if not build:
+            raise FileNotFoundError(f'No preflop equity matrix at {path}, build it with ranges.py')
+        return build_equity_matrix(path)
+    return np.load(path, mmap_mode='r')
+
+
+class RangeEquity:
+    def __init__(self, matrix=None):
+        self.matrix = np.asarray(matrix if matrix is not None else load_equity_matrix(), dtype=np.float64)
+        # Equities weighted by the number of compatible combos, so a query is two matrix-vector products
+        self.weighted = self.matrix * PAIR_COUNTS
+
+    def class_equities(self, villain_range):
+        """
+        :param villain_range: vector of 169 weights
+        :return: vector of 169 equities of every hero class against the range
+        """
+        total = PAIR_COUNTS @ villain_range
+        return np.divide(self.weighted @ villain_range, total, out=np.full(NUM_CLASSES, 0.5), where=total > 0)
+
+    def equity(self, hero_range, villain_range):
+        """
+        :param hero_range: vector of 169 weights
+        :param villain_range: vector of 169 weights
+        :return: all-in equity of the hero range against the villain range
+        """
+        total = hero_range @ PAIR_COUNTS @ villain_range
+        return float(hero_range @ self.weighted @ villain_range / total) if total > 0 else 0.5
+
+
+if __name__ == '__main__':
+    build_equity_matrix()
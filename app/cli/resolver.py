@@ -0,0 +1,233 @@
+# Real-time re-solving of the turn and the river
+#
+# On the turn and the river the bot can solve the rest of the street during the hand instead of playing
+# the blueprint (the strategy file or its style). The subgame starts at the beginning of the current
+# street with the pot and the stacks of the hand and is the BettingTree of the bet menus of the bot
+# over that street only. The end of the river is a showdown, the end of the turn is valued as a check
+# down: the mean result over all the river cards (depth limit, the river betting is not solved with the
+# turn). Both ranges are all the hands without a card of the board, the earlier streets do not narrow
+# them.
+#
+# CFR runs on the whole ranges at once. An iteration computes the strategies of all the decision nodes
+# with regret matching+, walks the tree down (the ids of the children are greater than the ids of their
+# parent) to get the reach vectors of both players at every node, values all the terminals with two
+# matrix products (pair results at the showdowns, compatible pairs at the folds, 0 for the pairs that
+# share a card) and walks back up to update the regrets. The average strategy is weighted linearly by
+# the iteration.
+#
+# Every decision iterates until its time budget is spent, a subgame with less than min_iterations is
+# not used and the bot falls back to the blueprint. The solution is kept and improved by the next
+# decisions of the street, the actions of the street are translated to nodes of the tree
+# (BettingTree.child).
+import random
+import time
+from itertools import combinations
+import numpy as np
+from bet_abstraction import DEFAULT_ABSTRACTION
+from betting_tree import DECISION, FOLD, SHOWDOWN, BettingTree
+from showdown import evaluate_batch
+
+BUDGET = 0.2
+MIN_ITERATIONS = 20
+MAX_RAISES = 3
+
+
+def showdown_results(hands, board):
+    """
+    :param hands: array [hands, 2] of card indices without a card of the board
+    :param board: card indices of the turn or the river board
+    :return: matrix [hands, hands] of the mean showdown result of a hand against a hand, 1 - always wins, -1 - always
+             loses, the pairs with a shared card are not set
+    """
+    board = np.array(board, dtype=np.int8)
+    if len(board) == 5:
+        strengths = evaluate_batch(hands, np.tile(board, (len(hands), 1)))
+        return np.sign(strengths[:, None] - strengths[None, :]).astype(np.float32)
+
+    # Turn: wins counted over every river card, a hand that holds the river card gets strength -1. The
+    # strengths are replaced by their rank among all the strengths (less than 7463 hand values), the
+    # int16 comparisons are the bulk of the work
+    rivers = np.array([card for card in range(52) if card not in board], dtype=np.int8)
+    count = len(hands)
+    boards = np.concatenate([np.tile(board, (count * len(rivers), 1)), np.tile(rivers, count)[:, None]], axis=1)
+    strengths = evaluate_batch(np.repeat(hands, len(rivers), axis=0), boards).reshape(count, len(rivers))
+    blocked = (hands[:, 0, None] == rivers) | (hands[:, 1, None] == rivers)
+    strengths = np.where(blocked, -1, strengths)
+    ranks = np.ascontiguousarray(np.unique(strengths, return_inverse=True)[1].reshape(count, len(rivers)).T, np.int16)
+    wins = np.zeros((count, count), dtype=np.int8)
+    for river in ranks:
+        wins += (river[:, None] > river[None, :]).view(np.int8)
+    # Every other hand beats a hand that holds the river card, these wins do not count
+    free = (~blocked).astype(np.float32)
+    wins = wins - free @ blocked.T.astype(np.float32)
+    # Rivers left for a pair without a shared card
+    return (wins - wins.T) / (len(rivers) - 4)
+
+
+class Subgame:
+    def __init__(self, root, board, abstraction=DEFAULT_ABSTRACTION, max_raises=MAX_RAISES):
+        """
+        :param root: GameState at the start of the turn or the river
+        :param board: card indices of the board
+        :param abstraction: BetAbstraction of the raises
+        :param max_raises: raises allowed on the street
+        """
+        tree = BettingTree(max_raises=max_raises, streets=(root.street,), abstraction=abstraction, root=root)
+        self.tree = tree
+        live = [card for card in range(52) if card not in board]
+        self.hands = np.array(list(combinations(live, 2)), dtype=np.int8)
+        self.hand_index = {(int(first), int(second)): i for i, (first, second) in enumerate(self.hands)}
+
+        first, second = self.hands[:, 0], self.hands[:, 1]
+        shared = ((first[:, None] == first) | (first[:, None] == second) |
+                  (second[:, None] == first) | (second[:, None] == second))
+        # float32 halves the cost of the products with the results matrix
+        self.results = showdown_results(self.hands, board) * ~shared
+        self.first, self.second = first.astype(np.intp), second.astype(np.intp)
+        # Hands holding every card
+        self.card_hands = np.zeros((len(self.hands), 52), dtype=np.float32)
+        self.card_hands[np.arange(len(self.hands)), self.first] = 1
+        self.card_hands[np.arange(len(self.hands)), self.second] = 1
+
+        self.decisions = tree.decisions
+        self.folds = np.flatnonzero(tree.kind == FOLD)
+        self.showdowns = np.flatnonzero(tree.kind == SHOWDOWN)
+        payoffs = tree.payoffs().astype(np.float64)
+        self.fold_payoffs = payoffs[self.folds, None].astype(np.float32)
+        self.stakes = payoffs[self.showdowns, None].astype(np.float32)
+        # Legal children of every decision node: [(node, player, [(action, child)])], in the order of the ids
+        self.edges = [(int(node), int(tree.player[node]),
+                       [(int(action), int(child)) for action, child in enumerate(tree.children[node]) if child >= 0])
+                      for node in self.decisions]
+        self.legal = tree.legal[self.decisions][:, None, :]
+        self.players = tree.player[self.decisions].astype(np.intp)
+
+        shape = (len(self.decisions), len(self.hands), tree.num_actions)
+        self.regrets = np.zeros(shape, dtype=np.float32)
+        self.strategy_sum = np.zeros(shape, dtype=np.float32)
+        self.iterations = 0
+
+    def _compatible(self, reach):
+        # Reach of the hands without a card of every hand, rows of reach [rows, hands]
+        cards = reach @ self.card_hands
+        # The hand itself is removed twice with its cards
+        return reach.sum(axis=1, keepdims=True) - cards[:, self.first] - cards[:, self.second] + reach
+
+    def _strategies(self):
+        # Regret matching of every decision node, uniform over the legal actions without a positive regret
+        total = self.regrets.sum(axis=2, keepdims=True)
+        uniform = self.legal / self.legal.sum(axis=2, keepdims=True)
+        return np.where(total > 0, self.regrets / np.where(total > 0, total, 1), uniform)
+
+    def iteration(self):
+        self.iterations += 1
+        strategies = self._strategies()
+        hands = len(self.hands)
+        reach = np.empty((len(self.tree), 2, hands), dtype=np.float32)
+        reach[0] = 1.0
+        for decision, (node, player, children) in enumerate(self.edges):
+            for action, child in children:
+                reach[child] = reach[node]
+                reach[child, player] *= strategies[decision, :, action]
+
+        # Values of both positions at the terminals, the results matrix is antisymmetric
+        values = np.empty((len(self.tree), 2, hands), dtype=np.float32)
+        opponents = self._compatible(reach[self.folds][:, ::-1].reshape(-1, hands))
+        values[self.folds] = opponents.reshape(-1, 2, hands) * np.stack([self.fold_payoffs, -self.fold_payoffs], 1)
+        opponents = reach[self.showdowns][:, ::-1].reshape(-1, hands) @ self.results.T
+        values[self.showdowns] = opponents.reshape(-1, 2, hands) * self.stakes[:, :, None]
+
+        for decision in range(len(self.edges) - 1, -1, -1):
+            node, player, children = self.edges[decision]
+            strategy = strategies[decision]
+            value = np.zeros((2, hands), dtype=np.float32)
+            for action, child in children:
+                value[player] += strategy[:, action] * values[child, player]
+                value[1 - player] += values[child, 1 - player]
+            for action, child in children:
+                self.regrets[decision, :, action] += values[child, player] - value[player]
+            values[node] = value
+        # Regret matching+: the negative regrets are forgotten
+        np.maximum(self.regrets, 0, out=self.regrets)
+        own_reach = reach[self.decisions, self.players]
+        self.strategy_sum += self.iterations * own_reach[:, :, None] * strategies
+        return values[0]
+
+    def solve(self, deadline):
+        # Iterations until the deadline (time.perf_counter)
+        while time.perf_counter() < deadline:
+            self.iteration()
+
+    def average_strategy(self, node, hole_cards):
+        """
+        :param node: decision node of the tree
+        :param hole_cards: card indices of the hand of the acting player
+        :return: average strategy over the actions of the tree
+        """
+        decision = self.tree.decision_index[node]
+        strategy_sum = self.strategy_sum[decision, self.hand_index[tuple(sorted(hole_cards))]]
+        total = strategy_sum.sum()
+        if total > 0:
+            return strategy_sum / total
+        legal = self.tree.legal[node]
+        return legal / legal.sum()
+
+
+class Resolver:
+    def __init__(self, abstraction=DEFAULT_ABSTRACTION, budget=BUDGET, min_iterations=MIN_ITERATIONS,
+                 max_raises=MAX_RAISES, rng=None):
+        """
+        :param abstraction: BetAbstraction of the raises, the same as the bot
+        :param budget: seconds of solving per decision
+        :param min_iterations: iterations of a usable solution
+        :param max_raises: raises allowed on the street
+        :param rng: random.Random of the translation of the real raises
+        """
+        self.abstraction = abstraction
+        self.budget = budget
+        self.min_iterations = min_iterations
+        self.max_raises = max_raises
+        self.rng = rng if rng is not None else random.Random()
+        self.key = None
+        self.subgame = None
+        # Actions of the street translated so far and their nodes
+        self.actions = []
+        self.path = [0]
+
+    def strategy(self, street_start, actions, board, hole_cards):
+        """
+        :param street_start: GameState at the start of the street
+        :param actions: (act, bet) of the street so far
+        :param board: Cards of the turn or the river board
+        :param hole_cards: Cards of the acting player
+        :return: strategy over the actions of the tree (fold or check, call, raises of the menu), None if the time
+                 budget did not allow min_iterations or the actions left the tree
+        """
+        deadline = time.perf_counter() + self.budget
+        board = tuple(card.index for card in board)
+        if (street_start, board) != self.key:
+            self.key = (street_start, board)
+            self.subgame = Subgame(street_start, board, self.abstraction, self.max_raises)
+            self.actions, self.path = [], [0]
+        elif list(actions[:len(self.actions)]) != self.actions:
+            self.actions, self.path = [], [0]
+        # Every decision of the street improves the solution
+        subgame = self.subgame
+        subgame.solve(deadline)
+        if subgame.iterations < self.min_iterations:
+            return None
+
+        tree = subgame.tree
+        for act, bet in actions[len(self.actions):]:
+            if tree.kind[self.path[-1]] != DECISION:
+                return None
+            try:
+                self.path.append(tree.child(self.path[-1], act, bet, self.rng))
+            except ValueError:
+                # A raise after the last raise of the tree
+                return None
+            self.actions.append((act, bet))
+        node = self.path[-1]
+        if tree.kind[node] != DECISION:
+            return None
+        return subgame.average_strategy(node, [card.index for card in hole_cards])
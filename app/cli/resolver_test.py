@@ -0,0 +1,69 @@
+import unittest
+from itertools import combinations
+import numpy as np
+from cards import CARDS_BY_NAME
+from evaluator import evaluate_mask
+from game import Game
+from game_state import GameState
+from resolver import Resolver, showdown_results
+
+RIVER = [CARDS_BY_NAME[name] for name in ('2♣', '7♦', '9♥', 'J♠', 'K♣')]
+
+
+def cards(*names):
+    return [CARDS_BY_NAME[name] for name in names]
+
+
+class TestResolver(unittest.TestCase):
+
+    def test_turn_results(self):
+        board = [card.index for card in RIVER[:4]]
+        live = [card for card in range(52) if card not in board]
+        hands = np.array(list(combinations(live, 2))[:60], dtype=np.int8)
+        results = showdown_results(hands, board)
+        for first, second in ((0, 59), (3, 40), (59, 10)):
+            if set(hands[first]) & set(hands[second]):
+                continue
+            total = 0
+            rivers = [card for card in live if card not in hands[first] and card not in hands[second]]
+            for river in rivers:
+                mask = sum(1 << card for card in board + [river])
+                strength = [evaluate_mask(mask | (1 << int(a)) | (1 << int(b))) for a, b in hands[[first, second]]]
+                total += np.sign(strength[0] - strength[1])
+            self.assertAlmostEqual(results[first, second], total / len(rivers), places=5)
+            self.assertAlmostEqual(results[second, first], -results[first, second], places=5)
+
+    def test_river(self):
+        start = GameState((5, 1, 0, (1500, 1500), (3500, 3500), '', 500, None))
+        resolver = Resolver(budget=0.5)
+        strategy = resolver.strategy(start, [], RIVER, cards('K♠', 'K♥'))
+        self.assertAlmostEqual(strategy.sum(), 1.0, places=5)
+        # Top set never folds to a pot sized bet, the worst hand never calls it
+        self.assertLess(resolver.strategy(start, [('raise', 1500)], RIVER, cards('K♠', 'K♥'))[0], 0.05)
+        self.assertLess(resolver.strategy(start, [('raise', 1500)], RIVER, cards('3♠', '4♦'))[1], 0.05)
+        self.assertEqual(resolver.actions, [('raise', 1500)])
+        # Without the time for min_iterations the bot plays the blueprint
+        self.assertIsNone(Resolver(budget=0).strategy(start, [], RIVER, cards('K♠', 'K♥')))
+
+    def test_bot(self):
+        game = Game()
+        game.bot.resolver.budget = 0.3
+        game.community_cards = RIVER
+        game.street_start = GameState((5, 1, 0, (1500, 1500), (3500, 3500), '', 500, None))
+        game.street_actions = [('check', 0)]
+        game.pot = 3000
+        game.bot.hole_cards = cards('K♠', 'K♥')
+        game.bot.bet = game.user.bet = 1500
+        game.bot.chips = game.user.chips = 3500
+        actions = [('fold', 0, 'p'), ('check', 0, 'p'), ('call', 0, 'c'), ('raise', 1500, 'b'), ('raise', 3000, 'b'),
+                   ('raise', 6000, 'b'), ('raise', 3500, 'b')]
+        strategy = game.bot.resolved_strategy(actions)
+        # Nothing to call: no fold, no call, two pots is the all-in
+        self.assertEqual((strategy[0], strategy[2], strategy[5]), (0.0, 0.0, 0.0))
+        self.assertAlmostEqual(sum(strategy), 1.0, places=5)
+        game.bot.resolver = None
+        self.assertIsNone(game.bot.resolved_strategy(actions))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,130 @@
+# Vectorized showdowns on NumPy arrays of cards
+#
+# A card is encoded by cards.Card.index = suit * 13 + (rank - 2), its position in a fresh
+# Deck, with the same 2-14 rank and 0-3 suit values as cards.Card. Hands are scored with the
+# same strengths as evaluator.evaluate, so scalar and batch results can be mixed.
+#
+# The batch lookup avoids hashing: the base-5 rank key of evaluator is split into the
+# digits of the 6 highest ranks (hi) and of the 7 lowest ranks (lo). For a fixed number
+# of cards, every hi multiset owns a contiguous block of the strength table, and lo is
+# the position inside the block, so a hand is scored by two gathers and one addition.
+import numpy as np
+from evaluator import RANK_TABLE, FLUSH_TABLE, FLUSH_SUIT
+
+LO_RANKS = 7
+LO_SIZE = 5 ** LO_RANKS
+HI_SIZE = 5 ** (13 - LO_RANKS)
+HI_SHIFT = 20
+SUIT_SHIFT = 40
+
+RANKS = np.arange(52) % 13
+SUITS = np.arange(52) // 13
+RANK_BITS = (1 << RANKS).astype(np.int32)
+
+
+def _digit_totals(size, num_digits):
+    # Sum of base-5 digits of every number below size
+    totals = np.zeros(size, dtype=np.int64)
+    values = np.arange(size)
+    for _ in range(num_digits):
+        totals += values % 5
+        values //= 5
+    return totals
+
+
+def _build_batch_tables():
+    lo_totals = _digit_totals(LO_SIZE, LO_RANKS)
+    hi_totals = _digit_totals(HI_SIZE, 13 - LO_RANKS)
+    # A rank cannot appear more than 4 times, so only multisets of at most 7 cards are kept
+    lo_keys_by_total = [np.flatnonzero(lo_totals == total) for total in range(8)]
+
+    lo_index = np.zeros(LO_SIZE, dtype=np.int64)
+    for keys in lo_keys_by_total:
+        lo_index[keys] = np.arange(len(keys))
+
+    table_keys = np.array(sorted(RANK_TABLE), dtype=np.int64)
+    table_strengths = np.array([RANK_TABLE[key] for key in table_keys], dtype=np.int32)
+
+    offsets, strengths = {}, {}
+    for num_cards in range(5, 8):
+        his = np.flatnonzero(hi_totals <= num_cards)
+        lo_totals_needed = num_cards - hi_totals[his]
+        block_sizes = np.array([len(keys) for keys in lo_keys_by_total])[lo_totals_needed]
+        offset = np.zeros(HI_SIZE, dtype=np.int64)
+        offset[his] = np.cumsum(block_sizes) - block_sizes
+
+        strength = np.zeros(block_sizes.sum(), dtype=np.int32)
+        for total, lo_keys in enumerate(lo_keys_by_total):
+            block_his = his[lo_totals_needed == total]
+            keys = (block_his[:, None] * LO_SIZE + lo_keys[None, :]).ravel()
+            positions = (offset[block_his][:, None] + np.arange(len(lo_keys))[None, :]).ravel()
+            strength[positions] = table_strengths[np.searchsorted(table_keys, keys)]
+
+        offsets[num_cards] = offset
+        strengths[num_cards] = strength
+
+    return lo_index, offsets, strengths
+
+
+LO_INDEX, HI_OFFSETS, STRENGTHS = _build_batch_tables()
+FLUSH_STRENGTHS = np.array(FLUSH_TABLE, dtype=np.int32)
+FLUSH_SUITS = np.array(FLUSH_SUIT, dtype=np.int8)
+
+# CARD_KEYS[index] - lo digits in the lowest bits, hi digits from HI_SHIFT, suit counts from SUIT_SHIFT
+CARD_KEYS = np.array([5 ** rank if rank < LO_RANKS else 5 ** (rank - LO_RANKS) << HI_SHIFT for rank in RANKS],
+                     dtype=np.int64)
+CARD_KEYS += np.left_shift(1, SUIT_SHIFT + 3 * SUITS, dtype=np.int64)
+
+
+def to_array(hands):
+    """
+    :param hands: list of hands, each hand is a list of Card objects
+    :return: int8 array of card indices with a row per hand
+    """
+    return np.array([[card.index for card in hand] for hand in hands], dtype=np.int8)
+
+
+def evaluate_batch(hole_cards, board):
+    """
+    :param hole_cards: array [N, 2] of card indices
+    :param board: array [N, 3..5] of card indices
+    :return: int32 array [N] of hand strengths, the greater the better
+    """
+    hole_cards, board = np.asarray(hole_cards), np.asarray(board)
+    num_cards = hole_cards.shape[1] + board.shape[1]
+    if num_cards not in STRENGTHS:
+        raise ValueError('A hand must have from 5 to 7 cards')
+
+    # Column by column accumulation is faster than a gather of the whole [N, 7] block
+    keys = CARD_KEYS[hole_cards[:, 0]]
+    for column in range(1, hole_cards.shape[1]):
+        keys += CARD_KEYS[hole_cards[:, column]]
+    for column in range(board.shape[1]):
+        keys += CARD_KEYS[board[:, column]]
+
+    lo = keys & ((1 << HI_SHIFT) - 1)
+    hi = (keys >> HI_SHIFT) & ((1 << (SUIT_SHIFT - HI_SHIFT)) - 1)
+    result = STRENGTHS[num_cards][HI_OFFSETS[num_cards][hi] + LO_INDEX[lo]]
+
+    # Flushes are rare, so they are scored separately for the few hands that have one
+    flush_suit = FLUSH_SUITS[keys >> SUIT_SHIFT]
+    flushes = np.flatnonzero(flush_suit >= 0)
+    if len(flushes):
+        flush_cards = np.concatenate([hole_cards[flushes], board[flushes]], axis=1).astype(np.intp)
+        in_suit = SUITS[flush_cards] == flush_suit[flushes, None]
+        masks = np.bitwise_or.reduce(np.where(in_suit, RANK_BITS[flush_cards], 0), axis=1)
+        result[flushes] = FLUSH_STRENGTHS[masks]
+
+    return result
+
+
+def compare_batch(hole_cards_0, hole_cards_1, board):
+    """
+    :param hole_cards_0: array [N, 2] of the first player card indices
+    :param hole_cards_1: array [N, 2] of the second player card indices
+    :param board: array [N, 3..5] of card indices
+    :return: boolean arrays (win, lose, tie) [N] from the first player point of view
+    """
+    strength_0 = evaluate_batch(hole_cards_0, board)
+    strength_1 = evaluate_batch(hole_cards_1, board)
+    return strength_0 > strength_1, strength_0 < strength_1, strength_0 == strength_1
@@ -0,0 +1,469 @@
+# Headless bot vs bot simulation
+#
+# Game.play plays against a human through input and print. A Simulation plays the rules of Game
+# between two action providers without any output: the blinds and the bets add up over the streets,
+# the small blind acts first preflop and the big blind afterwards, a check or a call after the first
+# action of a street ends it, a raise adds at least the big blind (less only all-in), the streets are
+# skipped once a player is all-in, and a fold or the showdown ends the hand. Stacks are reset to
+# starting_chips before every hand and the positions alternate, so hands are independent samples.
+#
+# A provider is a callable that gets the View of a decision and returns an (action, bet) tuple, the
+# same as Player.ask_action. An invalid action raises ValueError instead of asking again.
+#
+#   calling_station  - checks or calls
+#   StyleProvider    - weights of a Bot style (Optimal, LAG, TAG, TP, LP) shifted by the hand strength
+#   StrategyProvider - trained strategies of the strategy file, a StyleProvider where there is none
+#   PlayerProvider   - any players.Player, e.g. a Bot, through a stand-in game
+#
+# Hands are dealt in batches of BATCH by a dealer.Dealer and the showdowns of a batch are settled
+# at once with showdown.evaluate_batch, so a hand costs little more than the calls of its providers.
+# With duplicate dealing every deal is played twice with the seats swapped, and both hands draw the
+# same random numbers from View.rng, so the luck of the cards and of the sampled actions cancels out
+# in the sum of the two hands. The pair is the sample of the confidence interval. The hands of a
+# simulation can be recorded with a hand_history.HandHistoryWriter.
+# Providers sample their actions from View.rng, a random.Random seeded from the same seed, so a match
+# is reproducible. The hand strength of View.strength is the class equity against a random hand
+# preflop and the share of STRENGTH_OPPONENTS random hands beaten on the current board afterwards
+# (Bot rolls out the board with equity, which is too slow here). It is computed for the whole batch
+# the first time a provider asks for it. The class equities come from the equity matrix given to the
+# Simulation or the stored one, a missing matrix is only built on request (--build-equity).
+import argparse
+import io
+import os
+import random
+from contextlib import redirect_stdout
+from math import sqrt
+from statistics import NormalDist
+import numpy as np
+from cards import CARDS
+from dealer import Dealer
+from hand_history import HandHistoryWriter
+from abstraction import bucket_info_set
+from bet_abstraction import DEFAULT_ABSTRACTION
+from players import BASE_STRATEGIES, Bot, Player, expand_strategy, shift_by_strength, style_strategy
+from ranges import RangeEquity, class_index, load_equity_matrix
+from showdown import evaluate_batch
+from strategy_store import CachedStrategyStore, shared_store
+
+BATCH = 1024
+STRENGTH_OPPONENTS = 16
+STREETS = (0, 3, 4, 5)
+
+# Preflop class of two card indices
+CLASS_OF = np.array([[class_index(first % 13 + 2, second % 13 + 2, first // 13 == second // 13) for second in range(52)]
+                     for first in range(52)])
+
+
+class View:
+    # State of a decision seen by the acting provider. The object is reused, read it during the call only.
+    # position: 0 - small blind, 1 - big blind; history: actions of the street as in the info sets ('p', 'c', 'b')
+    __slots__ = ('hole_cards', 'board', 'pot', 'bet', 'opponent_bet', 'chips', 'opponent_chips', 'big_blind',
+                 'min_bet', 'history', 'position', 'rng', 'simulation', 'hand')
+
+    def strength(self):
+        # Strength of the hole cards on the current board, 0 - 1
+        return self.simulation.strength(self.hand, self.position, len(self.board))
+
+
+def bot_actions(view, abstraction=DEFAULT_ABSTRACTION):
+    # The actions of Bot.ask_action: fold, check, call, the raises of the menu of the street, all-in
+    to_call = view.opponent_bet - view.bet
+    return [('fold', 0), ('check', 0), ('call', to_call)] + \
+        [('raise', bet) for bet in abstraction.raises(len(view.board), view.pot, to_call)] + [('raise', view.chips)]
+
+
+def choose_action(view, strategy, abstraction=DEFAULT_ABSTRACTION):
+    """
+    :param view: View of the decision
+    :param strategy: weights of the bot actions
+    :param abstraction: BetAbstraction of the raises
+    :return: (action, bet) sampled among the valid actions
+    """
+    actions = bot_actions(view, abstraction)
+    to_call = view.opponent_bet - view.bet
+    # The checks of Game.bidding, a fold without a bet to call is a check as in Bot.ask_action
+    if to_call:
+        weights = [strategy[0], 0.0, strategy[2]]
+    else:
+        weights = [0.0, strategy[0] + strategy[1], 0.0]
+    can_raise = view.opponent_chips > 0
+    chips, min_bet = view.chips, view.min_bet
+    for weight, (_, bet) in zip(strategy[3:], actions[3:]):
+        valid = can_raise and to_call < bet and (min_bet <= bet < chips or bet == chips)
+        weights.append(weight if valid else 0.0)
+    if not any(weights):
+        return actions[2] if to_call else actions[1]
+    return view.rng.choices(actions, weights=weights)[0]
+
+
+def calling_station(view):
+    return ('check', 0) if view.bet == view.opponent_bet else ('call', view.opponent_bet - view.bet)
+
+
+class StyleProvider:
+    def __init__(self, style='Optimal', abstraction=DEFAULT_ABSTRACTION):
+        self.style = style
+        self.abstraction = abstraction
+        # Weights of the style for the menu of every street
+        self.strategies = {street: style_strategy(style, len(menu)) for street, menu in abstraction.menus.items()}
+
+    def __call__(self, view):
+        strategy = shift_by_strength(self.strategies[len(view.board)], view.strength())
+        return choose_action(view, strategy, self.abstraction)
+
+
+class StrategyProvider:
+    def __init__(self, store=None, fallback=None, abstraction=DEFAULT_ABSTRACTION):
+        """
+        :param store: strategies by info set, the shared strategy file by default
+        :param fallback: provider of the info sets without a strategy, StyleProvider() by default
+        :param abstraction: BetAbstraction of the raises
+        """
+        self.store = store if store is not None else shared_store()
+        self.fallback = fallback if fallback is not None else StyleProvider(abstraction=abstraction)
+        self.abstraction = abstraction
+
+    def __call__(self, view):
+        # Same keys as the trainer and Bot: bucketed cards and the actions of the street
+        strategy = self.store.get(bucket_info_set(view.hole_cards, view.board) + view.history)
+        if strategy is None:
+            return self.fallback(view)
+        sizes = len(self.abstraction.menus[len(view.board)])
+        return choose_action(view, expand_strategy(strategy, sizes), self.abstraction)
+
+
+class StandInGame:
+    # The attributes of Game read by the players, the opponent is the user
+    def __init__(self, player):
+        self.bot = player
+        self.user = Player()
+        self.community_cards = []
+        self.pot = 0
+        self.big_blind = 0
+        self.min_bet = 0
+
+
+class PlayerProvider:
+    def __init__(self, player):
+        # The player is attached to a stand-in game, its prints are discarded
+        self.player = player
+        self.game = StandInGame(player)
+        player.game = self.game
+        self.game.user.game = self.game
+
+    def __call__(self, view):
+        player, game = self.player, self.game
+        player.hole_cards, player.bet, player.chips = view.hole_cards, view.bet, view.chips
+        game.user.bet, game.user.chips = view.opponent_bet, view.opponent_chips
+        game.community_cards, game.pot, game.big_blind, game.min_bet = view.board, view.pot, view.big_blind, view.min_bet
+        if isinstance(player, Bot):
+            player.update_info_set()
+            player.info_set += view.history
+        with redirect_stdout(io.StringIO()):
+            return player.ask_action()
+
+
+class MatchResult:
+    def __init__(self, big_blind, confidence=0.95):
+        # Chips won by the first provider, squares - sum of the squared winnings of the samples
+        # (hands, or pairs of hands with duplicate dealing)
+        self.big_blind = big_blind
+        self.confidence = confidence
+        self.hands = 0
+        self.samples = 0
+        self.winnings = 0
+        self.squares = 0
+        self.showdowns = 0
+
+    def merge(self, other):
+        # Adds the hands of another result of the same match, e.g. of another process
+        self.hands += other.hands
+        self.samples += other.samples
+        self.winnings += other.winnings
+        self.squares += other.squares
+        self.showdowns += other.showdowns
+        return self
+
+    @property
+    def bb_per_100(self):
+        return 100 * self.winnings / self.hands / self.big_blind if self.hands else 0.0
+
+    @property
+    def margin(self):
+        # Half width of the confidence interval of bb_per_100
+        if self.samples < 2:
+            return float('inf')
+        mean = self.winnings / self.samples
+        variance = (self.squares - self.samples * mean ** 2) / (self.samples - 1)
+        z = NormalDist().inv_cdf(0.5 + self.confidence / 2)
+        # Margin of the mean of a sample, scaled to a hand
+        return z * sqrt(max(variance, 0.0) / self.samples) * self.samples / self.hands * 100 / self.big_blind
+
+    @property
+    def confidence_interval(self):
+        return self.bb_per_100 - self.margin, self.bb_per_100 + self.margin
+
+    def __str__(self):
+        return (f'hands: {self.hands} | {self.bb_per_100:.2f} ± {self.margin:.2f} bb/100 | '
+                f'showdowns: {self.showdowns / max(self.hands, 1):.1%}')
+
+
+class Simulation:
+    def __init__(self, provider_a, provider_b, seed=None, starting_chips=5000, small_blind=250, batch=BATCH,
+                 duplicate=False, hand_history=None, equity_matrix=None):
+        """
+        :param provider_a: first provider, the small blind of the even hands
+        :param provider_b: second provider
+        :param seed: seed of the deals and of View.rng
+        :param starting_chips: stack of both players at the start of every hand
+        :param small_blind: small blind, the big blind is twice as much
+        :param batch: number of hands dealt at once
+        :param duplicate: play every deal twice with the seats swapped
+        :param hand_history: HandHistoryWriter that records the hands
+        :param equity_matrix: [169, 169] preflop class equities, the stored matrix by default
+        """
+        if starting_chips <= 2 * small_blind:
+            raise ValueError('The stacks must cover the big blind')
+        self.providers = (provider_a, provider_b)
+        self.starting_chips = starting_chips
+        self.small_blind = small_blind
+        self.big_blind = 2 * small_blind
+        self.batch = batch
+        self.duplicate = duplicate
+        self.hand_history = hand_history
+        self.equity_matrix = equity_matrix
+        self.preflop_strengths = None
+        deals, strengths, actions = np.random.SeedSequence(seed).spawn(3)
+        self.dealer = Dealer(deals)
+        self.strength_generator = np.random.default_rng(strengths)
+        self.rng = random.Random(int(actions.generate_state(1)[0]))
+        self.result = MatchResult(self.big_blind)
+
+        self.views = (View(), View())
+        for position, view in enumerate(self.views):
+            view.position = position
+            view.big_blind = view.min_bet = self.big_blind
+            view.rng = self.rng
+            view.simulation = self
+        self.deals = None
+        self.strengths = None
+        # Actions of the last hand: streets separated by '/', and the chips of its raises
+        self.actions = ''
+        self.raises = []
+
+    def strength(self, hand, position, num_board):
+        if self.strengths is None:
+            self.strengths = self._strengths()
+        return self.strengths[position][num_board][hand]
+
+    def _strengths(self):
+        # [position][number of board cards] - hand strengths of the batch
+        if self.preflop_strengths is None:
+            matrix = self.equity_matrix if self.equity_matrix is not None else load_equity_matrix(build=False)
+            self.preflop_strengths = RangeEquity(matrix).class_equities(np.ones(CLASS_OF.max() + 1))
+        preflop = self.preflop_strengths
+        deals, rng = self.deals, self.strength_generator
+        rows = np.repeat(np.arange(len(deals)), STRENGTH_OPPONENTS)[:, None]
+        strengths = ([None] * 6, [None] * 6)
+        for position in range(2):
+            hole = deals[:, 2 * position:2 * position + 2]
+            strengths[position][0] = preflop[CLASS_OF[hole[:, 0], hole[:, 1]]].tolist()
+            opponent_hole = deals[:, 2 - 2 * position:4 - 2 * position]
+            for num_board in STREETS[1:]:
+                board = deals[:, 4:4 + num_board]
+                # Cards unknown to the player: the opponent hole cards, the rest of the board and the deck
+                live = np.concatenate([opponent_hole, deals[:, 4 + num_board:]], axis=1)
+                first = rng.integers(0, live.shape[1], len(rows))
+                second = rng.integers(0, live.shape[1] - 1, len(rows))
+                second += second >= first
+                villain = live[rows, np.stack([first, second], axis=1)]
+                hero_strength = np.repeat(evaluate_batch(hole, board), STRENGTH_OPPONENTS)
+                villain_strength = evaluate_batch(villain, np.repeat(board, STRENGTH_OPPONENTS, axis=0))
+                beaten = (hero_strength > villain_strength) + (hero_strength == villain_strength) / 2
+                strengths[position][num_board] = beaten.reshape(-1, STRENGTH_OPPONENTS).mean(axis=1).tolist()
+        return strengths
+
+    def run(self, hands):
+        """
+        :param hands: number of hands to play, even with duplicate dealing
+        :return: MatchResult of all the hands played by the simulation
+        """
+        if self.duplicate and hands % 2:
+            raise ValueError('Duplicate dealing plays the hands in pairs')
+        batch = self.batch - self.batch % 2 if self.duplicate else self.batch
+        while hands > 0:
+            size = min(hands, batch)
+            self._play_batch(size)
+            hands -= size
+        return self.result
+
+    def _play_batch(self, size):
+        # Shuffled decks, the cards of a hand are the small blind, the big blind and the board
+        deals = size // 2 if self.duplicate else size
+        self.deals = self.dealer.decks(deals)
+        self.strengths = None
+        board = self.deals[:, 4:9]
+        winners = np.sign(evaluate_batch(self.deals[:, :2], board).astype(np.int64) -
+                          evaluate_batch(self.deals[:, 2:4], board)).tolist()
+
+        result = self.result
+        winnings = squares = showdowns = samples = sample = 0
+        rows = self.deals[:, :9].tolist()
+        recording = self.hand_history is not None
+        if recording:
+            won, hand_actions, raises = [], [], []
+        for hand in range(size):
+            # The first provider is the small blind of the even hands
+            flip = (result.hands + hand) & 1
+            providers = (self.providers[1], self.providers[0]) if flip else self.providers
+            deal = hand
+            if self.duplicate:
+                # The positions alternate, so the two hands of a deal have the providers in swapped seats
+                deal = hand >> 1
+                if hand & 1:
+                    self.rng.setstate(state)
+                else:
+                    state = self.rng.getstate()
+            chips, showdown = self._play_hand(deal, [CARDS[index] for index in rows[deal]], providers, winners[deal])
+            if recording:
+                won.append(chips)
+                hand_actions.append(self.actions)
+                raises += self.raises
+            if flip:
+                chips = -chips
+            winnings += chips
+            sample += chips
+            showdowns += showdown
+            if not self.duplicate or hand & 1:
+                squares += sample * sample
+                samples += 1
+                sample = 0
+        if recording:
+            cards = np.repeat(self.deals[:, :9], 2, axis=0) if self.duplicate else self.deals[:, :9]
+            seats = (np.arange(result.hands, result.hands + size) & 1).astype(np.uint8)
+            self.hand_history.write_block(result.hands, cards, seats, won, hand_actions, raises)
+        result.hands += size
+        result.samples += samples
+        result.winnings += winnings
+        result.squares += squares
+        result.showdowns += showdowns
+
+    def _play_hand(self, hand, cards, providers, winner):
+        """
+        :param hand: index of the deal in the batch
+        :param cards: 9 Card objects: small blind, big blind, board
+        :param providers: providers of the small and the big blind
+        :param winner: 1 - the small blind wins the showdown, -1 - the big blind, 0 - a split pot
+        :return: (chips won by the small blind, 1 if the hand went to showdown else 0)
+        """
+        stack = self.starting_chips
+        bets = [self.small_blind, self.big_blind]
+        chips = [stack - bets[0], stack - bets[1]]
+        views = self.views
+        for position, view in enumerate(views):
+            view.hole_cards = cards[2 * position:2 * position + 2]
+            view.hand = hand
+        streets = []
+        self.raises = raises = []
+
+        for num_board in STREETS:
+            board = cards[4:4 + num_board]
+            if num_board:
+                if chips[0] == 0 or chips[1] == 0:
+                    streets.append('')
+                    continue
+                player = 1
+            else:
+                player = 0
+            history = ''
+            asked = 0
+            while True:
+                opponent = 1 - player
+                view = views[player]
+                view.board = board
+                view.pot = bets[0] + bets[1]
+                view.bet, view.opponent_bet = bets[player], bets[opponent]
+                view.chips, view.opponent_chips = chips[player], chips[opponent]
+                view.history = history
+                act, bet = providers[player](view)
+                asked += 1
+
+                to_call = bets[opponent] - bets[player]
+                if act == 'fold':
+                    streets.append(history + 'f')
+                    self.actions = '/'.join(streets)
+                    return (-bets[0] if player == 0 else bets[1]), 0
+                if act == 'check':
+                    if to_call != 0:
+                        raise ValueError('Invalid action')
+                    history += 'p'
+                    if asked >= 2:
+                        streets.append(history)
+                        break
+                elif act == 'call':
+                    if to_call <= 0:
+                        raise ValueError('Invalid action')
+                    amount = min(to_call, chips[player])
+                    bets[player] += amount
+                    chips[player] -= amount
+                    history += 'c'
+                    if asked >= 2:
+                        streets.append(history)
+                        break
+                elif act == 'raise':
+                    if chips[opponent] == 0 or not (to_call < bet and (self.big_blind <= bet < chips[player] or
+                                                                       bet == chips[player])):
+                        raise ValueError('Invalid action')
+                    bets[player] += bet
+                    chips[player] -= bet
+                    history += 'b'
+                    raises.append(bet)
+                else:
+                    raise ValueError('Invalid action')
+                player = opponent
+
+        self.actions = '/'.join(streets)
+        # Equal stacks, so the bets are equal at the showdown
+        return winner * bets[0], 1
+
+
+def simulate(provider_a, provider_b, hands, seed=None, **kwargs):
+    # Chips won by provider_a against provider_b over the hands, kwargs go to Simulation
+    return Simulation(provider_a, provider_b, seed=seed, **kwargs).run(hands)
+
+
+def make_provider(name):
+    # A Bot style, 'station', 'strategy' (the trained strategies) or the path of a strategy file
+    if name == 'station':
+        return calling_station
+    if name == 'strategy':
+        return StrategyProvider()
+    if name in BASE_STRATEGIES:
+        return StyleProvider(name)
+    if os.path.exists(name):
+        return StrategyProvider(CachedStrategyStore(name))
+    raise ValueError(f'Unknown provider: {name}')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('first', help='Bot style, station, strategy or a strategy file')
+    parser.add_argument('second', help='Bot style, station, strategy or a strategy file')
+    parser.add_argument('--hands', type=int, default=100_000)
+    parser.add_argument('--seed', type=int, default=None)
+    parser.add_argument('--duplicate', action='store_true', help='play every deal twice with the seats swapped')
+    parser.add_argument('--starting-chips', type=int, default=5000, help='stack of both players at every hand')
+    parser.add_argument('--small-blind', type=int, default=250)
+    parser.add_argument('--history', default=None, help='directory of the hand history files')
+    parser.add_argument('--build-equity', action='store_true', help='build the preflop equity matrix if it is missing')
+    args = parser.parse_args()
+    if args.build_equity:
+        load_equity_matrix()
+    # The files record the stacks and the blinds of the simulation
+    hand_history = HandHistoryWriter(args.history, args.starting_chips, args.small_blind) if args.history else None
+    result = simulate(make_provider(args.first), make_provider(args.second), args.hands, args.seed,
+                      starting_chips=args.starting_chips, small_blind=args.small_blind, duplicate=args.duplicate,
+                      hand_history=hand_history)
+    if hand_history is not None:
+        hand_history.close()
+    print(f'{args.first} vs {args.second}: {result}')
@@ -0,0 +1,61 @@
+import unittest
+import numpy as np
+from players import Bot
+from ranges import NUM_CLASSES
+from simulation import MatchResult, PlayerProvider, StyleProvider, calling_station, simulate
+
+
+# Even preflop equities, the tests do not need the stored matrix
+EQUITY_MATRIX = np.full((NUM_CLASSES, NUM_CLASSES), 0.5, dtype=np.float32)
+
+
+def play(*args, **kwargs):
+    return simulate(*args, equity_matrix=EQUITY_MATRIX, **kwargs)
+
+
+class TestSimulation(unittest.TestCase):
+
+    def test_reproducible(self):
+        first = play(StyleProvider('LAG'), StyleProvider('TAG'), 2000, seed=7)
+        second = play(StyleProvider('LAG'), StyleProvider('TAG'), 2000, seed=7)
+        self.assertEqual(first.hands, 2000)
+        self.assertEqual((first.winnings, first.squares, first.showdowns),
+                         (second.winnings, second.squares, second.showdowns))
+
+    def test_calling_stations_go_to_showdown(self):
+        result = play(calling_station, calling_station, 1000, seed=1)
+        self.assertEqual(result.showdowns, 1000)
+        # Only the big blinds are at stake
+        self.assertLessEqual(result.squares, 1000 * 500 ** 2)
+        low, high = result.confidence_interval
+        self.assertLess(low, result.bb_per_100)
+        self.assertLess(result.bb_per_100, high)
+
+    def test_duplicate_cancels_the_luck(self):
+        result = play(StyleProvider('TAG'), StyleProvider('TAG'), 1000, seed=2, duplicate=True)
+        self.assertEqual(result.samples, 500)
+        self.assertEqual(result.winnings, 0)
+        self.assertEqual(result.squares, 0)
+        with self.assertRaises(ValueError):
+            play(calling_station, calling_station, 11, duplicate=True)
+
+    def test_invalid_action(self):
+        with self.assertRaises(ValueError):
+            play(lambda view: ('check', 0), calling_station, 10, seed=1)
+
+    def test_player_provider(self):
+        bot = Bot()
+        bot.style = 'TAG'
+        result = play(PlayerProvider(bot), calling_station, 4, seed=3)
+        self.assertEqual(result.hands, 4)
+
+    def test_margin(self):
+        result = MatchResult(big_blind=10)
+        result.hands = result.samples = 4
+        result.winnings, result.squares = 20, 400
+        self.assertEqual(result.bb_per_100, 50)
+        self.assertAlmostEqual(result.margin, 1.959964 * 5 * 10, places=3)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,157 @@
+# Binary file of average strategies with memory-mapped lookups
+#
+# Layout (little endian):
+#   header - magic, version, number of actions, number of info sets, key width, probability bytes
+#   keys   - info set keys as UTF-8, null padded to the key width and sorted
+#   probabilities - quantized probabilities [info sets, actions] as uint8 or uint16
+# Both arrays start at 64-byte aligned offsets and are memory-mapped on load, so opening a file
+# takes constant time and a lookup is a binary search that only touches the pages it reads.
+#
+# Bots share one CachedStrategyStore per process (shared_store): the file is opened on the first
+# lookup, and decoded strategies, as well as the info sets missing from the file, are kept in
+# a bounded LRU cache.
+import os
+import struct
+from functools import lru_cache
+import numpy as np
+
+MAGIC = b'PKSTRAT\0'
+VERSION = 1
+HEADER = struct.Struct('<8sIIQII')
+ALIGNMENT = 64
+CACHE_SIZE = 65_536
+STRATEGY_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'train', 'HUNL-strategy.bin')
+
+
+def _aligned(offset):
+    return (offset + ALIGNMENT - 1) // ALIGNMENT * ALIGNMENT
+
+
+def write_strategies(path, info_sets, strategies, dtype=np.uint16):
+    """
+    :param path: output file
+    :param info_sets: info set keys
+    :param strategies: array [len(info_sets), actions] of probabilities
+    :param dtype: np.uint8 or np.uint16, precision of the stored probabilities
+    """
+    dtype = np.dtype(dtype)
+    strategies = np.asarray(strategies, dtype=np.float64)
+    if strategies.ndim != 2:
+        strategies = strategies.reshape(len(info_sets), -1 if len(info_sets) else 0)
+    keys = np.array([info_set.encode() for info_set in info_sets], dtype=bytes)
+    if not len(keys):
+        keys = keys.astype('S1')
+    order = np.argsort(keys, kind='stable')
+    keys = keys[order]
+    if len(keys) > 1 and (keys[1:] == keys[:-1]).any():
+        raise ValueError('Info set keys are not unique')
+    scale = np.iinfo(dtype).max
+    quantized = np.rint(strategies[order] * scale).astype(dtype)
+
+    keys_offset = _aligned(HEADER.size)
+    probabilities_offset = _aligned(keys_offset + keys.nbytes)
+    with open(path, 'wb') as file:
+        file.write(HEADER.pack(MAGIC, VERSION, strategies.shape[1], len(keys), keys.dtype.itemsize, dtype.itemsize))
+        file.seek(keys_offset)
+        file.write(keys.tobytes())
+        file.seek(probabilities_offset)
+        file.write(quantized.tobytes())
+
+
+class StrategyStore:
+    def __init__(self, path=STRATEGY_PATH):
+        with open(path, 'rb') as file:
+            magic, version, num_actions, count, key_width, probability_bytes = HEADER.unpack(file.read(HEADER.size))
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f'Not a strategy file: {path}')
+        self.num_actions = num_actions
+        self.count = count
+        dtype = np.uint8 if probability_bytes == 1 else np.uint16
+        self.scale = np.iinfo(dtype).max
+
+        keys_offset = _aligned(HEADER.size)
+        probabilities_offset = _aligned(keys_offset + count * key_width)
+        if count:
+            self.keys = np.memmap(path, dtype=f'S{key_width}', mode='r', offset=keys_offset, shape=(count,))
+            self.probabilities = np.memmap(path, dtype=dtype, mode='r', offset=probabilities_offset,
+                                           shape=(count, num_actions))
+        else:
+            self.keys = np.zeros(0, dtype='S1')
+            self.probabilities = np.zeros((0, num_actions), dtype=dtype)
+
+    def __len__(self):
+        return self.count
+
+    def _position(self, info_set):
+        key = info_set.encode()
+        position = int(np.searchsorted(self.keys, key))
+        if position < self.count and self.keys[position] == key:
+            return position
+        return None
+
+    def __contains__(self, info_set):
+        return self._position(info_set) is not None
+
+    def __getitem__(self, info_set):
+        position = self._position(info_set)
+        if position is None:
+            raise KeyError(info_set)
+        # Rounding may move the sum away from 1 by a few units
+        quantized = self.probabilities[position].astype(np.float64)
+        total = quantized.sum()
+        return (quantized / total).tolist() if total > 0 else [1 / self.num_actions] * self.num_actions
+
+    def get(self, info_set, default=None):
+        try:
+            return self[info_set]
+        except KeyError:
+            return default
+
+
+class CachedStrategyStore:
+    def __init__(self, path=STRATEGY_PATH, maxsize=CACHE_SIZE):
+        self.path = path
+        self._store = None
+        self._lookup = lru_cache(maxsize=maxsize)(self._decode)
+
+    @property
+    def store(self):
+        # Opened on the first use, an empty store when the strategies were not trained
+        if self._store is None:
+            self._store = StrategyStore(self.path) if os.path.exists(self.path) else {}
+        return self._store
+
+    def _decode(self, info_set):
+        strategy = self.store.get(info_set)
+        return tuple(strategy) if strategy is not None else None
+
+    def __contains__(self, info_set):
+        return self._lookup(info_set) is not None
+
+    def __getitem__(self, info_set):
+        strategy = self._lookup(info_set)
+        if strategy is None:
+            raise KeyError(info_set)
+        return strategy
+
+    def get(self, info_set, default=None):
+        strategy = self._lookup(info_set)
+        return strategy if strategy is not None else default
+
+    def cache_info(self):
+        # Named tuple of hits, misses, maxsize and currsize
+        return self._lookup.cache_info()
+
+    def cache_clear(self):
+        self._lookup.cache_clear()
+
+
+_shared = None
+
+
+def shared_store():
+    # Store shared by every bot of the process
+    global _shared
+    if _shared is None:
+        _shared = CachedStrategyStore()
+    return _shared
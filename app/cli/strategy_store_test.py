@@ -0,0 +1,45 @@
+import os
+import tempfile
+import unittest
+from strategy_store import CachedStrategyStore, StrategyStore, write_strategies
+
+
+class TestStrategyStore(unittest.TestCase):
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = os.path.join(directory.name, 'strategy.bin')
+
+    def test_round_trip(self):
+        strategies = {'A♣K♣': [0.1, 0.2, 0.7], 'A♣K♣b': [0.0, 1.0, 0.0], 'F12pb': [1 / 3, 1 / 3, 1 / 3], '7♣2♦': [1.0, 0.0, 0.0]}
+        write_strategies(self.path, list(strategies), list(strategies.values()))
+        store = StrategyStore(self.path)
+        self.assertEqual(len(store), 4)
+        for info_set, strategy in strategies.items():
+            self.assertIn(info_set, store)
+            for stored, probability in zip(store[info_set], strategy):
+                self.assertAlmostEqual(stored, probability, places=4)
+        self.assertNotIn('A♣K♣bb', store)
+        self.assertNotIn('A♣K', store)
+        self.assertIsNone(store.get('T♣9♣'))
+
+    def test_empty(self):
+        write_strategies(self.path, [], [])
+        store = StrategyStore(self.path)
+        self.assertEqual(len(store), 0)
+        self.assertNotIn('A♣K♣', store)
+
+    def test_cache_counters(self):
+        write_strategies(self.path, ['A♣K♣'], [[0.25, 0.25, 0.5]])
+        store = CachedStrategyStore(self.path, maxsize=2)
+        self.assertIn('A♣K♣', store)
+        self.assertEqual(store['A♣K♣'], (0.25, 0.25, 0.5))
+        self.assertNotIn('7♣2♦', store)
+        self.assertNotIn('7♣2♦', store)
+        info = store.cache_info()
+        self.assertEqual((info.hits, info.misses, info.currsize), (2, 2, 2))
+
+
+if __name__ == '__main__':
+    unittest.main()
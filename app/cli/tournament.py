@@ -0,0 +1,101 @@
+# Round robin of bot providers
+#
+# Every pair of entrants (Bot styles, 'station', 'strategy' or strategy files, see
+# simulation.make_provider) plays a headless match with duplicate dealing. A match is split into
+# shards of SHARD_HANDS hands that run on a process pool, each with its own seed derived from the
+# tournament seed, the pair and the shard, so the results do not depend on the number of processes.
+# Providers are built in the workers from the entrant names, the shards of a match are merged into
+# one MatchResult.
+import argparse
+from itertools import combinations
+from multiprocessing import Pool
+import numpy as np
+from ranges import load_equity_matrix
+from simulation import Simulation, make_provider
+
+SHARD_HANDS = 20_000
+
+
+def play_shard(task):
+    # Worker: plays a shard of a match, returns (first entrant, second entrant, MatchResult)
+    first, second, hands, seed, duplicate, equity_matrix = task
+    simulation = Simulation(make_provider(first), make_provider(second), seed=seed, duplicate=duplicate,
+                            equity_matrix=equity_matrix)
+    return first, second, simulation.run(hands)
+
+
+def shards(entrants, hands, seed, duplicate=True, shard_hands=SHARD_HANDS, equity_matrix=None):
+    """
+    :param entrants: names of the entrants
+    :param hands: number of hands of every match
+    :param seed: seed of the tournament
+    :param equity_matrix: preflop equity matrix of the simulations, the stored one by default
+    :return: tasks of play_shard
+    """
+    tasks = []
+    for pair, (first, second) in enumerate(combinations(entrants, 2)):
+        for shard, start in enumerate(range(0, hands, shard_hands)):
+            size = min(shard_hands, hands - start)
+            tasks.append((first, second, size, [seed, pair, shard], duplicate, equity_matrix))
+    return tasks
+
+
+def tournament(entrants, hands, seed=None, workers=1, duplicate=True, shard_hands=SHARD_HANDS, equity_matrix=None):
+    """
+    :param entrants: names of the entrants, e.g. ['LAG', 'TAG', 'TP', 'LP']
+    :param hands: number of hands of every match, even with duplicate dealing
+    :param seed: seed of the tournament, random by default
+    :param workers: number of processes
+    :param equity_matrix: preflop equity matrix of the simulations, the stored one by default
+    :return: {(first, second): MatchResult of first against second}
+    """
+    if len(set(entrants)) != len(entrants):
+        raise ValueError('Entrants must be unique')
+    if duplicate and (hands % 2 or shard_hands % 2):
+        raise ValueError('Duplicate dealing plays the hands in pairs')
+    seed = seed if seed is not None else np.random.SeedSequence().entropy
+    tasks = shards(entrants, hands, seed, duplicate, shard_hands, equity_matrix)
+
+    results = {}
+    if workers > 1:
+        with Pool(workers) as pool:
+            shard_results = list(pool.imap_unordered(play_shard, tasks))
+    else:
+        shard_results = map(play_shard, tasks)
+    for first, second, result in shard_results:
+        if (first, second) in results:
+            results[first, second].merge(result)
+        else:
+            results[first, second] = result
+    return results
+
+
+def standings(entrants, results):
+    # Mean bb/100 of every entrant against all the others, best first
+    scores = {entrant: [] for entrant in entrants}
+    for (first, second), result in results.items():
+        scores[first].append(result.bb_per_100)
+        scores[second].append(-result.bb_per_100)
+    return sorted(((entrant, sum(score) / len(score) if score else 0.0) for entrant, score in scores.items()),
+                  key=lambda item: item[1], reverse=True)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('entrants', nargs='+', help='Bot styles, station, strategy or strategy files')
+    parser.add_argument('--hands', type=int, default=200_000, help='number of hands of every match')
+    parser.add_argument('--workers', type=int, default=1, help='number of processes')
+    parser.add_argument('--seed', type=int, default=None)
+    parser.add_argument('--no-duplicate', action='store_true', help='deal every hand once')
+    parser.add_argument('--build-equity', action='store_true', help='build the preflop equity matrix if it is missing')
+    args = parser.parse_args()
+    if args.build_equity:
+        load_equity_matrix()
+
+    results = tournament(args.entrants, args.hands, args.seed, args.workers, not args.no_duplicate)
+    for (first, second), result in results.items():
+        low, high = result.confidence_interval
+        print(f'{first} vs {second}: {result.bb_per_100:.2f} bb/100 [{low:.2f}, {high:.2f}] | {result}')
+    print()
+    for place, (entrant, score) in enumerate(standings(args.entrants, results), 1):
+        print(f'{place}. {entrant}: {score:.2f} bb/100')
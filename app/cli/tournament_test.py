@@ -0,0 +1,30 @@
+import unittest
+import numpy as np
+from ranges import NUM_CLASSES
+from tournament import standings, tournament
+
+# Even preflop equities, the tests do not need the stored matrix
+EQUITY_MATRIX = np.full((NUM_CLASSES, NUM_CLASSES), 0.5, dtype=np.float32)
+
+
+class TestTournament(unittest.TestCase):
+
+    def test_round_robin(self):
+        entrants = ['LAG', 'TP', 'station']
+        results = tournament(entrants, 600, seed=4, shard_hands=200, equity_matrix=EQUITY_MATRIX)
+        self.assertEqual(set(results), {('LAG', 'TP'), ('LAG', 'station'), ('TP', 'station')})
+        for result in results.values():
+            self.assertEqual(result.hands, 600)
+            self.assertEqual(result.samples, 300)
+        self.assertEqual(sorted(entrant for entrant, _ in standings(entrants, results)), sorted(entrants))
+
+    def test_independent_of_workers(self):
+        serial = tournament(['TAG', 'LP'], 400, seed=5, shard_hands=200, equity_matrix=EQUITY_MATRIX)
+        parallel = tournament(['TAG', 'LP'], 400, seed=5, workers=2, shard_hands=200,
+                              equity_matrix=EQUITY_MATRIX)
+        self.assertEqual(serial['TAG', 'LP'].winnings, parallel['TAG', 'LP'].winnings)
+        self.assertEqual(serial['TAG', 'LP'].squares, parallel['TAG', 'LP'].squares)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,11 +1,27 @@
+import os
+import sys
+import random
+import argparse
+from multiprocessing import Pool, Value
 import numpy as np
-import itertools
-import joblib
 from tqdm import tqdm
-from app.poker.poker import *
 
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'cli'))
+from cards import mask_of
+from dealer import Dealer
+from game_state import BIG_BLIND, SMALL_BLIND, STARTING_CHIPS
+from evaluator import evaluate_mask
+from ranges import NUM_CLASSES, hand_class, load_equity_matrix
+from isomorphism import info_set
+from abstraction import STREETS, bucket_info_set, load_buckets
+from strategy_store import STRATEGY_PATH, write_strategies
+from regret_table import ALGORITHMS, RegretTable, SharedRegretTable
+from public_tree import PublicTreeCFR, all_nodes, build_tree, decision_nodes
+from betting_tree import DECISION, SHOWDOWN, BettingTree
+import traversers
+from best_response import BestResponse, Convergence
+from checkpoint import Checkpoint
 
-game = Game()
 
 FOLD_CHECK = 'p'  # pass
 CALL = 'c'  # call 
@@ -13,171 +29,323 @@ RAISE = 'b'  # bet
 
 ACTIONS = [FOLD_CHECK, CALL, RAISE]
 NUM_ACTIONS = 3
-BET = game.big_blind
+BET = BIG_BLIND
+# Postflop streets start with the big blinds called preflop
+POT = 2 * BIG_BLIND
+MAX_BETS = 2
+# Sampled deals per iteration of the update rule (end_iteration)
+ITERATION_SAMPLES = 1000
+# The deals of HUNL can not be enumerated, vanilla CFR does not apply
+TRAVERSERS = [name for name in traversers.TRAVERSERS if name != 'vanilla']
+# Rows of the shared regret table when the streets have no bucket files and are keyed by canonical cards
+FALLBACK_CAPACITY = 1 << 24
+
+TreeMap = RegretTable(NUM_ACTIONS)
+# Dealer of a worker process, see init_worker
+WorkerDealer = None
+
+# All-in equity of every preflop class against every class
+EQUITY = load_equity_matrix()
+
+
+class Preflop(traversers.Game):
+    # Betting before the flop, the small blind is player 0 and holds cards[:2]
+    actions = ''.join(ACTIONS)
+    big_blind = BIG_BLIND
 
-TreeMap = {}
-
-
-class Node:
     def __init__(self):
-        self.infoSet = ''
-        self.regretSum = np.zeros(NUM_ACTIONS)
-        self.strategy = np.zeros(NUM_ACTIONS)
-        self.strategySum = np.zeros(NUM_ACTIONS)
-
-    def getStrategy(self, realizationWeight):
-        self.strategy = np.maximum(0, self.regretSum)
-        normalizingSum = np.sum(self.strategy)
-
-        if normalizingSum > 0:
-            self.strategy /= normalizingSum
-        else:
-            self.strategy = np.ones_like(self.strategy) / NUM_ACTIONS
-
-        self.strategySum += realizationWeight * self.strategy
-
-        return self.strategy
-
-    def getAverageStrategy(self):
-        normalizingSum = np.sum(self.strategySum)
-        avgStrategy = np.zeros(NUM_ACTIONS)
-
-        if normalizingSum > 0:
-            avgStrategy = self.strategySum / normalizingSum
-        else:
-            avgStrategy = np.ones_like(self.strategySum) / NUM_ACTIONS
-
-        return avgStrategy
-
-    def display(self):
-        average_strategy = np.around(self.getAverageStrategy(), 2)
-        print(f"{self.infoSet} -> {average_strategy}")
-
-
-def cfr_preflop(hole_cards, history, p0, p1):
-
-    game.players[game.sb_pos].hole_cards = hole_cards[:2]
-    game.players[game.bb_pos].hole_cards = hole_cards[2:]
-
-    # at first small blind chooses action
-    player = game.players[len(history) % 2]
-    opponent = game.players[1 - len(history) % 2]
-
-    # Determine whether the node is terminal
-    if len(history) > 1:
-        if history[-2:] == 'bp':  # raise (all-in), fold
-            return game.pot
-        elif history[-2:] == 'cp':  # call, check
-            return game.pot if game.determine_winner() == player else -game.pot
-        elif history[-2:] == 'bc':  # raise (all-in), call
-            return game.pot if game.determine_winner() == player else -game.pot
-        elif history[-2:] == 'bb' and opponent.chips == 0:  # raise, all-in
-            return game.pot if game.determine_winner() == player else -game.pot
-    elif len(history) == 1:
-        if history[0] == 'p':  # fold
-            return -game.pot
-
-    infoSet = ''.join(str(card) for card in player.hole_cards) + history
-    if infoSet not in TreeMap:
-        node = Node()
-        node.infoSet = infoSet
-        TreeMap[infoSet] = node
-    else:
-        node = TreeMap[infoSet]
-
-    strategy = node.getStrategy(p0 if player == game.players[0] else p1)
-    util = np.zeros(NUM_ACTIONS)
-    nodeUtil = 0
-
-    for pos, act in enumerate(ACTIONS):
-        if act == 'p':
-            if player.bet < opponent.bet: # fold case
-                nextHistory = history +'p'
-            elif player.bet == opponent.bet: # check case
-                nextHistory = history +'p'
-            else:
-                continue # not possible action is this case
-        elif act == 'c':
-            if player.bet < opponent.bet:
-                player.make_bet(abs(player.bet-opponent.bet))
-                nextHistory = history +'c'
-            else:
-                continue
-        elif act == 'b':
-            if opponent.chips != 0 and player.bet < opponent.bet:
-                player.make_bet(abs(player.bet-opponent.bet) + BET)
-                nextHistory = history +'b'
-            else:
-                continue
-        if player == game.players[0]:
-            util[pos] = - cfr_preflop(hole_cards, nextHistory, p0 * strategy[pos], p1)
-        else:
-            util[pos] = - cfr_preflop(hole_cards, nextHistory, p0, p1 * strategy[pos])
-
-    for pos in range(NUM_ACTIONS):
-        regret = util[pos] - nodeUtil
-        node.regretSum[pos] += (p1 if player == game.players[0] else p0) * regret
-
-    return nodeUtil
-
-
-
-def cfr(community_cards, hole_cards, history, p0, p1):
-
-    game.user.hole_cards = hole_cards[:2]
-    game.user.hole_cards = hole_cards[2:]
-    game.community_cards = community_cards
-
-    player = game.players[len(history) % 2]
-    opponent = game.players[1 - player]
+        root = build_tree(SMALL_BLIND, BET, STARTING_CHIPS)
+        self.nodes = {node.history: node for node in all_nodes(root)}
+        self.legal_actions = {node.history: node.legal.tolist() for node in decision_nodes(root)}
+
+    def deal(self, dealer):
+        return dealer.cards(4)
+
+    def is_terminal(self, cards, history):
+        return self.nodes[history].kind != 'decision'
+
+    def utility(self, cards, history, player):
+        node = self.nodes[history]
+        opponent = 1 - player
+        if node.kind == 'fold':
+            # The player who folded is the one who acted last
+            folded = 1 - node.player
+            return -node.bets[folded] if player == folded else node.bets[folded]
+        # Expected result of an all-in: 1 - always wins, -1 - always loses
+        equity = EQUITY[hand_class(cards[2 * player:2 * player + 2]), hand_class(cards[2 * opponent:2 * opponent + 2])]
+        return node.bets[player] * (2 * equity - 1)
+
+    def legal(self, history):
+        return self.legal_actions[history]
+
+    def hand(self, cards, player):
+        # Suit isomorphic hands share the info set
+        return info_set(cards[2 * player:2 * player + 2])
+
+
+class Street(traversers.Game):
+    # Betting on a single postflop street, player 0 is the big blind who acts first and holds cards[:2], the board
+    # is cards[4:]. A bet or a raise is the call plus BET, at most MAX_BETS per street, both players paid half of
+    # the pot before the street. The histories are the node ids of the BettingTree of the street, the info set
+    # keys keep the action strings.
+    #
+    # A deal is (cards, hands): the hands of both players are abstracted once per deal and numbered in the order
+    # they are met, the ordinal of an info set is hand * len(tree) + node id.
+    actions = ''.join(ACTIONS)
+    big_blind = BIG_BLIND
+    root = 0
+
+    def __init__(self, num_cards, pot=POT):
+        self.num_cards = num_cards
+        self.pot = pot
+        tree = BettingTree((BET / BIG_BLIND,), MAX_BETS, STARTING_CHIPS, SMALL_BLIND, streets=(num_cards,),
+                           bets=(pot // 2, pot // 2))
+        self.num_nodes = len(tree)
+        # Lists, indexing them is faster than indexing the arrays one item at a time
+        self.children = tree.children.tolist()
+        self.terminal = (tree.kind != DECISION).tolist()
+        self.showdown = (tree.kind == SHOWDOWN).tolist()
+        # Tree position 1 (big blind) is player 0
+        self.players = (1 - tree.player).tolist()
+        self.legal_actions = tree.legal.tolist()
+        # Chips won by the small blind (player 1), the stake at a showdown
+        self.payoffs = tree.payoffs().tolist()
+        self.histories = tree.histories
+        # Abstracted hands (bucket keys) and their ordinals
+        self.hand_keys = []
+        self.hand_ordinals = {}
+
+    def deal(self, dealer):
+        # Boards are sampled instead of enumerated, the card abstraction merges similar deals
+        cards = dealer.cards(4 + self.num_cards)
+        return cards, (self._hand_ordinal(cards, 0), self._hand_ordinal(cards, 1))
+
+    def _hand_ordinal(self, cards, player):
+        # The bucket of the card abstraction replaces the cards
+        key = bucket_info_set(cards[2 * player:2 * player + 2], cards[4:])
+        ordinal = self.hand_ordinals.get(key)
+        if ordinal is None:
+            ordinal = self.hand_ordinals[key] = len(self.hand_keys)
+            self.hand_keys.append(key)
+        return ordinal
+
+    def is_terminal(self, deal, history):
+        return self.terminal[history]
+
+    def utility(self, deal, history, player):
+        payoff = self.payoffs[history]
+        if not self.showdown[history]:
+            return payoff if player == 1 else -payoff
+
+        cards, _ = deal
+        opponent = 1 - player
+        board = mask_of(cards[4:])
+        player_strength = evaluate_mask(mask_of(cards[2 * player:2 * player + 2]) | board)
+        opponent_strength = evaluate_mask(mask_of(cards[2 * opponent:2 * opponent + 2]) | board)
+        if player_strength == opponent_strength:
+            return 0
+        return payoff if player_strength > opponent_strength else -payoff
+
+    def player(self, history):
+        return self.players[history]
+
+    def next(self, history, a):
+        return self.children[history][a]
+
+    def legal(self, history):
+        return self.legal_actions[history]
+
+    def key(self, hand, history):
+        return hand + self.histories[history]
+
+    def hand(self, deal, player):
+        return self.hand_keys[deal[1][player]]
+
+    def ordinal(self, deal, history):
+        return deal[1][self.players[history]] * self.num_nodes + history
+
+
+def make_game(num_cards):
+    # num_cards = 0 - preflop, 3, 4, 5 - postflop street
+    return Street(num_cards) if num_cards else Preflop()
+
+
+def train_preflop(iterations, traverser='chance', convergence=None, checkpoint=None, start=0, dealer=None):
+    solver = traversers.TRAVERSERS[traverser](Preflop(), TreeMap, dealer=dealer)
+    util = 0
 
-    pass
+    for i in tqdm(range(start, iterations), desc="Training Loop", initial=start, total=iterations):
+        util += solver.iteration()
+        if (i + 1) % ITERATION_SAMPLES == 0:
+            TreeMap.end_iteration()
+        if checkpoint:
+            checkpoint.step(0, i + 1)
+        if convergence and convergence(i + 1):
+            break
+        if i and (i % 100_000 == 0):
+            print(" Average game value: ", util / (i + 1 - start))
 
+    print("Training complete.")
 
-def train_preflop(iterations):
-    game.players[game.sb_pos].make_bet(game.small_blind)
-    game.players[game.bb_pos].make_bet(game.big_blind)
 
+def train_preflop_public(iterations, convergence=None, checkpoint=None, start=0):
+    # All the hand classes at once, one walk of the betting tree per iteration
+    solver = PublicTreeCFR(TreeMap, build_tree(SMALL_BLIND, BET, STARTING_CHIPS), EQUITY)
     util = 0
+    for i in tqdm(range(start, iterations), desc="Training Loop (public tree)", initial=start, total=iterations):
+        util += solver.iteration()
+        TreeMap.end_iteration()
+        if checkpoint:
+            checkpoint.step(0, i + 1)
+        if convergence and convergence(i + 1):
+            break
+        if i and (i % 1000 == 0):
+            print(" Average game value: ", util / (i + 1 - start))
+    print("Training complete.")
 
-    for i in tqdm(range(iterations), desc="Training Loop"):
-        cards = random.sample(game.deck, 4)
-        util += cfr_preflop(hole_cards=cards, history='', p0=1, p1=1)
-        if i and (i % 100_000 == 0):
-            print(" Average game value: ", util / (i + 1))
 
-    print("Training complete.")
+def train(iterations, num_cards=3, traverser='chance', convergence=None, checkpoint=None, start=0, dealer=None):
+    solver = traversers.TRAVERSERS[traverser](Street(num_cards), TreeMap, dealer=dealer)
+    util = 0
+    done = start
+    for i in tqdm(range(start, iterations), desc=f"Training Loop ({STREETS[num_cards]})", initial=start,
+                  total=iterations):
+        util += solver.iteration()
+        done = i + 1
+        if done % ITERATION_SAMPLES == 0:
+            TreeMap.end_iteration()
+        if checkpoint:
+            checkpoint.step(num_cards, done)
+        if convergence and convergence(done):
+            break
+    print(f"Average Utility: {util / max(done - start, 1)}")
+
+
+def table_capacity():
+    # Rows of the shared regret table: twice the info sets of the abstraction for the open addressing, a power of two
+    info_sets = NUM_CLASSES * len(Preflop().legal_actions)
+    for num_cards in STREETS:
+        lookup = load_buckets(num_cards)
+        if lookup is None:
+            return FALLBACK_CAPACITY
+        info_sets += len(lookup) * Street(num_cards).terminal.count(False)
+    return 1 << (2 * info_sets - 1).bit_length()
+
+
+def init_worker(table, entropy, counter):
+    # Every worker process updates the shared table and deals its own cards, worker i gets the stream
+    # entropy + [i] of the dealer and of the sampled actions
+    global TreeMap, WorkerDealer
+    TreeMap = table
+    with counter.get_lock():
+        worker = counter.value
+        counter.value += 1
+    WorkerDealer = Dealer(entropy + [worker])
+    random.seed(int(WorkerDealer.seed.generate_state(1)[0]))
+
+
+def train_chunk(task):
+    # Returns the summed utility and the info sets first visited by this worker
+    iterations, num_cards, traverser = task
+    solver = traversers.TRAVERSERS[traverser](make_game(num_cards), TreeMap, dealer=WorkerDealer)
+    start = len(TreeMap.info_sets)
+    util = 0
+    for _ in range(iterations):
+        util += solver.iteration()
+    return iterations, util, TreeMap.info_sets[start:]
 
 
-def train(iterations, num_cards=3):
-    utils = []
-    community_combinations = list(itertools.combinations(game.deck, num_cards))
-    for community_cards in tqdm(community_combinations, desc="Community Cards Combinations"):
-        util = 0
-        selected_set = set(community_cards)
-        remaining_cards = [card for card in game.deck if card not in selected_set]
-        for _ in tqdm(range(iterations), desc="Training Loop", leave=False):
-            hole_cards = random.sample(remaining_cards, 4)
-            util += cfr(community_cards, hole_cards, '', 1, 1)
-        utils.append(util)
-    avg_util = np.mean(utils)
-    print(f"Average Utility: {avg_util}")
-    pass
+def train_parallel(pool, iterations, num_cards=0, traverser='chance', chunk_size=ITERATION_SAMPLES, convergence=None,
+                   checkpoint=None, start=0):
+    # num_cards = 0 trains preflop, every chunk counts as an iteration of the update rule
+    remaining = iterations - start
+    chunks = [chunk_size] * (remaining // chunk_size) + ([remaining % chunk_size] if remaining % chunk_size else [])
+    util = 0
+    done = start
+    desc = f"Training Loop ({STREETS[num_cards] if num_cards else 'preflop'})"
+    with tqdm(total=iterations, initial=start, desc=desc) as progress:
+        for size, chunk_util, info_sets in pool.imap_unordered(train_chunk, [(size, num_cards, traverser) for size in chunks]):
+            util += chunk_util
+            done += size
+            TreeMap.add_info_sets(info_sets)
+            TreeMap.end_iteration()
+            progress.update(size)
+            if checkpoint:
+                checkpoint.step(num_cards, done)
+            if convergence and convergence(done):
+                break
+    print(f"Average Utility: {util / max(done - start, 1)}")
 
 
 if __name__ == "__main__":
-    train_from_scratch = True
-    if train_from_scratch:
-        train_preflop(1_000_000)
-        train(1200, 3)
-        train(800, 4)
-        train(400, 5)
-        # joblib.dump(TreeMap, "HUNL-TreeMap.joblib")
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--workers', type=int, default=1, help='number of training processes')
+    parser.add_argument('--traverser', choices=TRAVERSERS, default='chance', help='CFR variant')
+    parser.add_argument('--algorithm', choices=ALGORITHMS, default='cfr', help='regret and averaging update rule')
+    parser.add_argument('--eval-every', type=int, default=0, help='iterations between exploitability evaluations')
+    parser.add_argument('--target', type=float, help='exploitability (mbb/g) that stops the training of a street')
+    parser.add_argument('--curve', help='prefix of the csv files of the exploitability curves')
+    parser.add_argument('--checkpoint', default='HUNL-checkpoint', help='checkpoint directory')
+    parser.add_argument('--checkpoint-every', type=int, default=100_000, help='iterations between checkpoints')
+    parser.add_argument('--resume', action='store_true', help='continue from the last checkpoint')
+    parser.add_argument('--seed', type=int, default=None, help='seed of the deals and of the sampled actions')
+    parser.add_argument('--table-capacity', type=int, default=None,
+                        help='rows of the shared regret table of --workers, derived from the abstraction by default')
+    parser.add_argument('--public-tree', action=argparse.BooleanOptionalAction, default=True,
+                        help='train preflop over all the hand classes at once, --no-public-tree samples the deals '
+                             'with --traverser and --workers')
+    args = parser.parse_args()
+
+    seed = args.seed if args.seed is not None else np.random.SeedSequence().entropy
+    print("Seed:", seed)
+    dealer = Dealer(seed)
+    random.seed(seed)
+
+    if args.workers > 1:
+        capacity = args.table_capacity or table_capacity()
+        print("Shared regret table rows:", capacity)
+        TreeMap = SharedRegretTable(NUM_ACTIONS, capacity=capacity, algorithm=args.algorithm)
     else:
-        TreeMap = joblib.load("HUNL-TreeMap.joblib")
+        TreeMap.set_algorithm(args.algorithm)
+
+    def convergence(num_cards):
+        # Every street is a game of its own with its own curve
+        if not args.eval_every:
+            return None
+        path = f"{args.curve}-{STREETS[num_cards] if num_cards else 'preflop'}.csv" if args.curve else None
+        return Convergence(BestResponse(make_game(num_cards)), TreeMap, args.eval_every, args.target, path)
+
+    checkpoint = Checkpoint(args.checkpoint, TreeMap, args.checkpoint_every, dealer)
+    progress = checkpoint.load() if args.resume else None
+    # Stages (0 - preflop, then the streets) done before the checkpoint are skipped
+    stage, done = (progress['stage'], progress['done']) if progress else (0, 0)
+
+    def start(num_cards):
+        return done if num_cards == stage else 0
+
+    stages = [num_cards for num_cards in (0, 3, 4, 5) if num_cards >= stage]
+    # The worker streams start at the resume point, a resumed run does not replay the deals of the first one
+    pool = Pool(args.workers, initializer=init_worker, initargs=(TreeMap, [seed, stage, done], Value('i', 0))) \
+        if args.workers > 1 else None
+    for position, num_cards in enumerate(stages):
+        if num_cards == 0 and args.public_tree:
+            train_preflop_public(10_000, convergence(0), checkpoint, start(0))
+        elif pool:
+            train_parallel(pool, 1_000_000, num_cards, args.traverser, convergence=convergence(num_cards),
+                           checkpoint=checkpoint, start=start(num_cards))
+        elif num_cards == 0:
+            train_preflop(1_000_000, args.traverser, convergence(0), checkpoint, start(0), dealer)
+        else:
+            train(1_000_000, num_cards, args.traverser, convergence(num_cards), checkpoint, start(num_cards), dealer)
+        # A resumed run continues with the next stage, 6 - all done
+        checkpoint.save({'stage': stages[position + 1] if position + 1 < len(stages) else 6, 'done': 0})
+    if pool:
+        pool.close()
+        pool.join()
+    # Average strategies for the bot
+    write_strategies(STRATEGY_PATH, TreeMap.info_sets, TreeMap.average_strategies())
 
     print("Total Number of Infosets:", len(TreeMap))
-    for infoSet in TreeMap:
-        TreeMap[infoSet].display()
-
-    print(game.pot)
+    TreeMap.display()
+    if args.workers > 1:
+        TreeMap.close(unlink=True)
@@ -0,0 +1,127 @@
+# Best response and exploitability of trained strategies
+#
+# The best response of a player maximizes its value against the average strategy of the
+# opponent, info set by info set. It is computed over the public tree of the Game: every
+# betting history is visited once, carrying the reach probabilities of the opponent hands
+# as a vector, and the best responder picks the best action for each of its hands.
+#
+# The deals are all the chance outcomes when the game can enumerate them (exact for Kuhn poker)
+# and a fixed sample of deals otherwise (HUNL), i.e. the best response is exact in the game
+# whose chance node is the sample. The utilities of the deals at every terminal history are
+# computed once, so an evaluation costs a few vector operations per history.
+#
+# Exploitability is the mean gain of the two best responses, in milli big blinds per game.
+import csv
+import os
+import sys
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'cli'))
+from dealer import Dealer
+
+SAMPLES = 20_000
+
+
+class BestResponse:
+    def __init__(self, game, samples=SAMPLES, dealer=None):
+        """
+        :param game: traversers.Game
+        :param samples: number of sampled deals when the game can not enumerate its deals
+        :param dealer: dealer.Dealer of the sample, seeded by default so evaluations are comparable
+        """
+        self.game = game
+        try:
+            outcomes = game.chance_outcomes()
+            self.exact = True
+        except NotImplementedError:
+            dealer = dealer if dealer is not None else Dealer(0)
+            outcomes = [(game.deal(dealer), 1 / samples) for _ in range(samples)]
+            self.exact = False
+
+        deals = [cards for cards, _ in outcomes]
+        self.probability = np.array([probability for _, probability in outcomes])
+        # Hand keys of every player, and the index of the hand of each deal
+        self.hands = [[], []]
+        self.deal_hands = [None, None]
+        for player in range(2):
+            index = {}
+            keys = [game.hand(cards, player) for cards in deals]
+            self.deal_hands[player] = np.array([index.setdefault(key, len(index)) for key in keys], dtype=np.int64)
+            self.hands[player] = list(index)
+
+        # Legal actions of the decision histories and utilities of player 0 at the terminal ones
+        self.legal = {}
+        self.utilities = {}
+        stack = [game.root]
+        while stack:
+            history = stack.pop()
+            if game.is_terminal(deals[0], history):
+                self.utilities[history] = np.array([game.utility(cards, history, 0) for cards in deals])
+                continue
+            self.legal[history] = np.array(game.legal(history), dtype=bool)
+            stack.extend(game.next(history, a) for a, allowed in enumerate(self.legal[history]) if allowed)
+
+    def value(self, table, player):
+        """
+        :param table: RegretTable with the average strategies
+        :param player: best responding player
+        :return: expected value of the best response of player against the opponent
+        """
+        opponent = 1 - player
+        return float(self._traverse(table, self.game.root, player, np.ones(len(self.hands[opponent]))).sum())
+
+    def _traverse(self, table, history, player, reach):
+        # Values of every hand of player, reach - reach probabilities of the opponent hands
+        opponent = 1 - player
+        if history in self.utilities:
+            utilities = self.utilities[history] if player == 0 else -self.utilities[history]
+            weights = self.probability * utilities * reach[self.deal_hands[opponent]]
+            return np.bincount(self.deal_hands[player], weights=weights, minlength=len(self.hands[player]))
+
+        legal = self.legal[history]
+        children = [(a, self.game.next(history, a)) for a in range(len(self.game.actions)) if legal[a]]
+        if self.game.player(history) == player:
+            return np.max([self._traverse(table, child, player, reach) for _, child in children], axis=0)
+
+        strategies = table.average_strategies_of([self.game.key(hand, history) for hand in self.hands[opponent]], legal)
+        return sum(self._traverse(table, child, player, reach * strategies[:, a]) for a, child in children)
+
+    def exploitability(self, table):
+        # Milli big blinds per game, 0 for an equilibrium
+        gain = (self.value(table, 0) + self.value(table, 1)) / 2
+        return 1000 * gain / self.game.big_blind
+
+
+class Convergence:
+    # Exploitability every `every` iterations, printed and written as a csv curve
+    def __init__(self, evaluator, table, every, target=None, path=None):
+        """
+        :param evaluator: BestResponse
+        :param table: RegretTable being trained
+        :param every: number of iterations between evaluations
+        :param target: exploitability in mbb/g that stops the training
+        :param path: csv file of the curve: iteration, exploitability
+        """
+        self.evaluator = evaluator
+        self.table = table
+        self.every = every
+        self.target = target
+        self.path = path
+        self.curve = []
+        self.last = 0
+        if path is not None:
+            with open(path, 'w', newline='') as file:
+                csv.writer(file).writerow(['iteration', 'exploitability'])
+
+    def __call__(self, iteration):
+        # Returns True when the target is reached, iteration - number of iterations done so far
+        if not self.every or iteration - self.last < self.every:
+            return False
+        self.last = iteration
+        exploitability = self.evaluator.exploitability(self.table)
+        self.curve.append((iteration, exploitability))
+        print(f" Iteration {iteration}: exploitability {exploitability:.2f} mbb/g")
+        if self.path is not None:
+            with open(self.path, 'a', newline='') as file:
+                csv.writer(file).writerow([iteration, exploitability])
+        return self.target is not None and exploitability <= self.target
@@ -0,0 +1,59 @@
+import os
+import sys
+import tempfile
+import unittest
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'cli'))
+from best_response import BestResponse, Convergence
+from regret_table import RegretTable
+from traversers_test import KuhnPoker, train_kuhn
+
+# Kuhn poker equilibrium where the first player never bets a 1 (alpha = 0): [pass, bet] of every info set
+EQUILIBRIUM = {
+    '1': [1, 0], '2': [1, 0], '3': [1, 0], '1pb': [1, 0], '2pb': [2 / 3, 1 / 3], '3pb': [0, 1],
+    '1p': [2 / 3, 1 / 3], '2p': [1, 0], '3p': [0, 1], '1b': [1, 0], '2b': [2 / 3, 1 / 3], '3b': [0, 1],
+}
+
+
+def strategy_table(strategies):
+    table = RegretTable(2)
+    for info_set, strategy in strategies.items():
+        table.strategy_sum[table.row(info_set)] = strategy
+    return table
+
+
+class TestBestResponse(unittest.TestCase):
+
+    def setUp(self):
+        self.evaluator = BestResponse(KuhnPoker())
+
+    def test_equilibrium(self):
+        table = strategy_table(EQUILIBRIUM)
+        self.assertTrue(self.evaluator.exact)
+        # The game value is -1/18 for the first player, no best response gains anything
+        self.assertAlmostEqual(self.evaluator.value(table, 0), -1 / 18)
+        self.assertAlmostEqual(self.evaluator.value(table, 1), 1 / 18)
+        self.assertAlmostEqual(self.evaluator.exploitability(table), 0)
+
+    def test_exploitable(self):
+        # The second player always calls with a 1, the first player bets a 2 and a 3 and wins 2/9 per game
+        calling = dict(EQUILIBRIUM, **{'1b': [0, 1]})
+        self.assertAlmostEqual(self.evaluator.value(strategy_table(calling), 0), 2 / 9)
+        self.assertGreater(self.evaluator.exploitability(RegretTable(2)), 100)
+
+    def test_convergence(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'curve.csv')
+            table = train_kuhn('chance', 2000)
+            convergence = Convergence(self.evaluator, table, every=1000, target=50, path=path)
+            self.assertFalse(convergence(500))
+            self.assertTrue(convergence(1000))
+            with open(path) as file:
+                self.assertEqual(file.readline().strip(), 'iteration,exploitability')
+                self.assertEqual(len(file.readlines()), 1)
+        self.assertEqual([iteration for iteration, _ in convergence.curve], [1000])
+        self.assertLess(convergence.curve[0][1], 50)
+
+
+if __name__ == '__main__':
+    unittest.main()
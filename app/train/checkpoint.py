@@ -0,0 +1,119 @@
+# Checkpoints of a RegretTable
+#
+# A checkpoint directory holds append-only segments and a state file. A segment stores the info
+# sets seen for the first time since the previous segment and the rows written since then (the
+# dirty rows of the table), so a checkpoint costs in proportion to the work done since the last
+# one, not to the size of the table. A row is identified by its ordinal, the position of its info
+# set in table.info_sets, so a table rebuilt from the keys gets the same ordinals.
+#
+# The state file is replaced atomically after the segment is written. It lists the segments of
+# the checkpoint, the iteration count and update rule of the table, the progress of the trainer,
+# the state of the random module and the state of the dealer of the deals. A segment that the
+# state file does not list, e.g. one written during a crash, is ignored. After MAX_SEGMENTS
+# segments the next checkpoint is a full one that replaces all of them.
+import os
+import random
+import joblib
+import numpy as np
+
+STATE = 'state.joblib'
+MAX_SEGMENTS = 32
+
+
+class Checkpoint:
+    def __init__(self, directory, table, every=0, dealer=None):
+        """
+        :param directory: checkpoint directory, created on the first save
+        :param table: RegretTable or SharedRegretTable
+        :param every: number of iterations between checkpoints, 0 - only explicit saves
+        :param dealer: dealer.Dealer of the trainer, its state is saved with the random state
+        """
+        self.directory = directory
+        self.table = table
+        self.every = every
+        self.dealer = dealer
+        self.segments = []
+        self.next_segment = 0
+        # Info sets of the table already written to a segment
+        self.saved_info_sets = 0
+        self.stage = None
+        self.last = 0
+
+    def step(self, stage, done):
+        """
+        :param stage: stage of the trainer, e.g. the street
+        :param done: iterations of the stage done so far
+        """
+        if stage != self.stage:
+            self.stage, self.last = stage, 0
+        if self.every and done - self.last >= self.every:
+            self.last = done
+            self.save({'stage': stage, 'done': done})
+
+    def _rows(self, ordinals):
+        used = self.table.used_rows()
+        return ordinals if isinstance(used, slice) else used[ordinals]
+
+    def save(self, progress):
+        os.makedirs(self.directory, exist_ok=True)
+        table = self.table
+        full = len(self.segments) >= MAX_SEGMENTS
+        if full:
+            ordinals = np.arange(len(table))
+            keys = table.info_sets
+        else:
+            ordinals = np.flatnonzero(table.dirty[table.used_rows()])
+            keys = table.info_sets[self.saved_info_sets:]
+        rows = self._rows(ordinals)
+        # Flags are cleared before the rows are copied, so a concurrent write is saved next time
+        table.dirty[rows] = False
+
+        name = f'segment-{self.next_segment:05d}.npz'
+        np.savez(os.path.join(self.directory, name), keys=np.array(keys, dtype=str), ordinals=ordinals,
+                 regret=table.regret_sum[rows], strategy=table.strategy_sum[rows])
+        replaced = self.segments if full else []
+        self.segments = [name] if full else self.segments + [name]
+        self.next_segment += 1
+        self.saved_info_sets = len(table)
+
+        state = {
+            'segments': self.segments,
+            'next_segment': self.next_segment,
+            'iteration': table.iteration,
+            'algorithm': (table.algorithm, table.alpha, table.beta, table.gamma),
+            'progress': progress,
+            'random': random.getstate(),
+            'dealer': self.dealer.getstate() if self.dealer is not None else None,
+        }
+        path = os.path.join(self.directory, STATE)
+        joblib.dump(state, path + '.tmp')
+        os.replace(path + '.tmp', path)
+        for name in replaced:
+            os.remove(os.path.join(self.directory, name))
+
+    def load(self):
+        # Restores the table, the random state and the dealer, returns the saved progress or None without a checkpoint
+        path = os.path.join(self.directory, STATE)
+        if not os.path.exists(path):
+            return None
+        state = joblib.load(path)
+        table = self.table
+        for name in state['segments']:
+            with np.load(os.path.join(self.directory, name)) as segment:
+                for info_set in segment['keys'].tolist():
+                    table.row(info_set)
+                rows = self._rows(segment['ordinals'])
+                table.regret_sum[rows] = segment['regret']
+                table.strategy_sum[rows] = segment['strategy']
+        table.dirty[table.used_rows()] = False
+        table.iteration = state['iteration']
+        table.set_algorithm(*state['algorithm'])
+        random.setstate(state['random'])
+        if self.dealer is not None and state.get('dealer') is not None:
+            self.dealer.setstate(state['dealer'])
+
+        self.segments = state['segments']
+        self.next_segment = state['next_segment']
+        self.saved_info_sets = len(table)
+        self.stage, self.last = state['progress']['stage'], state['progress']['done']
+        return state['progress']
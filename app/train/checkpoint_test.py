@@ -0,0 +1,80 @@
+import os
+import random
+import sys
+import tempfile
+import unittest
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'cli'))
+from checkpoint import Checkpoint
+from dealer import Dealer
+from regret_table import RegretTable
+from traversers import ExternalSampling
+from traversers_test import KuhnPoker
+
+
+def resume(directory, algorithm='cfr'):
+    # Fresh table and dealer restored from the checkpoint
+    table, dealer = RegretTable(2, algorithm=algorithm), Dealer()
+    progress = Checkpoint(directory, table, dealer=dealer).load()
+    return table, dealer, progress
+
+
+def run(table, dealer, iterations):
+    # External sampling draws the deals from the dealer and the sampled actions from the random module
+    solver = ExternalSampling(KuhnPoker(), table, dealer=dealer)
+    for _ in range(iterations):
+        solver.iteration()
+        table.end_iteration()
+
+
+class TestCheckpoint(unittest.TestCase):
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = directory.name
+        random.seed(0)
+
+    def test_round_trip(self):
+        table, dealer = RegretTable(2, algorithm='dcfr'), Dealer(1)
+        checkpoint = Checkpoint(self.directory, table, every=100, dealer=dealer)
+        solver = ExternalSampling(KuhnPoker(), table, dealer=dealer)
+        for i in range(250):
+            solver.iteration()
+            table.end_iteration()
+            checkpoint.step(0, i + 1)
+        checkpoint.save({'stage': 0, 'done': 250})
+        # Two incremental segments and the last one
+        self.assertEqual(len(checkpoint.segments), 3)
+
+        restored, restored_dealer, progress = resume(self.directory)
+        self.assertEqual(progress, {'stage': 0, 'done': 250})
+        self.assertEqual(restored.info_sets, table.info_sets)
+        np.testing.assert_array_equal(restored.regret_sum[restored.used_rows()], table.regret_sum[table.used_rows()])
+        np.testing.assert_array_equal(restored.strategy_sum[restored.used_rows()],
+                                      table.strategy_sum[table.used_rows()])
+        self.assertEqual((restored.iteration, restored.algorithm), (251, 'dcfr'))
+        self.assertFalse(restored.dirty.any())
+        # The random module and the dealer continue where they were saved
+        state = random.getstate()
+        random.seed(1)
+        resume(self.directory)
+        self.assertEqual(random.getstate(), state)
+        self.assertEqual(restored_dealer.deal(20).tolist(), dealer.deal(20).tolist())
+
+    def test_resume_continues_the_run(self):
+        # A run resumed from a checkpoint gets the same table as the run that was not interrupted
+        table, dealer = RegretTable(2), Dealer(2)
+        run(table, dealer, 100)
+        Checkpoint(self.directory, table, dealer=dealer).save({'stage': 0, 'done': 100})
+        run(table, dealer, 100)
+
+        restored, restored_dealer, _ = resume(self.directory)
+        run(restored, restored_dealer, 100)
+        np.testing.assert_array_equal(restored.regret_sum[restored.used_rows()], table.regret_sum[table.used_rows()])
+        self.assertEqual(restored.iteration, table.iteration)
+
+
+if __name__ == '__main__':
+    unittest.main()
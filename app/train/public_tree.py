@@ -0,0 +1,141 @@
+# Public tree CFR for preflop
+#
+# The sampled trainers walk the betting tree once for every dealt hand. Here the tree is walked once
+# per iteration for all the hands at the same time: every public state (betting history) holds a
+# reach probability vector over the 169 hand classes of each player, and terminal utilities are
+# matrix-vector products against the matrices of the compatible combos (fold) and the all-in
+# equities (showdown). A class pair (i, j) is dealt with the probability proportional to the
+# number of its combo pairs without a shared card.
+#
+# The tree follows the rules of game_state.GameState with an abstraction of the actions: a raise is a
+# call plus BET (or all-in), the big blind cannot raise a limp and every call or check ends the hand
+# with an all-in showdown.
+import os
+import sys
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'cli'))
+from cards import CARDS
+from game_state import GameState
+from isomorphism import info_set
+from ranges import NUM_CLASSES, CLASS_COMBOS, PAIR_COUNTS, load_equity_matrix
+
+FOLD_CHECK = 'p'
+CALL = 'c'
+RAISE = 'b'
+ACTIONS = [FOLD_CHECK, CALL, RAISE]
+
+# Info set of every class, the same keys as the sampled preflop trainer: canonical hole cards
+CLASS_INFO_SETS = [info_set([CARDS[int(first)], CARDS[int(second)]]) for first, second in CLASS_COMBOS[:, 0]]
+
+
+class PublicNode:
+    def __init__(self, history, bets, kind):
+        self.history = history
+        self.player = len(history) % 2
+        # Chips put in by the small blind and the big blind
+        self.bets = bets
+        # 'fold', 'showdown' or 'decision'
+        self.kind = kind
+        self.children = {}
+        self.legal = None
+        self.block = None
+
+
+def build_tree(small_blind, bet, stack):
+    """
+    :param small_blind: small blind, the big blind is twice as much
+    :param bet: size of a raise above the call
+    :param stack: starting chips of both players
+    :return: root PublicNode of the preflop betting tree
+    """
+    def build(history, state, kind):
+        node = PublicNode(history, state.bets, kind)
+        if kind != 'decision':
+            return node
+
+        to_call = state.to_call
+        if to_call > 0:
+            node.children[FOLD_CHECK] = build(history + FOLD_CHECK, state.apply('fold'), 'fold')
+            # Only the limp of the small blind gives the big blind an option
+            node.children[CALL] = build(history + CALL, state.apply('call'), 'decision' if history == '' else 'showdown')
+            if state.raise_range() is not None:
+                raised = state.apply('raise', min(to_call + bet, state.chips[state.player]))
+                node.children[RAISE] = build(history + RAISE, raised, 'decision')
+        else:
+            node.children[FOLD_CHECK] = build(history + FOLD_CHECK, state.apply('check'), 'showdown')
+        node.legal = np.array([action in node.children for action in ACTIONS])
+        return node
+
+    return build('', GameState.start(stack, small_blind), 'decision')
+
+
+def all_nodes(node):
+    yield node
+    for child in node.children.values():
+        yield from all_nodes(child)
+
+
+def decision_nodes(node):
+    return (node for node in all_nodes(node) if node.kind == 'decision')
+
+
+class PublicTreeCFR:
+    def __init__(self, table, root, equity=None):
+        """
+        :param table: RegretTable with 3 actions, rows of every decision node are a block of 169 classes
+        :param root: root PublicNode
+        :param equity: [169, 169] all-in equity matrix
+        """
+        self.table = table
+        self.root = root
+        equity = np.asarray(equity if equity is not None else load_equity_matrix(), dtype=np.float64)
+        # Chance probabilities of the class pairs, and the expected showdown result of a chip
+        self.chance = PAIR_COUNTS / PAIR_COUNTS.sum()
+        self.showdown = self.chance * (2 * equity - 1)
+        for node in decision_nodes(root):
+            node.block = table.block(info_set + node.history for info_set in CLASS_INFO_SETS)
+
+    def iteration(self):
+        # One iteration of vanilla CFR, returns the expected value of the small blind
+        values = self.traverse(self.root, [np.ones(NUM_CLASSES), np.ones(NUM_CLASSES)])
+        return float(values[0].sum())
+
+    def traverse(self, node, reach):
+        """
+        :param node: PublicNode
+        :param reach: reach probability vectors of both players over their classes
+        :return: counterfactual value vectors of both players over their classes
+        """
+        if node.kind == 'fold':
+            # The player who folded is the one who acted last
+            folded = 1 - node.player
+            chips = node.bets[folded]
+            values = [self.chance @ reach[1], self.chance.T @ reach[0]]
+            values[folded] = -chips * values[folded]
+            values[1 - folded] = chips * values[1 - folded]
+            return values
+        if node.kind == 'showdown':
+            chips = node.bets[0]
+            return [chips * (self.showdown @ reach[1]), chips * (self.showdown @ reach[0])]
+
+        player, opponent = node.player, 1 - node.player
+        strategies = self.table.get_strategies(node.block, reach[player], node.legal)
+        action_values = np.zeros((NUM_CLASSES, len(ACTIONS)))
+        values = [None, None]
+        values[player] = np.zeros(NUM_CLASSES)
+        values[opponent] = np.zeros(NUM_CLASSES)
+
+        for pos, act in enumerate(ACTIONS):
+            if act not in node.children:
+                continue
+            next_reach = list(reach)
+            next_reach[player] = reach[player] * strategies[:, pos]
+            child_values = self.traverse(node.children[act], next_reach)
+            action_values[:, pos] = child_values[player]
+            values[player] += strategies[:, pos] * child_values[player]
+            values[opponent] += child_values[opponent]
+
+        regrets = (action_values - values[player][:, None]) * node.legal
+        self.table.add_block_regrets(node.block, regrets)
+        return values
@@ -0,0 +1,145 @@
+import os
+import sys
+import unittest
+from itertools import combinations
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'cli'))
+import traversers
+from best_response import BestResponse
+from cards import CARDS, CARDS_BY_NAME
+from public_tree import ACTIONS, CLASS_INFO_SETS, PublicTreeCFR, all_nodes, build_tree, decision_nodes
+from ranges import NUM_CLASSES, PAIR_COUNTS, hand_class
+from regret_table import RegretTable
+
+# Small game: blinds 1 and 2, a raise is 2 above the call, stacks of 6 chips
+SMALL_BLIND, BET, STACK = 1, 2, 6
+
+
+def random_equity(seed=0):
+    # All-in equities of the classes against each other, equity[i, j] + equity[j, i] = 1
+    equity = np.random.default_rng(seed).random((NUM_CLASSES, NUM_CLASSES))
+    return (equity + 1 - equity.T) / 2
+
+
+def cards(*names):
+    return [CARDS_BY_NAME[name] for name in names]
+
+
+class ClassGame(traversers.Game):
+    # The public tree as a game whose deals are the class pairs, the best response of it is exact
+    actions = ''.join(ACTIONS)
+    big_blind = 2 * SMALL_BLIND
+
+    def __init__(self, root, equity):
+        self.nodes = {node.history: node for node in all_nodes(root)}
+        self.equity = equity
+
+    def chance_outcomes(self):
+        chance = PAIR_COUNTS / PAIR_COUNTS.sum()
+        return [((i, j), chance[i, j]) for i in range(NUM_CLASSES) for j in range(NUM_CLASSES) if chance[i, j] > 0]
+
+    def is_terminal(self, deal, history):
+        return self.nodes[history].kind != 'decision'
+
+    def utility(self, deal, history, player):
+        node = self.nodes[history]
+        if node.kind == 'fold':
+            folded = 1 - node.player
+            return -node.bets[folded] if player == folded else node.bets[folded]
+        return node.bets[player] * (2 * self.equity[deal[player], deal[1 - player]] - 1)
+
+    def legal(self, history):
+        return self.nodes[history].legal.tolist()
+
+    def hand(self, deal, player):
+        return CLASS_INFO_SETS[deal[player]]
+
+
+class RecordingCFR(PublicTreeCFR):
+    # Keeps the reach vectors every node was visited with
+    def __init__(self, table, root, equity):
+        super().__init__(table, root, equity)
+        self.reach = {}
+
+    def traverse(self, node, reach):
+        self.reach.setdefault(node.history, []).append([vector.copy() for vector in reach])
+        return super().traverse(node, reach)
+
+
+class TestPublicTree(unittest.TestCase):
+
+    def setUp(self):
+        self.equity = random_equity()
+        self.root = build_tree(SMALL_BLIND, BET, STACK)
+
+    def test_terminal_utilities(self):
+        solver = PublicTreeCFR(RegretTable(len(ACTIONS)), self.root, self.equity)
+        rng = np.random.default_rng(1)
+        # A small range of both players with random weights
+        classes = sorted(hand_class(cards(*names)) for names in [('A♠', 'A♥'), ('K♠', 'K♥'), ('A♠', 'K♠'), ('7♠', '2♥')])
+        reach = [np.zeros(NUM_CLASSES), np.zeros(NUM_CLASSES)]
+        for vector in reach:
+            vector[classes] = rng.random(len(classes))
+
+        # Per hand loop: every hand of a player against the combos of the opponent range without a shared card
+        game = ClassGame(self.root, self.equity)
+        hands = [(hand_class(list(hand)), set(hand)) for hand in combinations(CARDS, 2)]
+        in_range = [(hand, cards) for hand, cards in hands if hand in classes]
+        total_pairs = 1326 * 1225
+        terminals = [node for node in all_nodes(self.root) if node.kind != 'decision']
+        self.assertEqual({node.kind for node in terminals}, {'fold', 'showdown'})
+        for node in terminals:
+            expected = [np.zeros(NUM_CLASSES), np.zeros(NUM_CLASSES)]
+            for player in range(2):
+                for hand, cards_of_hand in hands:
+                    for opponent_hand, opponent_cards in in_range:
+                        if cards_of_hand & opponent_cards:
+                            continue
+                        deal = (hand, opponent_hand) if player == 0 else (opponent_hand, hand)
+                        utility = game.utility(deal, node.history, player)
+                        expected[player][hand] += reach[1 - player][opponent_hand] * utility / total_pairs
+            values = solver.traverse(node, reach)
+            for player in range(2):
+                with self.subTest(history=node.history, player=player):
+                    np.testing.assert_allclose(values[player], expected[player], atol=1e-15)
+
+    def test_reach(self):
+        table = RegretTable(len(ACTIONS))
+        solver = RecordingCFR(table, self.root, self.equity)
+        for _ in range(2):
+            solver.iteration()
+            table.end_iteration()
+
+        for iteration in range(2):
+            np.testing.assert_array_equal(solver.reach[''][iteration], np.ones((2, NUM_CLASSES)))
+        for node in decision_nodes(self.root):
+            player, opponent = node.player, 1 - node.player
+            for iteration, reach in enumerate(solver.reach[node.history]):
+                children = [solver.reach[child.history][iteration] for child in node.children.values()]
+                # The actions split the reach of the acting player, the opponent reach passes unchanged
+                np.testing.assert_allclose(sum(child[player] for child in children), reach[player])
+                for child in children:
+                    np.testing.assert_array_equal(child[opponent], reach[opponent])
+            # The strategy sums of the node add up to the reach of the acting player over the iterations
+            np.testing.assert_allclose(table.strategy_sum[node.block].sum(axis=1),
+                                       sum(reach[player] for reach in solver.reach[node.history]))
+
+    def test_exploitability(self):
+        table = RegretTable(len(ACTIONS))
+        solver = PublicTreeCFR(table, self.root, self.equity)
+        evaluator = BestResponse(ClassGame(self.root, self.equity))
+        self.assertTrue(evaluator.exact)
+        curve = [evaluator.exploitability(table)]
+        for iterations in (10, 100):
+            while table.iteration <= iterations:
+                solver.iteration()
+                table.end_iteration()
+            curve.append(evaluator.exploitability(table))
+        self.assertLess(curve[1], curve[0])
+        self.assertLess(curve[2], curve[1])
+        self.assertLess(curve[2], 10)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,300 @@
+# Regret and strategy storage for CFR trainers
+#
+# Instead of a Node object with its own small arrays for every info set, all the info sets
+# share two contiguous 2-D arrays (a row per info set) and a dict maps an info set to its row.
+# Rows are read and written as plain Python floats while traversing the tree, since numpy
+# calls on 2-3 element arrays cost more than the arithmetic, and the whole table is
+# processed at once (regret matching, average strategies) with vectorized numpy code.
+#
+# The update rule is chosen by algorithm:
+#   cfr  - vanilla regret matching with uniform averaging of the strategies
+#   cfr+ - regret matching+: cumulative regrets are floored at 0, strategies are averaged
+#          with the weight of the iteration (linear averaging)
+#   dcfr - discounted CFR: after iteration t positive regrets are multiplied by t^alpha / (t^alpha + 1),
+#          negative ones by t^beta / (t^beta + 1) and the strategy sums by (t / (t + 1))^gamma
+# Trainers call end_iteration after every iteration, for the sampling trainers an iteration is
+# a batch of sampled deals.
+#
+# Every written row is flagged in dirty, so a checkpoint only saves the rows changed since
+# the previous one (see checkpoint.py).
+import fcntl
+import os
+import tempfile
+from hashlib import blake2b
+from multiprocessing import shared_memory
+import numpy as np
+
+
+ALGORITHMS = ('cfr', 'cfr+', 'dcfr')
+
+
+class RegretTable:
+    def __init__(self, num_actions, capacity=1024, dtype=np.float64, algorithm='cfr', alpha=1.5, beta=0.0, gamma=2.0):
+        self.num_actions = num_actions
+        self.set_algorithm(algorithm, alpha, beta, gamma)
+        self.iteration = 1
+        self.uniform = [1 / num_actions] * num_actions
+        self.index = {}
+        self.info_sets = []
+        self.regret_sum = np.zeros((capacity, num_actions), dtype=dtype)
+        self.strategy_sum = np.zeros((capacity, num_actions), dtype=dtype)
+        self.dirty = np.zeros(capacity, dtype=bool)
+
+    def set_algorithm(self, algorithm, alpha=1.5, beta=0.0, gamma=2.0):
+        if algorithm not in ALGORITHMS:
+            raise ValueError(f'Unknown algorithm: {algorithm}')
+        self.algorithm = algorithm
+        self.alpha, self.beta, self.gamma = alpha, beta, gamma
+
+    def __len__(self):
+        return len(self.info_sets)
+
+    def __contains__(self, info_set):
+        return info_set in self.index
+
+    def row(self, info_set):
+        # Row of the info set, a new info set gets the next free row
+        row = self.index.get(info_set)
+        if row is None:
+            row = len(self.info_sets)
+            if row == len(self.regret_sum):
+                self._grow()
+            self.index[info_set] = row
+            self.info_sets.append(info_set)
+        return row
+
+    def block(self, info_sets):
+        # Consecutive rows for a group of info sets that are always updated together, e.g. all hands of a public state
+        rows = [self.row(info_set) for info_set in info_sets]
+        if rows != list(range(rows[0], rows[0] + len(rows))):
+            raise ValueError('Info sets of a block must be new or registered together')
+        return slice(rows[0], rows[0] + len(rows))
+
+    def _grow(self):
+        capacity = 2 * len(self.regret_sum)
+        for name in ('regret_sum', 'strategy_sum', 'dirty'):
+            old = getattr(self, name)
+            new = np.zeros((capacity,) + old.shape[1:], dtype=old.dtype)
+            new[:len(old)] = old
+            setattr(self, name, new)
+
+    def get_strategy(self, row, realization_weight, legal=None):
+        # Current mixed strategy through regret matching, added to the strategy sum with the reach weight
+        positive = [regret if regret > 0 else 0.0 for regret in self.regret_sum[row].tolist()]
+        if legal is not None:
+            positive = [regret if allowed else 0.0 for regret, allowed in zip(positive, legal)]
+        normalizing_sum = sum(positive)
+        if normalizing_sum > 0:
+            strategy = [regret / normalizing_sum for regret in positive]
+        elif legal is None:
+            strategy = self.uniform
+        else:
+            num_legal = sum(legal)
+            strategy = [1 / num_legal if allowed else 0.0 for allowed in legal]
+
+        if realization_weight:
+            if self.algorithm == 'cfr+':
+                realization_weight *= self.iteration
+            self.strategy_sum[row] = [total + realization_weight * probability
+                                      for total, probability in zip(self.strategy_sum[row].tolist(), strategy)]
+            self.dirty[row] = True
+        return strategy
+
+    def add_regrets(self, row, regrets, weight=1.0):
+        totals = [total + weight * regret for total, regret in zip(self.regret_sum[row].tolist(), regrets)]
+        if self.algorithm == 'cfr+':
+            totals = [total if total > 0 else 0.0 for total in totals]
+        self.regret_sum[row] = totals
+        self.dirty[row] = True
+
+    def get_strategies(self, block, realization_weights, legal=None):
+        """
+        :param block: slice of rows returned by block()
+        :param realization_weights: vector of reach probabilities, one per row
+        :param legal: boolean vector of the legal actions, shared by the rows
+        :return: array [rows, num_actions] of current strategies
+        """
+        positive = np.maximum(self.regret_sum[block], 0)
+        if legal is not None:
+            positive *= legal
+        strategies = _normalize(positive, legal)
+        if self.algorithm == 'cfr+':
+            realization_weights = realization_weights * self.iteration
+        self.strategy_sum[block] += realization_weights[:, None] * strategies
+        self.dirty[block] = True
+        return strategies
+
+    def add_block_regrets(self, block, regrets, weight=1.0):
+        self.regret_sum[block] += weight * regrets
+        if self.algorithm == 'cfr+':
+            self.regret_sum[block] = np.maximum(self.regret_sum[block], 0)
+        self.dirty[block] = True
+
+    def end_iteration(self):
+        if self.algorithm == 'dcfr':
+            t = self.iteration
+            rows = self.active_rows()
+            regrets = self.regret_sum[rows]
+            positive, negative = t ** self.alpha / (t ** self.alpha + 1), t ** self.beta / (t ** self.beta + 1)
+            self.regret_sum[rows] = regrets * np.where(regrets > 0, positive, negative)
+            self.strategy_sum[rows] *= (t / (t + 1)) ** self.gamma
+            self.dirty[rows] = True
+        self.iteration += 1
+
+    def get_average_strategy(self, row):
+        total = self.strategy_sum[row].tolist()
+        normalizing_sum = sum(total)
+        return [value / normalizing_sum for value in total] if normalizing_sum > 0 else self.uniform
+
+    def average_strategies_of(self, info_sets, legal=None):
+        """
+        :param info_sets: info set keys, unknown ones get the uniform strategy
+        :param legal: boolean vector of the legal actions, shared by the info sets
+        :return: array [len(info_sets), num_actions] of average strategies
+        """
+        rows = np.array([self.index.get(info_set, -1) for info_set in info_sets], dtype=np.int64)
+        totals = np.zeros((len(rows), self.num_actions))
+        known = rows >= 0
+        totals[known] = self.strategy_sum[rows[known]]
+        if legal is not None:
+            totals *= legal
+        return _normalize(totals, legal)
+
+    def used_rows(self):
+        return slice(0, len(self))
+
+    def active_rows(self):
+        # Rows updated by the training
+        return self.used_rows()
+
+    def current_strategies(self):
+        # Regret matching of every row at once
+        return _normalize(np.maximum(self.regret_sum[self.used_rows()], 0))
+
+    def average_strategies(self):
+        return _normalize(self.strategy_sum[self.used_rows()])
+
+    def to_dict(self):
+        # {info set: average strategy}, the format read by Bot.load_strategies
+        return dict(zip(self.info_sets, self.average_strategies().tolist()))
+
+    def display(self):
+        for info_set, strategy in zip(self.info_sets, np.around(self.average_strategies(), 2)):
+            print(f"{info_set} -> {strategy}")
+
+
+class SharedRegretTable(RegretTable):
+    # Regret table in shared memory, updated by several training processes at once without locks
+    #
+    # The rows can not be handed out in the order of discovery, since every process discovers info
+    # sets on its own, so an info set is placed by a 64-bit hash of its key in an open addressing
+    # table of a fixed capacity. Free slots are claimed under a lock file shared by the processes,
+    # two processes could otherwise both see the same slot free and both take it, mixing two info
+    # sets in a row. Updates of the rows are not locked, two processes racing on the same row only
+    # lose a few updates (Hogwild). Every process knows the keys of the info sets it visited, the
+    # parent registers them with add_info_sets to read the strategies back.
+    def __init__(self, num_actions, capacity=1 << 20, name=None, dtype=np.float64, algorithm='cfr',
+                 alpha=1.5, beta=0.0, gamma=2.0):
+        self.num_actions = num_actions
+        self.capacity = capacity
+        self.set_algorithm(algorithm, alpha, beta, gamma)
+        self.uniform = [1 / num_actions] * num_actions
+        self.index = {}
+        self.info_sets = []
+
+        item_size = np.dtype(dtype).itemsize
+        dirty_size = (capacity + 7) // 8 * 8
+        size = 8 + capacity * 8 + dirty_size + 2 * capacity * num_actions * item_size
+        self.memory = shared_memory.SharedMemory(name=name, create=name is None, size=size)
+        self.name = self.memory.name
+        # The iteration counter and the dirty flags are shared as well
+        self.counter = np.ndarray((1,), dtype=np.int64, buffer=self.memory.buf)
+        self.keys = np.ndarray((capacity,), dtype=np.uint64, buffer=self.memory.buf, offset=8)
+        offset = 8 + capacity * 8
+        self.dirty = np.ndarray((capacity,), dtype=bool, buffer=self.memory.buf, offset=offset)
+        offset += dirty_size
+        self.regret_sum = np.ndarray((capacity, num_actions), dtype=dtype, buffer=self.memory.buf, offset=offset)
+        offset += capacity * num_actions * item_size
+        self.strategy_sum = np.ndarray((capacity, num_actions), dtype=dtype, buffer=self.memory.buf, offset=offset)
+        # A new block is zero-filled by the system when its pages are first touched, filling it here would
+        # commit the whole table at once
+        if name is None:
+            self.counter[0] = 1
+        # POSIX record locks belong to the process, so they also exclude workers that inherited the file
+        self.lock_path = os.path.join(tempfile.gettempdir(), f'{self.name}.lock')
+        self.lock = open(self.lock_path, 'a')
+
+    def __reduce__(self):
+        # Processes attach to the same memory
+        return self.__class__, (self.num_actions, self.capacity, self.name, self.regret_sum.dtype, self.algorithm,
+                                self.alpha, self.beta, self.gamma)
+
+    @property
+    def iteration(self):
+        return int(self.counter[0])
+
+    @iteration.setter
+    def iteration(self, value):
+        self.counter[0] = value
+
+    def row(self, info_set):
+        row = self.index.get(info_set)
+        if row is not None:
+            return row
+
+        # 0 marks a free slot
+        key = int.from_bytes(blake2b(info_set.encode(), digest_size=8).digest(), 'little') | 1
+        row = key % self.capacity
+        fcntl.lockf(self.lock, fcntl.LOCK_EX)
+        try:
+            for _ in range(self.capacity):
+                found = int(self.keys[row])
+                if found == key:
+                    break
+                if found == 0:
+                    self.keys[row] = key
+                    break
+                row = (row + 1) % self.capacity
+            else:
+                raise MemoryError('Shared regret table is full')
+        finally:
+            fcntl.lockf(self.lock, fcntl.LOCK_UN)
+
+        self.index[info_set] = row
+        self.info_sets.append(info_set)
+        return row
+
+    def add_info_sets(self, info_sets):
+        for info_set in info_sets:
+            self.row(info_set)
+
+    def block(self, info_sets):
+        # Rows are scattered, the block is an index array instead of a slice
+        return np.array([self.row(info_set) for info_set in info_sets], dtype=np.int64)
+
+    def used_rows(self):
+        return np.array([self.index[info_set] for info_set in self.info_sets], dtype=np.int64)
+
+    def active_rows(self):
+        # Also the rows that workers registered but the parent has not heard of yet, the comparison
+        # takes a snapshot since workers keep adding keys
+        return np.flatnonzero(self.keys != 0)
+
+    def close(self, unlink=False):
+        del self.counter, self.keys, self.dirty, self.regret_sum, self.strategy_sum
+        self.memory.close()
+        self.lock.close()
+        if unlink:
+            self.memory.unlink()
+            if os.path.exists(self.lock_path):
+                os.remove(self.lock_path)
+
+
+def _normalize(values, legal=None):
+    # Rows without a positive value become uniform over the legal actions
+    totals = values.sum(axis=1, keepdims=True)
+    if legal is None:
+        uniform = np.full_like(values, 1 / values.shape[1])
+    else:
+        uniform = np.broadcast_to(legal / np.sum(legal), values.shape).astype(values.dtype)
+    return np.divide(values, totals, out=uniform, where=totals > 0)
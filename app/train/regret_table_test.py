@@ -0,0 +1,171 @@
+import pickle
+import unittest
+from multiprocessing import Pool
+import numpy as np
+from regret_table import RegretTable, SharedRegretTable
+
+
+def add_regrets(task):
+    # Worker: writes to the table it attached to
+    table, info_set = task
+    table.add_regrets(table.row(info_set), [1.0, 2.0])
+    return table.info_sets
+
+
+def insert_keys(task):
+    # Worker: claims a row for every key of its own and marks the rows with its number
+    table, worker, count = task
+    rows = {}
+    for i in range(count):
+        info_set = f'{worker}:{i}'
+        rows[info_set] = table.row(info_set)
+        table.add_regrets(rows[info_set], [1.0, float(worker)])
+    return rows
+
+
+class TestRegretTable(unittest.TestCase):
+
+    def test_regret_matching(self):
+        table = RegretTable(3)
+        row = table.row('a')
+        self.assertEqual(table.row('a'), row)
+        # No positive regret: uniform over the legal actions
+        self.assertEqual(table.get_strategy(row, 0), [1 / 3] * 3)
+        self.assertEqual(table.get_strategy(row, 0, [True, False, True]), [0.5, 0.0, 0.5])
+        table.add_regrets(row, [3.0, -2.0, 1.0])
+        self.assertEqual(table.get_strategy(row, 0), [0.75, 0.0, 0.25])
+        # Illegal actions get nothing even with a positive regret
+        self.assertEqual(table.get_strategy(row, 0, [False, True, True]), [0.0, 0.0, 1.0])
+        table.add_regrets(row, [1.0, 1.0, 1.0], weight=2)
+        np.testing.assert_array_equal(table.regret_sum[row], [5, 0, 3])
+
+    def test_average_strategy(self):
+        table = RegretTable(2)
+        row = table.row('a')
+        self.assertEqual(table.get_average_strategy(row), [0.5, 0.5])
+        table.add_regrets(row, [1.0, 0.0])
+        table.get_strategy(row, 3)
+        table.add_regrets(row, [-1.0, 1.0])
+        table.get_strategy(row, 1)
+        # Strategies weighted by the reach: 3 * [1, 0] + 1 * [0, 1]
+        self.assertEqual(table.get_average_strategy(row), [0.75, 0.25])
+        self.assertEqual(table.to_dict(), {'a': [0.75, 0.25]})
+        np.testing.assert_allclose(table.average_strategies_of(['a', 'unknown']), [[0.75, 0.25], [0.5, 0.5]])
+
+    def test_rows_and_blocks(self):
+        table = RegretTable(2, capacity=2)
+        rows = [table.row(key) for key in 'abcde']
+        self.assertEqual(rows, list(range(5)))
+        self.assertEqual(len(table), 5)
+        # The arrays grow and keep the rows written before
+        table.add_regrets(0, [1.0, 2.0])
+        table.row('f')
+        np.testing.assert_array_equal(table.regret_sum[0], [1, 2])
+        self.assertGreaterEqual(len(table.regret_sum), 6)
+
+        block = table.block(['x', 'y', 'z'])
+        self.assertEqual(block, slice(6, 9))
+        self.assertEqual(table.block(['x', 'y', 'z']), block)
+        with self.assertRaises(ValueError):
+            table.block(['a', 'y'])
+        table.add_block_regrets(block, np.array([[1.0, 0.0], [0.0, 0.0], [-1.0, 3.0]]))
+        strategies = table.get_strategies(block, np.array([1.0, 1.0, 2.0]))
+        np.testing.assert_array_equal(strategies, [[1, 0], [0.5, 0.5], [0, 1]])
+        np.testing.assert_array_equal(table.strategy_sum[block], [[1, 0], [0.5, 0.5], [0, 2]])
+        self.assertTrue(table.dirty[block].all())
+
+
+class TestUpdateRules(unittest.TestCase):
+
+    def test_unknown_algorithm(self):
+        with self.assertRaises(ValueError):
+            RegretTable(2, algorithm='cfr-')
+
+    def test_cfr_plus(self):
+        table = RegretTable(2, algorithm='cfr+')
+        row = table.row('a')
+        # Cumulative regrets are floored at 0
+        table.add_regrets(row, [1.0, -3.0])
+        table.add_regrets(row, [-2.0, 1.0])
+        np.testing.assert_array_equal(table.regret_sum[row], [0, 1])
+        # Strategies are weighted by the iteration
+        table.get_strategy(row, 1.0)
+        table.end_iteration()
+        table.get_strategy(row, 1.0)
+        np.testing.assert_array_equal(table.strategy_sum[row], [0, 3])
+        block = table.block(['b'])
+        table.add_block_regrets(block, np.array([[-1.0, 2.0]]))
+        np.testing.assert_array_equal(table.regret_sum[block], [[0, 2]])
+        table.get_strategies(block, np.array([0.5]))
+        np.testing.assert_array_equal(table.strategy_sum[block], [[0, 1]])
+
+    def test_dcfr_weights(self):
+        alpha, beta, gamma = 1.5, 0.5, 2.0
+        table = RegretTable(2, algorithm='dcfr', alpha=alpha, beta=beta, gamma=gamma)
+        row = table.row('a')
+        regrets, strategy_sum = np.array([4.0, -4.0]), np.array([1.0, 3.0])
+        for t in range(1, 4):
+            table.regret_sum[row] = regrets
+            table.strategy_sum[row] = strategy_sum
+            table.end_iteration()
+            # After iteration t: positive regrets * t^a / (t^a + 1), negative * t^b / (t^b + 1), sums * (t / (t + 1))^g
+            expected = [4 * t ** alpha / (t ** alpha + 1), -4 * t ** beta / (t ** beta + 1)]
+            np.testing.assert_allclose(table.regret_sum[row], expected)
+            np.testing.assert_allclose(table.strategy_sum[row], strategy_sum * (t / (t + 1)) ** gamma)
+        self.assertEqual(table.iteration, 4)
+
+
+class TestSharedRegretTable(unittest.TestCase):
+
+    def setUp(self):
+        self.table = SharedRegretTable(2, capacity=8)
+        self.addCleanup(self.table.close, unlink=True)
+
+    def test_attached_tables_share_the_rows(self):
+        table = self.table
+        attached = pickle.loads(pickle.dumps(table))
+        self.addCleanup(attached.close)
+        row = attached.row('a')
+        # The key is placed by its hash, the same row in every table
+        self.assertEqual(table.row('a'), row)
+        attached.add_regrets(row, [2.0, 1.0])
+        attached.iteration = 5
+        self.assertEqual(table.get_strategy(row, 0), [2 / 3, 1 / 3])
+        self.assertEqual(table.iteration, 5)
+        self.assertEqual(table.active_rows().tolist(), [row])
+
+    def test_workers(self):
+        table = self.table
+        with Pool(2) as pool:
+            found = pool.map(add_regrets, [(table, 'a'), (table, 'b')])
+        # Info sets registered by the workers are read back by the parent
+        table.add_info_sets(info_set for info_sets in found for info_set in info_sets)
+        self.assertEqual(sorted(table.info_sets), ['a', 'b'])
+        np.testing.assert_array_equal(table.regret_sum[table.used_rows()], [[1, 2], [1, 2]])
+        self.assertEqual(len(table.active_rows()), 2)
+
+    def test_concurrent_inserts(self):
+        # Workers insert disjoint keys at once with many collisions, every key gets a row of its own
+        workers, count = 4, 5000
+        table = SharedRegretTable(2, capacity=1 << 15)
+        self.addCleanup(table.close, unlink=True)
+        with Pool(workers) as pool:
+            found = pool.map(insert_keys, [(table, worker, count) for worker in range(workers)])
+        rows = {info_set: row for worker_rows in found for info_set, row in worker_rows.items()}
+        self.assertEqual(len(set(rows.values())), workers * count)
+        table.add_info_sets(rows)
+        self.assertEqual(table.index, rows)
+        # No row was written by two workers
+        expected = [[1, int(info_set.split(':')[0])] for info_set in rows]
+        np.testing.assert_array_equal(table.regret_sum[list(rows.values())], expected)
+
+    def test_full(self):
+        for i in range(8):
+            self.table.row(str(i))
+        self.assertEqual(len(set(self.table.used_rows().tolist())), 8)
+        with self.assertRaises(MemoryError):
+            self.table.row('one too many')
+
+
+if __name__ == '__main__':
+    unittest.main()
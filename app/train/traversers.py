@@ -0,0 +1,223 @@
+# Game tree traversals of counterfactual regret minimization
+#
+# Every trainer describes its game through the Game interface: the deal, the terminal states with
+# their payoffs, the legal actions and the info sets, all as functions of the dealt cards and the
+# betting history. The history is the string of the actions by default, a game over a precomputed
+# tree (betting_tree.BettingTree) uses node ids instead and overrides root, next and key. Such a game
+# can also number its info sets (ordinal), the traversers then find the rows of the table by that
+# integer instead of building and hashing the key at every node.
+# A traverser runs one CFR iteration over that interface and updates a RegretTable:
+#
+#   vanilla  - every deal (chance outcome) and every action, needs Game.chance_outcomes
+#   chance   - one sampled deal per iteration, every action
+#   external - one sampled deal, every action of the updated player and one sampled action of the
+#              opponent, alternating the updated player
+#   outcome  - one sampled deal and a single sampled path through the tree, the updated player
+#              explores with probability EXPLORATION, values are importance weighted
+#
+# Vanilla and chance sampling update both players in one traversal, sampling variants do less work
+# per iteration at the price of noisier regrets, which pays off as the game grows. The deals come from
+# a dealer.Dealer, the sampled actions from a random.Random.
+import os
+import sys
+import random
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'cli'))
+from dealer import Dealer
+
+
+class Game:
+    # Actions are one character each, the history is the string of the actions taken.
+    # Payoffs are in chips, big_blind is the unit of exploitability (mbb/g)
+    actions = ''
+    big_blind = 1
+    root = ''
+
+    def deal(self, dealer):
+        # Cards of a sampled deal, dealer - dealer.Dealer
+        raise NotImplementedError
+
+    def chance_outcomes(self):
+        # [(cards, probability)] of all the deals, only needed by vanilla CFR
+        raise NotImplementedError(f'{type(self).__name__} can not enumerate its deals')
+
+    def player(self, history):
+        return len(history) % 2
+
+    def next(self, history, a):
+        # History after the action number a
+        return history + self.actions[a]
+
+    def is_terminal(self, cards, history):
+        raise NotImplementedError
+
+    def utility(self, cards, history, player):
+        # Payoff of player at a terminal history
+        raise NotImplementedError
+
+    def legal(self, history):
+        # One bool per action
+        return [True] * len(self.actions)
+
+    def hand(self, cards, player):
+        # Private part of the info sets of player, e.g. the (canonical or bucketed) hole cards
+        raise NotImplementedError
+
+    def key(self, hand, history):
+        # Info set of a hand at a history
+        return hand + history
+
+    def info_set(self, cards, history):
+        return self.key(self.hand(cards, self.player(history)), history)
+
+    def ordinal(self, cards, history):
+        # Integer id of the info set, None - the traversers look the info set key up
+        return None
+
+
+class Traverser:
+    def __init__(self, game, table, rng=None, dealer=None):
+        self.game = game
+        self.table = table
+        self.rng = rng if rng is not None else random
+        self.dealer = dealer if dealer is not None else Dealer()
+        # Rows of the table by info set ordinal
+        self.rows = {}
+
+    def row(self, cards, history):
+        ordinal = self.game.ordinal(cards, history)
+        if ordinal is None:
+            return self.table.row(self.game.info_set(cards, history))
+        row = self.rows.get(ordinal)
+        if row is None:
+            row = self.rows[ordinal] = self.table.row(self.game.info_set(cards, history))
+        return row
+
+    def strategy(self, cards, history, realization_weight):
+        # Row of the info set, current strategy over the legal actions and the legal actions
+        row = self.row(cards, history)
+        legal = self.game.legal(history)
+        return row, self.table.get_strategy(row, realization_weight, legal), legal
+
+    def iteration(self):
+        # Runs one iteration, returns the (estimated) value of player 0
+        raise NotImplementedError
+
+
+class VanillaCFR(Traverser):
+    def iteration(self):
+        return sum(probability * self.cfr(cards, self.game.root, 1, 1, probability)
+                   for cards, probability in self.game.chance_outcomes())
+
+    def cfr(self, cards, history, p0, p1, chance=1.0):
+        # Value of player 0, both players are updated, p0 and p1 - reach probabilities
+        game = self.game
+        if game.is_terminal(cards, history):
+            return game.utility(cards, history, 0)
+
+        player = game.player(history)
+        row, strategy, legal = self.strategy(cards, history, chance * (p0 if player == 0 else p1))
+        sign = 1 if player == 0 else -1
+        util = [0.0] * len(game.actions)
+        nodeUtil = 0
+
+        for a in range(len(game.actions)):
+            if not legal[a]:
+                continue
+            if player == 0:
+                util[a] = sign * self.cfr(cards, game.next(history, a), p0 * strategy[a], p1, chance)
+            else:
+                util[a] = sign * self.cfr(cards, game.next(history, a), p0, p1 * strategy[a], chance)
+            nodeUtil += strategy[a] * util[a]
+
+        self.table.add_regrets(row, [util[a] - nodeUtil if legal[a] else 0.0 for a in range(len(util))],
+                               chance * (p1 if player == 0 else p0))
+        return sign * nodeUtil
+
+
+class ChanceSampling(VanillaCFR):
+    def iteration(self):
+        return self.cfr(self.game.deal(self.dealer), self.game.root, 1, 1)
+
+
+class ExternalSampling(Traverser):
+    def iteration(self):
+        cards = self.game.deal(self.dealer)
+        value = self.traverse(cards, self.game.root, 0)
+        self.traverse(cards, self.game.root, 1)
+        return value
+
+    def traverse(self, cards, history, traverser):
+        # Sampled value of traverser, only the regrets of traverser are updated
+        game = self.game
+        if game.is_terminal(cards, history):
+            return game.utility(cards, history, traverser)
+
+        if game.player(history) != traverser:
+            # The opponent strategy is averaged where it is sampled
+            _, strategy, _ = self.strategy(cards, history, 1.0)
+            a = self.rng.choices(range(len(game.actions)), weights=strategy)[0]
+            return self.traverse(cards, game.next(history, a), traverser)
+
+        row, strategy, legal = self.strategy(cards, history, 0)
+        util = [0.0] * len(game.actions)
+        nodeUtil = 0
+        for a in range(len(game.actions)):
+            if legal[a]:
+                util[a] = self.traverse(cards, game.next(history, a), traverser)
+                nodeUtil += strategy[a] * util[a]
+
+        self.table.add_regrets(row, [util[a] - nodeUtil if legal[a] else 0.0 for a in range(len(util))])
+        return nodeUtil
+
+
+EXPLORATION = 0.6
+
+
+class OutcomeSampling(Traverser):
+    def iteration(self):
+        cards = self.game.deal(self.dealer)
+        value, _ = self.traverse(cards, self.game.root, 0, 1.0, 1.0, 1.0)
+        self.traverse(cards, self.game.root, 1, 1.0, 1.0, 1.0)
+        return value
+
+    def traverse(self, cards, history, traverser, reach, opponent_reach, sample):
+        """
+        :param reach: reach probability of traverser
+        :param opponent_reach: reach probability of the opponent
+        :param sample: probability of sampling the history
+        :return: (importance weighted value of traverser, probability of the rest of the sampled path)
+        """
+        game = self.game
+        if game.is_terminal(cards, history):
+            return game.utility(cards, history, traverser) / sample, 1.0
+
+        player = game.player(history)
+        # Stochastically weighted averaging of the opponent strategy
+        row, strategy, legal = self.strategy(cards, history, 0 if player == traverser else opponent_reach / sample)
+        if player == traverser:
+            num_legal = sum(legal)
+            policy = [EXPLORATION / num_legal + (1 - EXPLORATION) * probability if allowed else 0.0
+                      for probability, allowed in zip(strategy, legal)]
+        else:
+            policy = strategy
+
+        a = self.rng.choices(range(len(game.actions)), weights=policy)[0]
+        if player == traverser:
+            value, tail = self.traverse(cards, game.next(history, a), traverser, reach * strategy[a], opponent_reach,
+                                        sample * policy[a])
+            weighted = value * opponent_reach
+            self.table.add_regrets(row, [weighted * tail * ((1 if b == a else 0) - strategy[a]) if legal[b] else 0.0
+                                         for b in range(len(game.actions))])
+        else:
+            value, tail = self.traverse(cards, game.next(history, a), traverser, reach, opponent_reach * strategy[a],
+                                        sample * policy[a])
+        return value, tail * strategy[a]
+
+
+TRAVERSERS = {
+    'vanilla': VanillaCFR,
+    'chance': ChanceSampling,
+    'external': ExternalSampling,
+    'outcome': OutcomeSampling,
+}
@@ -0,0 +1,58 @@
+import importlib.util
+import os
+import random
+import sys
+import unittest
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'cli'))
+from best_response import BestResponse
+from dealer import Dealer
+from regret_table import RegretTable
+from traversers import TRAVERSERS
+
+# The Kuhn poker trainer is a script with a dash in its name
+_spec = importlib.util.spec_from_file_location(
+    'kuhn_poker', os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'CFR', 'Kunh-Poker.py'))
+kuhn_poker = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(kuhn_poker)
+KuhnPoker = kuhn_poker.KuhnPoker
+
+
+# Iterations and exploitability bound (mbb/g) of every traverser, outcome sampling is the noisiest
+CONVERGENCE = {'vanilla': (1000, 15), 'chance': (10_000, 15), 'external': (10_000, 15), 'outcome': (20_000, 40)}
+
+
+def train_kuhn(traverser, iterations, algorithm='cfr', seed=0):
+    table = RegretTable(kuhn_poker.NUM_ACTIONS, algorithm=algorithm)
+    solver = TRAVERSERS[traverser](KuhnPoker(), table, random.Random(seed), Dealer(seed))
+    for _ in range(iterations):
+        solver.iteration()
+        table.end_iteration()
+    return table
+
+
+class TestTraversers(unittest.TestCase):
+
+    def test_kuhn_smoke(self):
+        # Every traverser runs on Kuhn poker and reaches all the 12 info sets
+        for traverser in TRAVERSERS:
+            with self.subTest(traverser=traverser):
+                table = train_kuhn(traverser, 50)
+                self.assertEqual(len(table), 12)
+                self.assertEqual(table.iteration, 51)
+
+    def test_kuhn_convergence(self):
+        evaluator = BestResponse(KuhnPoker())
+        for traverser, (iterations, bound) in CONVERGENCE.items():
+            with self.subTest(traverser=traverser):
+                table = train_kuhn(traverser, iterations)
+                self.assertLess(evaluator.exploitability(table), bound)
+                # The second player bets a 1 after a pass 1/3 of the time, calls a bet with a 3 and folds a 1
+                strategies = table.to_dict()
+                self.assertAlmostEqual(strategies['1p'][1], 1 / 3, delta=0.08)
+                self.assertGreater(strategies['3b'][1], 0.95)
+                self.assertGreater(strategies['1b'][0], 0.95)
+
+
+if __name__ == '__main__':
+    unittest.main()